@@ -1,15 +1,35 @@
 import streamlit as st
-import pandas as pd
 import os
-import csv
-import json
-import numpy as np
+import time
 from datetime import datetime
+from utils.assignment import coder_indices, assignment_coders
+from utils.annotation_schema import frame_schema, PRESENCE_VALUES, NOT_PRESENT, CORRUPTION_VALUES, FLAGGED
+from utils.session_store import SessionStore, json_default, pin_articles
+from utils.dataset_cache import file_signature, get_dataset_cache, render_cache_panel
+from utils.dataset_registry import get_registry
+from utils.search_index import load_or_build, render_search_box
+from utils.review_queue import rebuild_flags, render_review_queue
+from utils.telemetry import get_event_log, SHOWN, FIRST_INTERACTION, SAVED
+from utils.profiling import get_profiler, render_profile_panel
+from utils.shortcuts import render_keyboard_shortcuts, interaction_timer
+from utils.text_panel import render_text_panel
+from utils.evidence_index import build_evidence_index, evidence_paragraphs, evidence_links_html
+from utils.write_buffer import DEFAULT_MAX_RECORDS, get_buffer, pending_buffer_path, recover_once
 
 # === CONFIG ===
 ANNOTATION_FILE = "annotations_final.csv"
 SESSION_FOLDER = "sessions_final"
 
+# Annotations buffered per coder before one bulk write of the CSV and session
+# (ANNOTATOR_SAVE_BATCH / ANNOTATOR_SAVE_INTERVAL); 1 saves every article at once.
+SAVE_BATCH = DEFAULT_MAX_RECORDS
+PENDING_FOLDER_NAME = "pending"
+
+# HTML id prefix of the translated text's paragraphs (frame cards link to them)
+TRANSLATED_ANCHOR = "translated"
+# Hidden label form field with the time to the coder's first change (see interaction_timer)
+INTERACTION_FIELD = "first_interaction_ms"
+
 # Mapping from coder names to their dataset paths.
 USER_DATASET = {
     "Assia": "data/Netherlands_Assia_sample_250_llm_annotated.csv",
@@ -22,6 +42,12 @@ USER_DATASET = {
     "TestLuigia": "data/Italy_Luigia_sample_250_llm_annotated.csv",
 }
 
+# Shared article pool plus compact per-coder index arrays (see make_assignments.py).
+# A coder listed in the assignment file reads their articles from the pool
+# instead of a per-coder CSV copy in USER_DATASET.
+POOL_PATH = "data/final_sample_pool.csv"
+ASSIGNMENT_FILE = "assignments/final_sample.npz"
+
 FRAME_LABELS = [
     "Foreign influence threat",
     "Systemic institutional corruption",
@@ -32,6 +58,9 @@ FRAME_LABELS = [
     "Mobilizing anti-corruption"
 ]
 
+# Columns and allowed label values of ANNOTATION_FILE (see utils/annotation_schema.py)
+ANNOTATION_SCHEMA = frame_schema(FRAME_LABELS, timestamp=True, pool_row=True)
+
 FRAME_COLORS = {
     f"frame_{i}_evidence": color for i, color in enumerate([
         "#cce5ff", "#d5f5e3", "#e6ccff", "#ffe8cc",
@@ -40,179 +69,238 @@ FRAME_COLORS = {
 }
 
 # === HELPERS ===
+def session_store():
+    """This study's sessions, annotation CSV, flag index and journal (see utils/session_store.py)."""
+    return SessionStore(SESSION_FOLDER, ANNOTATION_FILE, ANNOTATION_SCHEMA, FRAME_LABELS)
+
 def load_session(user_id):
-    """Load a coder's session from disk."""
-    path = os.path.join(SESSION_FOLDER, f"{user_id}_session.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Load a coder's session from disk (binary format, falling back to legacy JSON)."""
+    return session_store().load_session(user_id)
+
+def get_journal():
+    """Write-ahead journal for session and annotation writes (kept in SESSION_FOLDER)."""
+    return session_store().journal()
 
 def save_session(user_id, session_data):
-    """Save a coder's session to disk."""
-    def convert(obj):
-        if isinstance(obj, (np.integer,)):
-            return int(obj)
-        if isinstance(obj, (np.floating,)):
-            return float(obj)
-        if isinstance(obj, (np.ndarray,)):
-            return obj.tolist()
-        raise TypeError(f"Unserializable object {obj} of type {type(obj)}")
-
-    os.makedirs(SESSION_FOLDER, exist_ok=True)
-    path = os.path.join(SESSION_FOLDER, f"{user_id}_session.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(session_data, f, indent=2, default=convert)
-
-@st.cache_data(show_spinner=False)
-def load_articles(data_path):
-    """Read a CSV file into a DataFrame.  Cached per file path."""
-    return pd.read_csv(data_path)
+    """Save a coder's session, merged with saves from other tabs (see SessionStore.save_session)."""
+    session_store().save_session(user_id, session_data)
 
-def fallback_session(user_id):
-    """Create an empty session structure for a new user."""
-    return {"user_id": user_id, "current_index": 0, "annotations": []}
+def load_articles(data_path):
+    """Read a CSV file into a DataFrame.
+
+    Served from the shared, memory-bounded dataset cache: every session gets the
+    same (read-only) DataFrame.  Changed files are reloaded in the background
+    by the dataset registry and swapped in without blocking a rerun.
+    """
+    return get_registry().get(data_path)
+
+def load_coder_articles(user_id):
+    """Articles for this coder: their assigned pool rows, else their USER_DATASET file."""
+    indices = coder_indices(ASSIGNMENT_FILE, user_id)
+    if indices is not None:
+        # Cached with the pool, so the subset is rebuilt only when the pool reloads
+        return get_registry().derived(
+            POOL_PATH, ("assigned", user_id, indices.tobytes()), lambda pool: pool.iloc[indices]
+        )
+    data_path = USER_DATASET.get(user_id)
+    if data_path is None:
+        return None
+    return load_articles(data_path)
+
+def pool_row(user_id, current):
+    """Pool row of the coder's article `current` ("" without an assignment: uri is then the key)."""
+    indices = coder_indices(ASSIGNMENT_FILE, user_id)
+    if indices is None or not 0 <= current < len(indices):
+        return ""
+    return int(indices[current])
+
+def coder_data_path(user_id):
+    """Dataset file behind load_coder_articles: the pool for assigned coders, else USER_DATASET."""
+    if coder_indices(ASSIGNMENT_FILE, user_id) is not None:
+        return POOL_PATH
+    return USER_DATASET.get(user_id)
+
+def load_search_index(data_path):
+    """Inverted index over a dataset file, read from disk or built on the first search.
+
+    Kept with the dataset in the shared cache, so a hot reload rebuilds it in
+    the background.
+    """
+    return get_registry().derived(data_path, "search_index", lambda data: load_or_build(data_path, data))
+
+def load_evidence_index(data_path):
+    """Evidence phrase -> paragraph/offsets of every article in a dataset file (see utils/evidence_index.py).
+
+    Taken from the ingested evidence_index column when there is one, else
+    computed once per dataset version and kept in the shared cache.
+    """
+    return get_registry().derived(data_path, "evidence_index", build_evidence_index)
+
+def article_evidence_index(user_id, row):
+    """Evidence index of the article in `row`, for the frames shown as cards."""
+    index = load_evidence_index(coder_data_path(user_id)).get(row.name, {})
+    return {i: entries for i, entries in index.items() if row.get(f"frame_{i}_valid", True)}
 
 def safe_load_session(user_id):
-    """Load session data if it exists, otherwise create a blank session."""
-    os.makedirs(SESSION_FOLDER, exist_ok=True)
+    """Load session data if it exists, otherwise create a blank session.
+
+    Saves still waiting in the coder's write buffer are applied on top, so the
+    coder sees them before they are flushed.
+    """
+    sess = load_saved_session(user_id)
+    if SAVE_BATCH > 1:
+        apply_pending(sess, get_write_buffer(user_id).records())
+    return sess
+
+def session_key(user_id):
+    """What safe_load_session(user_id) depends on: the saved version and the write buffer file."""
     try:
-        return load_session(user_id)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return fallback_session(user_id)
+        buffered = file_signature(pending_buffer_path(pending_folder(), user_id))
+    except FileNotFoundError:
+        buffered = None
+    return user_id, session_store().versions().get(user_id), buffered
+
+def run_session(user_id):
+    """The coder's session for rendering, loaded once and shared by main() and the fragments.
+
+    A full rerun renders main() and four article fragments, each of which
+    needs the session.  The copy in st.session_state is loaded again only when
+    session_key changes (a save, here or in another tab or worker, or a
+    buffered save).  It is read-only: callbacks that change the session load
+    their own with safe_load_session.
+    """
+    key = session_key(user_id)
+    cached = st.session_state.get("run_session")
+    if cached is None or cached[0] != key:
+        cached = (key, safe_load_session(user_id))
+        st.session_state["run_session"] = cached
+    return cached[1]
+
+def load_saved_session(user_id):
+    """The session as written to disk (a blank session if there is none), with its version."""
+    store = session_store()
+    store.prepare()
+    if SAVE_BATCH > 1:
+        recover_once(pending_folder(), get_write_buffer)
+    return store.load_saved_session(user_id)
+
+def pending_folder():
+    return os.path.join(SESSION_FOLDER, PENDING_FOLDER_NAME)
+
+def get_write_buffer(user_id):
+    """The coder's buffer of saves not yet written to the CSV and session files."""
+    return get_buffer(
+        pending_buffer_path(pending_folder(), user_id),
+        lambda records: flush_saves(user_id, records),
+        max_records=SAVE_BATCH,
+    )
+
+def apply_pending(sess, records):
+    """Apply buffered records ({"entry": ..., "current_index": ...}) to a session, in order."""
+    for record in records:
+        if "entry" in record:
+            sess.setdefault("annotations", {})[int(record["entry"]["article_index"])] = record["entry"]
+        if "current_index" in record:
+            sess["current_index"] = record["current_index"]
+    return sess
+
+def flush_saves(user_id, records):
+    """Write a batch of buffered saves: one CSV rewrite and one session write."""
+    sess = apply_pending(load_saved_session(user_id), records)
+    entries = [record["entry"] for record in records if "entry" in record]
+    if entries:
+        get_journal().run("annotations", {"entries": entries})
+    save_session(user_id, sess)
+
+def flush_pending_saves(user_id):
+    """Write the coder's buffered saves now (e.g. for "I'm done for now")."""
+    if SAVE_BATCH > 1:
+        get_write_buffer(user_id).flush()
 
 def save_annotation(entry: dict):
     """Append or update one annotation in the CSV and write it back to disk."""
-    annotations = []
-    if os.path.exists(ANNOTATION_FILE):
-        try:
-            with open(ANNOTATION_FILE, mode="r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                annotations = list(reader)
-        except Exception as e:
-            print(f"❌ Error reading annotation file: {e}")
-
-    # Remove previous annotation for this user/article combination
-    annotations = [
-        a for a in annotations
-        if not (a["user_id"] == entry["user_id"] and a["article_index"] == str(entry["article_index"]))
-    ]
-    annotations.append(entry)
-
-    fieldnames = [
-        'user_id', 'article_index', 'notes', 'flagged',
-        'uri', 'original_text', 'translated_text',
-        'political_corruption', 'timestamp'
-    ] + [f"{label}_present" for label in FRAME_LABELS]
+    session_store().save_annotation(entry)
+
+def review_article(user_id, article_index):
+    """The dataset row a coder saw at `article_index` (None if it is gone)."""
+    df = load_coder_articles(user_id)
+    if df is None or not 0 <= article_index < len(df):
+        return None
+    return df.iloc[article_index]
+
+def review_page():
+    """Reviewer mode (`?review=1`): page through flagged articles and resolve them."""
+    st.subheader("🚩 Flagged articles")
+    store = session_store()
+    path = store.flag_index_path()
+    if not os.path.exists(path):
+        os.makedirs(SESSION_FOLDER, exist_ok=True)
+        rebuild_flags(ANNOTATION_FILE, path)
+    reviewer = st.text_input("Reviewer name", key="reviewer")
+    if not reviewer:
+        st.info("Enter your name to review flagged articles.")
+        st.stop()
+    render_review_queue(
+        path, review_article,
+        lambda user_id, index, resolution, status: store.save_review(reviewer, user_id, index, resolution, status),
+    )
 
-    try:
-        with open(ANNOTATION_FILE, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(annotations)
-    except Exception as e:
-        print(f"❌ Error writing annotation file: {e}")
+def build_entry(user_id, current, row, frame_selections, political_corruption, notes, flagged):
+    """Build the annotation entry (including timestamp) for the current article."""
+    entry = {
+        "user_id": user_id,
+        "article_index": current,
+        "notes": notes,
+        "flagged": str(flagged),
+        "uri": row.get("uri", ""),
+        "pool_row": pool_row(user_id, current),
+        "original_text": row.get("original_text", ""),
+        "translated_text": row.get("translated_text", ""),
+        "political_corruption": political_corruption,
+        "timestamp": datetime.now().isoformat()
+    }
+    for label in FRAME_LABELS:
+        entry[f"{label}_present"] = frame_selections[label]
+    return ANNOTATION_SCHEMA.validate(entry)
+
+def store_annotation(user_id, sess, entry, profiler=None):
+    """Upsert an entry into the session and the annotation CSV, then save the session.
+
+    In batched mode the entry and the session position go to the coder's
+    write buffer instead, and reach the files with the next flush.
+    """
+    profiler = profiler or get_profiler()
+    sess.setdefault("annotations", {})[entry["article_index"]] = entry
+    if SAVE_BATCH > 1:
+        with profiler.phase("buffer_save"):
+            get_write_buffer(user_id).add(
+                {"entry": entry, "current_index": sess.get("current_index", 0)}, default=json_default
+            )
+        get_event_log().record(user_id, entry["article_index"], SAVED)
+        return
+    with profiler.phase("save_annotation"):
+        save_annotation(entry)
+    get_event_log().record(user_id, entry["article_index"], SAVED)
+    with profiler.phase("save_session"):
+        save_session(user_id, sess)
 
 def jump_to(index: int, sess, user_id):
     """Navigate to a particular article index and save session state."""
     sess["current_index"] = index
-    save_session(user_id, sess)
-
-# === MAIN APP ===
-def main():
-    st.set_page_config(layout="wide")
-    st.title("📝 Corruption Frame Annotation Tool")
-
-    # User login / selection
-    if "user_id" not in st.session_state:
-        # Real coders + test accounts (Yara and Anne removed)
-        user_choice = st.selectbox(
-            "Select your username:",
-            ["Assia", "Alexander", "Elisa", "Luigia",
-             "TestAssia", "TestAlexander", "TestElisa", "TestLuigia"]
-        )
-        if st.button("Start annotating"):
-            st.session_state["user_id"] = user_choice
-            st.rerun()
-        st.stop()
-
-    user_id = st.session_state["user_id"]
-
-    # Determine dataset based on user_id
-    data_path = USER_DATASET.get(user_id)
-    if data_path is None:
-        st.error("No dataset configured for this user.")
-        st.stop()
-
-    # Load session and articles
-    sess = safe_load_session(user_id)
-    df = load_articles(data_path)
-    total = len(df)
-    current = sess.get("current_index", 0)
-
-    # Show welcome or welcome-back message once per login
-    if "welcome_shown" not in st.session_state:
-        if current > 0:
-            st.info(f"Welcome back, {user_id}! Resuming at article {current + 1} of {total}.")
-        else:
-            st.info(f"Welcome, {user_id}! You have {total} articles to annotate.")
-        st.session_state["welcome_shown"] = True
-
-    # End-of-data message
-    if current >= total:
-        st.success("✅ You have completed all articles!")
-        if st.button("⬅️ Go back to previous article"):
-            sess["current_index"] = total - 1
-            save_session(user_id, sess)
-            st.rerun()
-        st.stop()
-
-    row = df.iloc[current]
-
-    # Header with 1-based numbering
-    st.subheader(f"Article {current + 1} of {total}")
-
-    # Jump-to navigation (1-based to align with header)
-    nav = st.number_input(
-        "Jump to Article",
-        min_value=1,
-        max_value=total,
-        value=current + 1,
-        key="nav_input"
-    )
-    if st.button("Go to article"):
-        # Convert the 1-based input back to 0-based index
-        jump_to(int(nav) - 1, sess, user_id)
-        st.rerun()
-
-    # === RESET STATE WHEN ARTICLE CHANGES ===
-    if st.session_state.get("last_loaded_index") != current:
-        st.session_state["last_loaded_index"] = current
-        # Reset frame radios, corruption, notes, flagged
-        for label in FRAME_LABELS:
-            st.session_state[f"{label}_radio"] = "Not Present"
-        st.session_state["political_corruption"] = "Yes"
-        st.session_state["notes"] = ""
-        st.session_state["flagged"] = False
-
-        # If this article has stored annotations, restore them
-        stored = next((a for a in sess.get("annotations", []) if a["article_index"] == current), None)
-        if stored:
-            for label in FRAME_LABELS:
-                st.session_state[f"{label}_radio"] = stored.get(f"{label}_present", "Not Present")
-            st.session_state["political_corruption"] = stored.get("political_corruption", "No")
-            st.session_state["notes"] = stored.get("notes", "")
-            st.session_state["flagged"] = stored.get("flagged", "False") == "True"
-
-    # === ARTICLE TEXT ===
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("**Original Text**")
-        st.write(row.get("combined_text", ""))
-    with col2:
-        st.markdown("**Translated Text**")
-        st.write(row.get("translated_text", ""))
-
-    # === RATIONALE, EVIDENCE & CONFIDENCE DISPLAY ===
-    st.markdown("### 🧠 Frame-wise rationale, evidence & confidence")
+    if SAVE_BATCH > 1:
+        # Ordered with the buffered saves, so a flush cannot move the coder back
+        get_write_buffer(user_id).add({"current_index": index})
+    else:
+        save_session(user_id, sess)
+
+def render_frame_cards(row, evidence=None):
+    """Render the LLM rationale/evidence card of every valid frame; returns how many were shown.
+
+    `evidence` (frame number -> index entries) turns each evidence phrase into
+    a link to its paragraph, and marks phrases missing from the text.
+    """
+    evidence = evidence or {}
+    frames_shown = 0
     for i in range(1, 8):
         name_col = f"frame_{i}_name"
         rationale_col = f"frame_{i}_rationale"
@@ -225,6 +313,10 @@ def main():
         evidence_text = str(row.get(evidence_col, "")).strip()
         confidence_val_raw = row.get(confidence_col, "")
 
+        # Datasets from ingest_dataset.py flag unusable frames (errors, no valid json) up front
+        if not row.get(f"frame_{i}_valid", True):
+            continue
+
         # Skip if confidence is missing or not convertible
         try:
             confidence_float = float(confidence_val_raw)
@@ -255,9 +347,12 @@ def main():
 
         # Build the HTML block
         evidence_html = ""
-        if show_evidence:
+        if evidence.get(i):
+            evidence_html = f"<i><u>Evidence:</u></i><br> {evidence_links_html(evidence[i], TRANSLATED_ANCHOR)}<br><br>"
+        elif show_evidence:
             evidence_html = f"<i><u>Evidence:</u></i><br> {evidence_text}<br><br>"
 
+        frames_shown += 1
         st.markdown(
             f"<div style='margin-top:10px; padding:10px; border-left: 6px solid {color}; "
             f"background-color:{color}33;'>"
@@ -268,88 +363,268 @@ def main():
             f"</div>",
             unsafe_allow_html=True
         )
-
-    # === FRAME PRESENCE ===
-    st.markdown("### 🏷️ Frame presence")
-    frame_selections = {}
-    for label in FRAME_LABELS:
-        frame_selections[label] = st.radio(
-            f"{label}:", ["Not Present", "Present"], horizontal=True, key=f"{label}_radio"
+    return frames_shown
+
+# === ARTICLE FRAGMENTS ===
+# The article page reruns in parts: Previous/Next rerun only these fragments
+# (not the title, login, search and debug chrome), and Save reruns only the
+# label form and the progress header.  Each fragment gets the session from
+# run_session rather than as an argument: a fragment rerun does not go through
+# main() and calls the fragment with the arguments of its first run.
+ARTICLE_FRAGMENTS = ["progress_header", "article_panel", "frame_cards", "label_form"]
+
+def coder_view(user_id, sess=None):
+    """The coder's session (by default the shared run_session), current index and pinned articles."""
+    if sess is None:
+        sess = run_session(user_id)
+    current = sess.get("current_index", 0)
+    df = pin_articles(load_coder_articles(user_id), user_id, current)
+    return sess, current, df
+
+def note_interaction(user_id, article_index):
+    """Log the coder's first change to the label form of `article_index`, timed in the browser.
+
+    The form's widgets take no callbacks, so this runs on submit; the event
+    gets the time the change was made, counted from the `shown` event.
+    """
+    elapsed = st.session_state.get(INTERACTION_FIELD, "")
+    if not elapsed.isdigit() or st.session_state.get("shown_index") != (user_id, article_index):
+        return
+    if st.session_state.get("interacted_index") != article_index:
+        st.session_state["interacted_index"] = article_index
+        shown_at = st.session_state["shown_at"]
+        get_event_log().record(user_id, article_index, FIRST_INTERACTION, at=shown_at + int(elapsed) / 1000)
+
+def navigate(user_id, index, action, submitted=None):
+    """Button callback: open article `index` and rerun only the article fragments.
+
+    `submitted` is the article whose label form was submitted by the button, if any.
+    """
+    if submitted is not None:
+        note_interaction(user_id, submitted)
+    with get_profiler().phase(f"action: {action}"):
+        jump_to(index, safe_load_session(user_id), user_id)
+    st.rerun(scope=ARTICLE_FRAGMENTS)
+
+def submit_labels(user_id, action):
+    """Label form callback: save the current article, then go to the next one ("next") or stay ("save")."""
+    with get_profiler().phase(f"action: {action}"):
+        sess, current, df = coder_view(user_id, safe_load_session(user_id))
+        note_interaction(user_id, current)
+        frame_selections = {label: st.session_state[f"{label}_radio"] for label in FRAME_LABELS}
+        entry = build_entry(
+            user_id, current, df.iloc[current], frame_selections,
+            st.session_state["political_corruption"], st.session_state["notes"], st.session_state["flagged"]
+        )
+        if action == "next":
+            sess["current_index"] = current + 1
+        store_annotation(user_id, sess, entry)
+        if action == "save":
+            flush_pending_saves(user_id)
+    if action == "next":
+        st.rerun(scope=ARTICLE_FRAGMENTS)
+    st.session_state["progress_saved"] = True
+    st.rerun(scope=["progress_header", "label_form"])
+
+@st.fragment(key="progress_header")
+def progress_header(user_id):
+    """Article number, labeling progress and jump-to navigation."""
+    with get_profiler().phase("fragment: progress_header"):
+        sess, current, df = coder_view(user_id)
+        total = len(df)
+
+        # End-of-data message
+        if current >= total:
+            st.success("✅ You have completed all articles!")
+            st.button("⬅️ Go back to previous article", on_click=navigate, args=(user_id, total - 1, "previous"))
+            return
+
+        # Header with 1-based numbering
+        st.subheader(f"Article {current + 1} of {total}")
+        labeled = len(sess.get("annotations", {}))
+        st.progress(min(labeled / total, 1.0), text=f"{labeled} of {total} articles labeled")
+
+        # Jump-to navigation (1-based to align with header)
+        if st.session_state.get("nav_for") != current:
+            st.session_state["nav_for"] = current
+            st.session_state["nav_input"] = current + 1
+        st.number_input("Jump to Article", min_value=1, max_value=total, key="nav_input")
+        st.button(
+            "Go to article",
+            on_click=lambda: navigate(user_id, int(st.session_state["nav_input"]) - 1, "jump")
         )
 
-    # === POLITICAL CORRUPTION ===
-    st.markdown("### 🗳️ Is this article primarily about political corruption?")
-    political_corruption = st.radio(
-        "Your answer:",
-        ["Yes", "No"],
-        horizontal=True,
-        index=0,
-        key="political_corruption"
-    )
+@st.fragment(key="article_panel")
+def article_panel(user_id):
+    """Original and translated text of the current article."""
+    with get_profiler().phase("fragment: article_panel"):
+        _, current, df = coder_view(user_id)
+        if current >= len(df):
+            return
+        row = df.iloc[current]
+        translated = row.get("translated_text", "")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**Original Text**")
+            render_text_panel(row.get("combined_text", ""), "original_panel", (user_id, current))
+        with col2:
+            st.markdown("**Translated Text**")
+            # Paragraphs with LLM evidence are shown even while the text is collapsed
+            render_text_panel(
+                translated, "translated_panel", (user_id, current),
+                show=evidence_paragraphs(article_evidence_index(user_id, row)), anchor=TRANSLATED_ANCHOR
+            )
+
+@st.fragment(key="frame_cards")
+def frame_cards(user_id):
+    """LLM rationale, evidence and confidence per frame."""
+    with get_profiler().phase("fragment: frame_cards"):
+        _, current, df = coder_view(user_id)
+        if current >= len(df):
+            return
+        row = df.iloc[current]
+        st.markdown("### 🧠 Frame-wise rationale, evidence & confidence")
+        frames_shown = render_frame_cards(row, article_evidence_index(user_id, row))
+
+        if st.session_state.get("shown_index") != (user_id, current):
+            st.session_state["shown_index"] = (user_id, current)
+            st.session_state["shown_at"] = time.time()
+            get_event_log().record(
+                user_id, current, SHOWN,
+                text_length=len(str(row.get("translated_text", ""))),
+                frames_shown=frames_shown
+            )
+
+def form_values(sess, current):
+    """Label form widget values for article `current`: its stored annotation, else the defaults."""
+    values = {f"{label}_radio": NOT_PRESENT for label in FRAME_LABELS}
+    values.update(political_corruption="Yes", notes="", flagged=False)
+    stored = sess.get("annotations", {}).get(current)
+    if stored:
+        for label in FRAME_LABELS:
+            values[f"{label}_radio"] = stored.get(f"{label}_present", NOT_PRESENT)
+        values["political_corruption"] = stored.get("political_corruption", "No")
+        values["notes"] = stored.get("notes", "")
+        values["flagged"] = stored.get("flagged") == FLAGGED
+    return values
+
+@st.fragment(key="label_form")
+def label_form(user_id):
+    """Frame presence, corruption question, notes and flag, submitted in one go."""
+    with get_profiler().phase("fragment: label_form"):
+        sess, current, df = coder_view(user_id)
+        if current >= len(df):
+            return
+
+        # === RESET STATE WHEN ARTICLE CHANGES ===
+        if st.session_state.get("last_loaded_index") != current:
+            st.session_state["last_loaded_index"] = current
+            st.session_state.update(form_values(sess, current))
+            st.session_state[INTERACTION_FIELD] = ""
+
+        # Widgets inside the form change only in the browser; the whole article is
+        # sent in one submit (Previous / Save / Next) instead of a rerun per click.
+        with st.form("labels", border=False):
+            st.markdown("### 🏷️ Frame presence")
+            for i, label in enumerate(FRAME_LABELS, start=1):
+                st.radio(f"{label} ({i}):", PRESENCE_VALUES, horizontal=True, key=f"{label}_radio")
+
+            # === POLITICAL CORRUPTION ===
+            st.markdown("### 🗳️ Is this article primarily about political corruption?")
+            st.radio("Your answer:", CORRUPTION_VALUES, horizontal=True, key="political_corruption")
+
+            # === NOTES + FLAG ===
+            st.text_area("📝 Comments (optional):", key="notes")
+            st.checkbox("🚩 Flag this article for review", key="flagged")
+            interaction_timer(INTERACTION_FIELD, [user_id, current])
+
+            # === NAVIGATION (with Save progress) ===
+            col_prev, col_save, col_next = st.columns(3)
+            with col_prev:
+                st.form_submit_button(
+                    "⬅️ Previous", on_click=navigate, args=(user_id, max(current - 1, 0), "previous", current)
+                )
+            with col_save:
+                st.form_submit_button(
+                    "💾 I'm done for now, save my progress", on_click=submit_labels, args=(user_id, "save")
+                )
+            with col_next:
+                st.form_submit_button(
+                    "Next ➡️", type="primary", shortcut="N", on_click=submit_labels, args=(user_id, "next")
+                )
+
+        st.caption(f"⌨️ Keys 1–{len(FRAME_LABELS)} toggle a frame, N saves and goes to the next article.")
+        if st.session_state.pop("progress_saved", False):
+            st.success("Progress saved. You can close this tab and resume later.")
 
-    # === NOTES + FLAG ===
-    notes = st.text_area("📝 Comments (optional):", key="notes")
-    flagged = st.checkbox("🚩 Flag this article for review", key="flagged")
+def article_fragments(user_id):
+    """Render the article page; each part reruns on its own afterwards."""
+    progress_header(user_id)
+    article_panel(user_id)
+    frame_cards(user_id)
+    label_form(user_id)
 
-    # === NAVIGATION (with Save progress) ===
-    col_prev, col_save, col_next = st.columns(3)
-    with col_prev:
-        if st.button("⬅️ Previous") and current > 0:
-            sess["current_index"] = current - 1
-            save_session(user_id, sess)
-            st.rerun()
-    
-    
-    with col_save:
-        if st.button("💾 I'm done for now, save my progress"):
-            # Build entry including timestamp
-            entry = {
-                "user_id": user_id,
-                "article_index": current,
-                "notes": notes,
-                "flagged": str(flagged),
-                "uri": row.get("uri", ""),
-                "original_text": row.get("original_text", ""),
-                "translated_text": row.get("translated_text", ""),
-                "political_corruption": political_corruption,
-                "timestamp": datetime.now().isoformat()
-            }
-            for label in FRAME_LABELS:
-                entry[f"{label}_present"] = frame_selections[label]
-            # Update session annotations
-            existing = sess.get("annotations", [])
-            existing = [a for a in existing if a["article_index"] != current]
-            existing.append(entry)
-            sess["annotations"] = existing
-            save_annotation(entry)
-            save_session(user_id, sess)
-            st.success("Progress saved. You can close this tab and resume later.")
-            st.stop()
-
-    with col_next:
-        if st.button("Next ➡️"):
-            # Build entry including timestamp and move to next article
-            entry = {
-                "user_id": user_id,
-                "article_index": current,
-                "notes": notes,
-                "flagged": str(flagged),
-                "uri": row.get("uri", ""),
-                "original_text": row.get("original_text", ""),
-                "translated_text": row.get("translated_text", ""),
-                "political_corruption": political_corruption,
-                "timestamp": datetime.now().isoformat()
-            }
-            for label in FRAME_LABELS:
-                entry[f"{label}_present"] = frame_selections[label]
-            existing = sess.get("annotations", [])
-            existing = [a for a in existing if a["article_index"] != current]
-            existing.append(entry)
-            sess["annotations"] = existing
-            save_annotation(entry)
-            sess["current_index"] = current + 1
-            save_session(user_id, sess)
+# === MAIN APP ===
+def main():
+    st.set_page_config(layout="wide")
+    st.title("📝 Corruption Frame Annotation Tool")
+    profiler = get_profiler()
+
+    if st.query_params.get("review") == "1":
+        review_page()
+        return
+
+    # User login / selection
+    if "user_id" not in st.session_state:
+        # Real coders + test accounts (Yara and Anne removed)
+        coders = ["Assia", "Alexander", "Elisa", "Luigia",
+                  "TestAssia", "TestAlexander", "TestElisa", "TestLuigia"]
+        coders += [c for c in assignment_coders(ASSIGNMENT_FILE) if c not in coders]
+        user_choice = st.selectbox("Select your username:", coders)
+        if st.button("Start annotating"):
+            st.session_state["user_id"] = user_choice
             st.rerun()
+        st.stop()
+
+    user_id = st.session_state["user_id"]
+
+    # Determine dataset based on user_id (assignment first, then USER_DATASET)
+    with profiler.phase("load_articles"):
+        df = load_coder_articles(user_id)
+    if df is None:
+        st.error("No dataset configured for this user.")
+        st.stop()
+
+    # Load session
+    with profiler.phase("load_session"):
+        sess = run_session(user_id)
+    current = sess.get("current_index", 0)
+    df = pin_articles(df, user_id, current)
+    total = len(df)
+
+    # Show welcome or welcome-back message once per login
+    if "welcome_shown" not in st.session_state:
+        if current > 0:
+            st.info(f"Welcome back, {user_id}! Resuming at article {current + 1} of {total}.")
+        else:
+            st.info(f"Welcome, {user_id}! You have {total} articles to annotate.")
+        st.session_state["welcome_shown"] = True
+
+    def open_search_result(position):
+        # Fragment reruns may have saved since this run loaded `sess`
+        jump_to(position, safe_load_session(user_id), user_id)
+        st.rerun()
+
+    render_search_box(
+        lambda: load_search_index(coder_data_path(user_id)),
+        df, sess.get("annotations", {}), FRAME_LABELS, open_search_result
+    )
+
+    article_fragments(user_id)
+    render_keyboard_shortcuts(len(FRAME_LABELS), INTERACTION_FIELD)
+    render_profile_panel(profiler)
+    render_cache_panel(get_dataset_cache())
 
 if __name__ == "__main__":
-    main()
+    with get_profiler().rerun():
+        main()
@@ -1,14 +1,21 @@
 import streamlit as st
-import pandas as pd
 import os
-import csv
-import json
-import numpy as np
+from utils.assignment import coder_indices, assignment_coders
+from utils.annotation_schema import frame_schema, PRESENCE_VALUES, NOT_PRESENT, CORRUPTION_VALUES, FLAGGED
+from utils.session_store import SessionStore, pin_articles
+from utils.dataset_registry import get_registry
+from utils.search_index import load_or_build, render_search_box
+from utils.review_queue import rebuild_flags, render_review_queue
+from utils.telemetry import get_event_log, SHOWN, FIRST_INTERACTION, SAVED
+from utils.text_panel import render_text_panel
 
 # === CONFIG ===
 ANNOTATION_FILE = "annotations_icr2.csv"
 DATA_PATH = "data/icr2_sample_LLM_annotated.csv"
 SESSION_FOLDER = "sessions_icr2"
+# Optional overlap-controlled assignment of DATA_PATH rows (see make_assignments.py).
+# Coders without an entry keep coding the whole sample.
+ASSIGNMENT_FILE = "assignments/icr2.npz"
 
 FRAME_LABELS = [
     "Foreign influence threat",
@@ -19,6 +26,7 @@ FRAME_LABELS = [
     "Judicial and institutional accountability failures",
     "Mobilizing anti-corruption"
 ]
+ANNOTATION_SCHEMA = frame_schema(FRAME_LABELS, pool_row=True)
 
 FRAME_COLORS = {
     f"frame_{i}_evidence": color for i, color in enumerate([
@@ -27,85 +35,86 @@ FRAME_COLORS = {
 }
 
 # === HELPERS ===
-def load_session(user_id):
-    path = os.path.join(SESSION_FOLDER, f"{user_id}_session.json")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def session_store():
+    # Sessions, annotation CSV, flag index and journal (see utils/session_store.py)
+    return SessionStore(SESSION_FOLDER, ANNOTATION_FILE, ANNOTATION_SCHEMA, FRAME_LABELS)
 
 def save_session(user_id, session_data):
-    def convert(obj):
-        if isinstance(obj, (np.integer,)):
-            return int(obj)
-        if isinstance(obj, (np.floating,)):
-            return float(obj)
-        if isinstance(obj, (np.ndarray,)):
-            return obj.tolist()
-        raise TypeError(f"Unserializable object {obj} of type {type(obj)}")
-
-    os.makedirs(SESSION_FOLDER, exist_ok=True)
-    path = os.path.join(SESSION_FOLDER, f"{user_id}_session.json")
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(session_data, f, indent=2, default=convert)
-
-@st.cache_data
+    # Compare-and-swap on the session version: a save from another tab of the
+    # same coder since this one loaded is merged in, not overwritten
+    session_store().save_session(user_id, session_data)
+
 def load_articles():
-    return pd.read_csv(DATA_PATH)
+    return get_registry().get(DATA_PATH)
+
+def load_coder_articles(user_id):
+    df = load_articles()
+    indices = coder_indices(ASSIGNMENT_FILE, user_id)
+    if indices is not None:
+        return get_registry().derived(
+            DATA_PATH, ("assigned", user_id, indices.tobytes()), lambda data: data.iloc[indices]
+        )
+    return df
+
+def pool_row(user_id, current):
+    # Join key across coders; "" for coders with their own dataset (uri is the key there)
+    indices = coder_indices(ASSIGNMENT_FILE, user_id)
+    if indices is None or not 0 <= current < len(indices):
+        return ""
+    return int(indices[current])
 
-def fallback_session(user_id):
-    return {"user_id": user_id, "current_index": 0, "annotations": []}
+def load_search_index():
+    return get_registry().derived(DATA_PATH, "search_index", lambda data: load_or_build(DATA_PATH, data))
 
 def safe_load_session(user_id):
-    os.makedirs(SESSION_FOLDER, exist_ok=True)
-    try:
-        return load_session(user_id)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return fallback_session(user_id)
-
-def save_annotation(entry: dict):
-    annotations = []
-    if os.path.exists(ANNOTATION_FILE):
-        try:
-            with open(ANNOTATION_FILE, mode="r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                annotations = list(reader)
-        except Exception as e:
-            print(f"❌ Error reading annotation file: {e}")
-
-    # Remove previous annotation for this user/article
-    annotations = [
-        a for a in annotations
-        if not (a["user_id"] == entry["user_id"] and a["article_index"] == str(entry["article_index"]))
-    ]
-    annotations.append(entry)
-
-    fieldnames = [
-        'user_id', 'article_index', 'notes', 'flagged',
-        'uri', 'original_text', 'translated_text',
-        'political_corruption'
-    ] + [f"{label}_present" for label in FRAME_LABELS]
-
-    try:
-        with open(ANNOTATION_FILE, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(annotations)
-    except Exception as e:
-        print(f"❌ Error writing annotation file: {e}")
+    # With its version, for save_session
+    return session_store().load_saved_session(user_id)
+
+def review_article(user_id, article_index):
+    df = load_coder_articles(user_id)
+    if not 0 <= article_index < len(df):
+        return None
+    return df.iloc[article_index]
+
+def review_page():
+    # Reviewer mode (?review=1): page through flagged articles and resolve them
+    st.subheader("🚩 Flagged articles")
+    store = session_store()
+    path = store.flag_index_path()
+    if not os.path.exists(path):
+        os.makedirs(SESSION_FOLDER, exist_ok=True)
+        rebuild_flags(ANNOTATION_FILE, path)
+    reviewer = st.text_input("Reviewer name", key="reviewer")
+    if not reviewer:
+        st.info("Enter your name to review flagged articles.")
+        st.stop()
+    render_review_queue(
+        path, review_article,
+        lambda user_id, index, resolution, status: store.save_review(reviewer, user_id, index, resolution, status),
+    )
 
 def jump_to(index: int, sess, user_id):
     sess["current_index"] = index
     save_session(user_id, sess)
 
+def note_interaction(user_id, article_index):
+    if st.session_state.get("interacted_index") != article_index:
+        st.session_state["interacted_index"] = article_index
+        get_event_log().record(user_id, article_index, FIRST_INTERACTION)
+
 # === MAIN APP ===
 def main():
     st.set_page_config(layout="wide")
     st.title("📝 Corruption Frame Annotation Tool")
 
+    if st.query_params.get("review") == "1":
+        review_page()
+        return
+
     if "user_id" not in st.session_state:
-        user_id = st.selectbox(
-            "Select your username:",
-            ["Assia", "Alexander", "Elisa", "Luigia", "Yara", "Anne"]
-        )
+        coders = ["Assia", "Alexander", "Elisa", "Luigia", "Yara", "Anne"]
+        coders += [c for c in assignment_coders(ASSIGNMENT_FILE) if c not in coders]
+        user_id = st.selectbox("Select your username:", coders)
         if st.button("Start annotating"):
             st.session_state["user_id"] = user_id
             st.rerun()
@@ -113,9 +122,9 @@ def main():
 
     user_id = st.session_state["user_id"]
     sess = safe_load_session(user_id)
-    df = load_articles()
-    total = len(df)
     current = sess.get("current_index", 0)
+    df = pin_articles(load_coder_articles(user_id), user_id, current)
+    total = len(df)
 
     if current >= total:
         st.success("✅ You have completed all articles!")
@@ -136,36 +145,45 @@ def main():
         jump_to(int(nav), sess, user_id)
         st.rerun()
 
+    def open_search_result(position):
+        jump_to(position, sess, user_id)
+        st.rerun()
+
+    render_search_box(load_search_index, df, sess.get("annotations", {}), FRAME_LABELS, open_search_result)
+
     # ✅ RESET STATE WHEN ARTICLE CHANGES
     if st.session_state.get("last_loaded_index") != current:
         st.session_state["last_loaded_index"] = current
+        st.session_state["telemetry_shown_pending"] = True
 
         for label in FRAME_LABELS:
-            st.session_state[f"{label}_radio"] = "Not Present"
+            st.session_state[f"{label}_radio"] = NOT_PRESENT
         st.session_state["political_corruption"] = "Yes"
         st.session_state["notes"] = ""
         st.session_state["flagged"] = False
 
-        stored = next((a for a in sess.get("annotations", []) if a["article_index"] == current), None)
+        stored = sess.get("annotations", {}).get(current)
         if stored:
             for label in FRAME_LABELS:
-                st.session_state[f"{label}_radio"] = stored.get(f"{label}_present", "Not Present")
+                st.session_state[f"{label}_radio"] = stored.get(f"{label}_present", NOT_PRESENT)
             st.session_state["political_corruption"] = stored.get("political_corruption", "No")
             st.session_state["notes"] = stored.get("notes", "")
-            st.session_state["flagged"] = stored.get("flagged", "False") == "True"
+            st.session_state["flagged"] = stored.get("flagged") == FLAGGED
 
     # === ARTICLE TEXT ===
+    # Long texts: only the first paragraphs are sent until "Show full text"
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**Original Text**")
-        st.write(row.get("combined_text", ""))
+        render_text_panel(row.get("combined_text", ""), "original_panel", (user_id, current))
 
     with col2:
         st.markdown("**Translated Text**")
-        st.write(row.get("translated_text", ""))
+        render_text_panel(row.get("translated_text", ""), "translated_panel", (user_id, current))
 
     # === RATIONALE & CONFIDENCE DISPLAY ===
     st.markdown("### 🧠 Frame-wise rationale & confidence")
+    frames_shown = 0
     for i in range(1, 8):
         name_col = f"frame_{i}_name"
         rationale_col = f"frame_{i}_rationale"
@@ -176,6 +194,10 @@ def main():
         rationale_text = str(row.get(rationale_col, "")).strip()
         confidence_val_raw = row.get(confidence_col, "")
     
+        # Datasets from ingest_dataset.py flag unusable frames (errors, no valid json) up front
+        if not row.get(f"frame_{i}_valid", True):
+            continue
+    
         # ✅ Skip if confidence is missing or not a valid number
         try:
             confidence_float = float(confidence_val_raw)
@@ -193,6 +215,7 @@ def main():
         confidence_text = f"{confidence_float:.0f}"
         warning_icon = " ⚠️" if confidence_float < 90 else ""
     
+        frames_shown += 1
         st.markdown(
             f"<div style='margin-top:10px; padding:10px; border-left: 6px solid {color}; "
             f"background-color:{color}33;'>"
@@ -204,27 +227,40 @@ def main():
         )
 
 
+    if st.session_state.pop("telemetry_shown_pending", False):
+        get_event_log().record(
+            user_id, current, SHOWN,
+            text_length=len(str(row.get("translated_text", ""))),
+            frames_shown=frames_shown
+        )
+
     # === FRAME PRESENCE ===
     st.markdown("### 🏷️ Frame presence")
     frame_selections = {}
     for label in FRAME_LABELS:
         frame_selections[label] = st.radio(
-            f"{label}:", ["Not Present", "Present"], horizontal=True, key=f"{label}_radio"
+            f"{label}:", PRESENCE_VALUES, horizontal=True, key=f"{label}_radio",
+            on_change=note_interaction, args=(user_id, current)
         )
 
     # === POLITICAL CORRUPTION ===
     st.markdown("### 🗳️ Is this article primarily about political corruption?")
     political_corruption = st.radio(
         "Your answer:",
-        ["Yes", "No"],
+        CORRUPTION_VALUES,
         horizontal=True,
         index=0, 
-        key="political_corruption"
+        key="political_corruption",
+        on_change=note_interaction, args=(user_id, current)
     )
 
     # === NOTES + FLAG ===
-    notes = st.text_area("📝 Comments (optional):", key="notes")
-    flagged = st.checkbox("🚩 Flag this article for review", key="flagged")
+    notes = st.text_area(
+        "📝 Comments (optional):", key="notes", on_change=note_interaction, args=(user_id, current)
+    )
+    flagged = st.checkbox(
+        "🚩 Flag this article for review", key="flagged", on_change=note_interaction, args=(user_id, current)
+    )
 
     # === NAVIGATION ===
     col_prev, col_next = st.columns(2)
@@ -242,19 +278,19 @@ def main():
                 "notes": notes,
                 "flagged": str(flagged),
                 "uri": row.get("uri", ""),
+                "pool_row": pool_row(user_id, current),
                 "original_text": row.get("original_text", ""),
                 "translated_text": row.get("translated_text", ""),
                 "political_corruption": political_corruption
             }
             for label in FRAME_LABELS:
                 entry[f"{label}_present"] = frame_selections[label]
+            entry = ANNOTATION_SCHEMA.validate(entry)
 
-            existing = sess.get("annotations", [])
-            existing = [a for a in existing if a["article_index"] != current]
-            existing.append(entry)
-            sess["annotations"] = existing
+            sess.setdefault("annotations", {})[current] = entry
 
-            save_annotation(entry)
+            session_store().save_annotation(entry)
+            get_event_log().record(user_id, current, SAVED)
             sess["current_index"] = current + 1
             save_session(user_id, sess)
             st.rerun()
@@ -1,66 +1,62 @@
 import streamlit as st
 import pandas as pd
 import os
-import csv
+import shutil
 import re
 from typing import List
 import openpyxl
 from utils.annotation_helpers import load_session, save_session
+from utils.annotation_schema import AnnotationSchema, TENTATIVE_LABEL_VALUES, upsert_annotations
+from utils.dataset_registry import get_registry
+from utils.patterns import highlight_keywords
+from utils.text_panel import render_text_panel, paragraph_spans, paragraphs_with
+from utils.write_buffer import DEFAULT_MAX_RECORDS, get_buffer
 
 ANNOTATION_FILE = "annotations.csv"
 #DATA_PATH = "/home/akroon/webdav/ASCOR-FMG-5580-RESPOND-news-data (Projectfolder)/annotations/df_output_with_llm_annotations.csv"
 DATA_PATH = "data/df_copy.csv"
+# Annotations are buffered in this local file and written to the shared
+# folder in batches (ANNOTATOR_SAVE_BATCH / ANNOTATOR_SAVE_INTERVAL).
+PENDING_FILE = "annotations.pending.jsonl"
+
+ANNOTATION_SCHEMA = AnnotationSchema(
+    ['user_id', 'article_index', 'tentative_label', 'notes', 'uri', 'original_text', 'translated_text'],
+    {"tentative_label": TENTATIVE_LABEL_VALUES},
+)
 
 KEY_TERMS = [
     "bribery", "embezzlement", "nepotism", "corruption", "fraud",
     "abuse of power", "favoritism", "money laundering", "kickback", "cronyism"
 ]
 
+def annotation_buffer():
+    return get_buffer(PENDING_FILE, lambda records: write_annotations([r["entry"] for r in records]))
+
 def save_annotation(entry: dict):
-    annotations = []
-
-    if os.path.exists(ANNOTATION_FILE):
-        try:
-            with open(ANNOTATION_FILE, mode="r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                annotations = list(reader)
-        except Exception as e:
-            print(f"❌ Error reading local annotation file: {e}")
-
-    annotations = [
-        a for a in annotations
-        if not (a["user_id"] == entry["user_id"] and a["article_index"] == str(entry["article_index"]))
-    ]
-    annotations.append(entry)
-
-    fieldnames = [
-        'user_id', 'article_index', 'tentative_label', 'notes',
-        'uri', 'original_text', 'translated_text'
-    ]
-
-    # Write local annotations.csv file
+    if DEFAULT_MAX_RECORDS > 1:
+        annotation_buffer().add({"entry": entry})
+    else:
+        write_annotations([entry])
+
+def write_annotations(entries):
+    # Write local annotations.csv file (later entries for an article replace earlier ones)
     try:
-        with open(ANNOTATION_FILE, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(annotations)
+        upsert_annotations(ANNOTATION_FILE, ANNOTATION_SCHEMA, entries)
         print(f"✅ Saved local annotation file: {ANNOTATION_FILE}")
-    except Exception as e:
+    except (OSError, ValueError) as e:
         print(f"❌ Error writing local annotation file: {e}")
+        return
 
     output_dir = "/home/akroon/webdav/ASCOR-FMG-5580-RESPOND-news-data (Projectfolder)/annotations"
     try:
         os.makedirs(output_dir, exist_ok=True)
 
         csv_path = os.path.join(output_dir, "annotations-fyp-yara.csv")
-        with open(csv_path, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(annotations)
+        shutil.copyfile(ANNOTATION_FILE, csv_path)
         print(f"✅ Saved CSV to: {csv_path}")
 
         excel_path = os.path.join(output_dir, "annotations-fyp-yara.xlsx")
-        df = pd.DataFrame(annotations)
+        df = pd.read_csv(ANNOTATION_FILE, dtype=str, keep_default_na=False)
         df.to_excel(excel_path, index=False)
         print(f"✅ Saved Excel to: {excel_path}")
 
@@ -82,22 +78,8 @@ def highlight_translated_text(text: str, highlights: List[str]) -> str:
         )
     return text
 
-def highlight_keywords(text: str, terms: List[str]) -> str:
-    parts = re.split(r'(<[^>]+>)', text)
-    for i, part in enumerate(parts):
-        if not part.startswith("<"):
-            for term in terms:
-                pattern = re.compile(rf"\b{re.escape(term)}\b", re.IGNORECASE)
-                part = pattern.sub(
-                    r"<span style='background-color: #cce5ff; padding: 2px; border-radius: 4px;'>\g<0></span>",
-                    part
-                )
-            parts[i] = part
-    return "".join(parts)
-
-@st.cache_data
 def load_articles():
-    return pd.read_csv(DATA_PATH)
+    return get_registry().get(DATA_PATH)
 
 def jump_to(index: int, sess, user_id):
     sess["current_index"] = index
@@ -114,6 +96,8 @@ def main():
 
     sess = load_session(user_id)
     df = load_articles()
+    if DEFAULT_MAX_RECORDS > 1:
+        annotation_buffer()  # the background flusher also picks up saves left by an earlier run
     total = len(df)
     current = sess.get("current_index", 0)
 
@@ -139,7 +123,7 @@ def main():
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**Original Text**")
-        st.write(row.get("original_text", ""))
+        render_text_panel(row.get("original_text", ""), "original_panel", (user_id, current))
 
     with col2:
         st.markdown("**Translated Text with Highlights**", unsafe_allow_html=True)
@@ -150,9 +134,14 @@ def main():
         if isinstance(llm_raw, str):
             llm_evidence_list = [e.strip() for e in llm_raw.split(";") if e.strip()]
 
-        highlighted = highlight_translated_text(raw_text, llm_evidence_list)
-        highlighted = highlight_keywords(highlighted, KEY_TERMS)
-        st.markdown(highlighted, unsafe_allow_html=True)
+        # Highlighted per paragraph, only for the paragraphs sent to the page
+        render_text_panel(
+            raw_text, "translated_panel", (user_id, current),
+            render_chunk=lambda paragraph: highlight_keywords(
+                highlight_translated_text(paragraph, llm_evidence_list), KEY_TERMS
+            ),
+            show=paragraphs_with(raw_text, paragraph_spans(raw_text), llm_evidence_list)
+        )
 
     st.markdown("""
     <div style="margin-top: 10px;">
@@ -169,7 +158,7 @@ def main():
 
     label = st.radio(
         "Does this article primarily concern political corruption?",
-        ["Yes", "Mentioned but not central", "No", "Unsure"],
+        TENTATIVE_LABEL_VALUES,
         key="label"
     )
 
@@ -185,6 +174,7 @@ def main():
             "original_text": row.get("original_text", ""),
             "translated_text": row.get("translated_text", "")
         }
+        entry = ANNOTATION_SCHEMA.validate(entry)
 
         existing = sess.get("annotations", [])
         existing = [a for a in existing if a["article_index"] != current]
@@ -0,0 +1,165 @@
+"""Kill annotation writes at random points and check nothing acknowledged is lost.
+
+Each round starts a child process that keeps labelling articles through the
+final-sample app's save path and logs every save that returned.  The child is
+either SIGKILLed after a random delay or exits itself at a random os.fsync /
+os.replace call.  The parent then replays the write-ahead journal (as the app
+does on startup) and checks that the annotation CSV and the session parse and
+contain every acknowledged save.
+
+    python -m benchmarks.fault_injection --rounds 50
+"""
+import os
+import io
+import sys
+import csv
+import json
+import random
+import signal
+import shutil
+import tempfile
+import argparse
+import subprocess
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import make_dataset, FRAME_LABELS  # noqa: E402
+
+USER_ID = "coder0"
+N_ARTICLES = 200
+
+
+def import_app(workdir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        import annetator_final_sample as app
+    app.ANNOTATION_FILE = os.path.join(workdir, "annotations.csv")
+    app.SESSION_FOLDER = os.path.join(workdir, "sessions")
+    app.ASSIGNMENT_FILE = os.path.join(workdir, "no_assignment.npz")
+    app.USER_DATASET = {USER_ID: os.path.join(workdir, "sample.csv")}
+    return app
+
+
+def install_faults(rng):
+    """Exit abruptly on a random upcoming os.fsync or os.replace call."""
+    remaining = [rng.randint(1, 60)]
+
+    def wrap(fn):
+        def faulty(*args, **kwargs):
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                os._exit(17)
+            return fn(*args, **kwargs)
+        return faulty
+
+    os.fsync = wrap(os.fsync)
+    os.replace = wrap(os.replace)
+
+
+def child(workdir, seed, self_fault):
+    rng = random.Random(seed)
+    os.chdir(workdir)
+    app = import_app(workdir)
+    df = app.load_coder_articles(USER_ID)
+    sess = app.safe_load_session(USER_ID)
+    if self_fault:
+        install_faults(rng)
+    ack = open(os.path.join(workdir, "acked.jsonl"), "a", encoding="utf-8")
+    while sess["current_index"] < len(df):
+        current = sess["current_index"]
+        selections = {label: rng.choice(["Present", "Not Present"]) for label in FRAME_LABELS}
+        entry = app.build_entry(USER_ID, current, df.iloc[current], selections, "Yes", "", False)
+        sess["current_index"] = current + 1
+        app.store_annotation(USER_ID, sess, entry)
+        ack.write(json.dumps({"article_index": current, "selections": selections}) + "\n")
+        ack.flush()
+
+
+def check(workdir):
+    """Replay the journal and return a list of problems (empty when recovery is complete)."""
+    app = import_app(workdir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.get_journal().replay()
+        # recover_once only flushes leftover buffers once per process; this
+        # process checks every round, so flush the child's buffer explicitly.
+        app.flush_pending_saves(USER_ID)
+        sess = app.safe_load_session(USER_ID)
+    problems = []
+    if any(name.endswith(".corrupt") for name in os.listdir(app.SESSION_FOLDER)):
+        problems.append("session file was unreadable")
+
+    acked = {}
+    ack_path = os.path.join(workdir, "acked.jsonl")
+    if os.path.exists(ack_path):
+        with open(ack_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # the ack itself was torn by the kill
+                acked[record["article_index"]] = record["selections"]
+
+    try:
+        with open(app.ANNOTATION_FILE, "r", encoding="utf-8") as f:
+            stored = {int(r["article_index"]): r for r in csv.DictReader(f)}
+    except FileNotFoundError:
+        stored = {}
+    except (ValueError, KeyError, csv.Error) as e:
+        return problems + [f"annotation CSV unreadable: {e}"]
+
+    for index, selections in acked.items():
+        row = stored.get(index)
+        if row is None:
+            problems.append(f"article {index} acknowledged but missing")
+        elif any(row[f"{label}_present"] != value for label, value in selections.items()):
+            problems.append(f"article {index} stored with different labels")
+    if acked and sess["current_index"] < max(acked) + 1:
+        problems.append(f"session current_index {sess['current_index']} behind acknowledged {max(acked) + 1}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fault-injection check for the durable write layer.")
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", nargs=3, metavar=("WORKDIR", "SEED", "SELF_FAULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        workdir, seed, self_fault = args.child
+        child(workdir, int(seed), self_fault == "1")
+        return
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="annotator-faults-")
+    failures = 0
+    try:
+        make_dataset(N_ARTICLES, n_words=200).to_csv(os.path.join(workdir, "sample.csv"), index=False)
+        for round_no in range(args.rounds):
+            self_fault = rng.random() < 0.5
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.fault_injection", "--child",
+                 workdir, str(rng.randrange(1 << 30)), "1" if self_fault else "0"],
+                cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            if not self_fault:
+                try:
+                    proc.wait(timeout=rng.uniform(1.0, 3.0))
+                except subprocess.TimeoutExpired:
+                    proc.send_signal(signal.SIGKILL)
+            proc.wait()
+            problems = check(workdir)
+            failures += bool(problems)
+            status = "❌" if problems else "✅"
+            how = "self-exit at fsync/replace" if self_fault else "SIGKILL"
+            print(f"{status} round {round_no + 1:>3} ({how}): {'; '.join(problems[:3]) or 'recovered'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'❌' if failures else '✅'} {failures} of {args.rounds} rounds lost acknowledged data.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Headless load test: many simulated coders against one process.
+
+Each simulated coder runs in its own thread, like Streamlit script runs do,
+and drives the final-sample app through the same functions its buttons use:
+login (load dataset + session), label and Next (build_entry +
+store_annotation) or Previous (jump_to), then navigate: what the rerun after
+the button does (session_key and safe_load_session as in run_session, the
+coder's articles, and form_values to restore the stored labels).  Afterwards the annotation CSV and the
+session files are checked for lost or corrupted annotations.
+
+    python -m benchmarks.load_test --coders 1 4 16 --articles 30
+"""
+import os
+import io
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import threading
+import contextlib
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import make_dataset, FRAME_LABELS  # noqa: E402
+from utils.telemetry import get_event_log  # noqa: E402
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def rerun_view(app, user_id):
+    """The article fragments' rerun after Next / Previous, without the Streamlit session state."""
+    app.session_key(user_id)
+    sess = app.safe_load_session(user_id)
+    current = sess.get("current_index", 0)
+    df = app.load_coder_articles(user_id)
+    if current < len(df):
+        app.form_values(sess, current)
+    return sess
+
+
+def simulate_coder(app, user_id, n_articles, think_s, seed, latencies, expected, errors):
+    """Login, then label and Next through `n_articles` articles, going back now and then."""
+    rng = random.Random(seed)
+
+    def timed(action, fn):
+        start = time.perf_counter()
+        result = fn()
+        latencies[action].append(time.perf_counter() - start)
+        return result
+
+    try:
+        df, sess = timed("login", lambda: (app.load_coder_articles(user_id), app.safe_load_session(user_id)))
+        while sess.get("current_index", 0) < min(n_articles, len(df)):
+            current = sess["current_index"]
+            row = df.iloc[current]
+            selections = {label: rng.choice(["Present", "Not Present"]) for label in FRAME_LABELS}
+            corruption = rng.choice(["Yes", "No"])
+            if think_s:
+                time.sleep(rng.uniform(0, 2 * think_s))
+
+            entry = app.build_entry(user_id, current, row, selections, corruption, "", False)
+            if current > 0 and rng.random() < 0.1:
+                # Previous: step back without saving, as the button does
+                timed("previous", lambda: app.jump_to(current - 1, sess, user_id))
+            else:
+                expected[(user_id, current)] = (selections, corruption)
+                sess["current_index"] = current + 1
+                timed("next", lambda: app.store_annotation(user_id, sess, entry))
+            sess = timed("navigate", lambda: rerun_view(app, user_id))
+    except Exception as e:
+        errors.append(f"{user_id}: {type(e).__name__}: {e}")
+
+
+def verify(app, expected):
+    """Count annotations missing from, or different in, the CSV and the sessions."""
+    lost = corrupted = 0
+    try:
+        with open(app.ANNOTATION_FILE, "r", encoding="utf-8") as f:
+            stored = {(r["user_id"], int(r["article_index"])): r for r in csv.DictReader(f)}
+    except (OSError, ValueError, KeyError, csv.Error):
+        return {"lost": len(expected), "corrupted": 0, "csv_readable": False, "sessions_unreadable": None}
+
+    for (user_id, index), (selections, corruption) in expected.items():
+        row = stored.get((user_id, index))
+        if row is None:
+            lost += 1
+        elif row.get("political_corruption") != corruption or any(
+            row.get(f"{label}_present") != value for label, value in selections.items()
+        ):
+            corrupted += 1
+
+    sessions_unreadable = 0
+    for user_id in {u for u, _ in expected}:
+        try:
+            app.load_session(user_id)
+        except (OSError, ValueError):
+            sessions_unreadable += 1
+    return {"lost": lost, "corrupted": corrupted, "csv_readable": True, "sessions_unreadable": sessions_unreadable}
+
+
+def run_level(app, n_coders, n_articles, think_s, workdir):
+    """Run `n_coders` simulated coders at once in a fresh data directory."""
+    level_dir = os.path.join(workdir, f"coders_{n_coders}")
+    os.makedirs(os.path.join(level_dir, "data"), exist_ok=True)
+    data_path = os.path.join(level_dir, "data", "sample.csv")
+    make_dataset(n_articles, n_words=400).to_csv(data_path, index=False)
+
+    app.ANNOTATION_FILE = os.path.join(level_dir, "annotations.csv")
+    app.SESSION_FOLDER = os.path.join(level_dir, "sessions")
+    app.ASSIGNMENT_FILE = os.path.join(level_dir, "no_assignment.npz")
+    app.USER_DATASET = {f"coder{i}": data_path for i in range(n_coders)}
+
+    latencies = defaultdict(list)
+    expected = {}
+    errors = []
+    threads = [
+        threading.Thread(
+            target=simulate_coder,
+            args=(app, f"coder{i}", n_articles, think_s, i, latencies, expected, errors),
+        )
+        for i in range(n_coders)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for i in range(n_coders):
+        # "I'm done for now": write what is still in the coders' save buffers
+        app.flush_pending_saves(f"coder{i}")
+    elapsed = time.perf_counter() - start
+
+    actions = sum(len(v) for v in latencies.values())
+    return {
+        "coders": n_coders,
+        "elapsed_s": elapsed,
+        "actions": actions,
+        "actions_per_s": actions / elapsed if elapsed else None,
+        "latency_ms": {
+            action: {q: percentile(values, p) * 1000 for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+            for action, values in latencies.items()
+        },
+        "errors": errors,
+        **verify(app, expected),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent coders against the annotation app logic.")
+    parser.add_argument("--coders", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--articles", type=int, default=30, help="Articles each coder labels")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between label and Next")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="annotator-load-")
+    results = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import annetator_final_sample as app
+        os.chdir(workdir)
+        for n in args.coders:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run_level(app, n, args.articles, args.think_ms / 1000, workdir)
+            results.append(result)
+            nxt = result["latency_ms"].get("next", {})
+            nav = result["latency_ms"].get("navigate", {})
+            print(
+                f"👥 {n:>3} coders: {result['actions_per_s']:8.1f} actions/s, "
+                f"Next p50 {nxt.get('p50', 0):7.1f} ms p95 {nxt.get('p95', 0):7.1f} ms "
+                f"p99 {nxt.get('p99', 0):7.1f} ms, navigate p50 {nav.get('p50', 0):6.1f} ms "
+                f"p95 {nav.get('p95', 0):7.1f} ms, lost {result['lost']}, corrupted {result['corrupted']}, "
+                f"errors {len(result['errors'])}"
+            )
+    finally:
+        # The event log writes relative to the working directory: flush the
+        # synthetic events into workdir, not the repo's telemetry folder
+        get_event_log().flush()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Benchmarks for the annotation apps' hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --out bench.json
+    python -m benchmarks.run_benchmarks --quick --compare bench.json
+
+Every benchmark works on synthetic data in a temporary directory, so results
+only depend on the code and the machine.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import argparse
+import statistics
+import subprocess
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic import (  # noqa: E402
+    make_dataset, make_text, pick_phrases, make_annotation, make_session,
+)
+import numpy as np  # noqa: E402
+from utils.assignment import build_assignment, add_coder  # noqa: E402
+from utils.dataset_cache import get_dataset_cache  # noqa: E402
+from utils.text_panel import INITIAL_PARAGRAPHS, paragraph_spans, panel_html  # noqa: E402
+
+SIZES = {
+    "full": {
+        "annotation_rows": [100, 1000, 5000],
+        "session_annotations": [10, 100, 1000],
+        "dataset_rows": [250, 2500],
+        "text_words": [500, 2000, 8000],
+        "phrase_counts": [5, 20, 80],
+        "session_files": [10, 100],
+        "pool_sizes": [1000, 20000],
+    },
+    "quick": {
+        "annotation_rows": [100, 1000],
+        "session_annotations": [10, 100],
+        "dataset_rows": [250],
+        "text_words": [500, 2000],
+        "phrase_counts": [5, 20],
+        "session_files": [10],
+        "pool_sizes": [1000],
+    },
+}
+
+
+def measure(fn, repeat, setup=None):
+    """Run `fn` `repeat` times (calling `setup` untimed before each) and return timings."""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the apps' progress prints while timing."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_save_annotation(app, workdir, sizes, repeat):
+    import csv
+    rng = random.Random(0)
+    results = []
+    for n_rows in sizes["annotation_rows"]:
+        path = os.path.join(workdir, f"annotations_{n_rows}.csv")
+        rows = [make_annotation(rng, f"coder{i % 4}", i // 4, {"translated_text": make_text(rng, 300)})
+                for i in range(n_rows)]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        app.ANNOTATION_FILE = path
+        entry = make_annotation(rng, "coder0", 0, {"translated_text": make_text(rng, 300)})
+        with quiet():
+            timing = measure(lambda: app.save_annotation(dict(entry)), repeat)
+        results.append({"name": "save_annotation", "params": {"existing_rows": n_rows}, **timing})
+    return results
+
+
+def bench_sessions(app, workdir, sizes, repeat):
+    results = []
+    app.SESSION_FOLDER = os.path.join(workdir, "sessions")
+    for n in sizes["session_annotations"]:
+        user_id = f"bench{n}"
+        session = make_session(user_id, n, n_words=300)
+        timing = measure(lambda: app.save_session(user_id, session), repeat)
+        results.append({"name": "save_session", "params": {"annotations": n}, **timing})
+        timing = measure(lambda: app.load_session(user_id), repeat)
+        results.append({"name": "load_session", "params": {"annotations": n}, **timing})
+    return results
+
+
+def bench_load_articles(app, workdir, sizes, repeat):
+    results = []
+    for n in sizes["dataset_rows"]:
+        path = os.path.join(workdir, f"dataset_{n}.csv")
+        make_dataset(n, n_words=400).to_csv(path, index=False)
+        timing = measure(lambda: app.load_articles(path), repeat, setup=get_dataset_cache().clear)
+        results.append({"name": "load_articles_cold", "params": {"rows": n}, **timing})
+        app.load_articles(path)
+        timing = measure(lambda: app.load_articles(path), repeat)
+        results.append({"name": "load_articles_warm", "params": {"rows": n}, **timing})
+    return results
+
+
+def bench_highlight(frame_app, sizes, repeat):
+    rng = random.Random(0)
+    results = []
+    for n_words in sizes["text_words"]:
+        text = make_text(rng, n_words)
+        for n_phrases in sizes["phrase_counts"]:
+            phrases = pick_phrases(rng, text, n_phrases)
+            evidence = {f"frame_{1 + i % 7}_evidence": [] for i in range(7)}
+            for i, phrase in enumerate(phrases):
+                evidence[f"frame_{1 + i % 7}_evidence"].append(phrase)
+            with quiet():
+                timing = measure(lambda: frame_app.highlight_multiple_frames(text, evidence), repeat)
+            results.append({
+                "name": "highlight_multiple_frames",
+                "params": {"words": n_words, "phrases": n_phrases}, **timing
+            })
+        highlighted = frame_app.highlight_multiple_frames(text, {"frame_1_evidence": pick_phrases(rng, text, 5)})
+        timing = measure(lambda: frame_app.highlight_keywords(highlighted, frame_app.KEY_TERMS), repeat)
+        results.append({"name": "highlight_keywords", "params": {"words": n_words}, **timing})
+    return results
+
+
+def bench_text_panel(frame_app, sizes, repeat):
+    """Full-text highlighting (what the page used to get) against the collapsed paragraph panel."""
+    rng = random.Random(0)
+    results = []
+    for n_words in sizes["text_words"]:
+        text = make_text(rng, n_words)
+        evidence = {"frame_1_evidence": pick_phrases(rng, text, 5)}
+
+        def highlight(chunk):
+            return frame_app.highlight_keywords(frame_app.highlight_multiple_frames(chunk, evidence), frame_app.KEY_TERMS)
+
+        def collapsed():
+            spans = paragraph_spans(text)
+            return panel_html(text, spans, set(range(INITIAL_PARAGRAPHS)), highlight)
+
+        with quiet():
+            full_timing = measure(lambda: highlight(text), repeat)
+            panel_timing = measure(collapsed, repeat)
+            full_bytes, panel_bytes = len(highlight(text).encode()), len(collapsed().encode())
+        results.append({"name": "text_full_highlight", "params": {"words": n_words},
+                        "payload_bytes": full_bytes, **full_timing})
+        results.append({"name": "text_panel_collapsed", "params": {"words": n_words},
+                        "payload_bytes": panel_bytes, **panel_timing})
+    return results
+
+
+def bench_sync_sessions(copy_sessions, workdir, sizes, repeat):
+    results = []
+    for n_files in sizes["session_files"]:
+        local_dir = os.path.join(workdir, f"sync_local_{n_files}")
+        os.makedirs(local_dir, exist_ok=True)
+        for i in range(n_files):
+            with open(os.path.join(local_dir, f"coder{i}_session.json"), "w", encoding="utf-8") as f:
+                json.dump(make_session(f"coder{i}", 50, n_words=200), f)
+        annotation_file = os.path.join(workdir, f"sync_annotations_{n_files}.csv")
+        shutil.copy2(os.path.join(local_dir, "coder0_session.json"), annotation_file)
+        config = {
+            "local_dir": local_dir,
+            "annotation_file": annotation_file,
+            "webdav_dir": os.path.join(workdir, f"sync_remote_{n_files}"),
+        }
+        with quiet():
+            timing = measure(lambda: copy_sessions.sync_sessions(config), repeat)
+        results.append({"name": "sync_sessions", "params": {"session_files": n_files}, **timing})
+    return results
+
+
+def check_add_coder(before, after, coder, progress):
+    """add_coder must leave every kept article at its position and give the new coder work."""
+    for c, old in before["coders"].items():
+        new = after["coders"][c]
+        if len(new) < min(progress.get(c, 0), len(old)) or not np.array_equal(new, old[:len(new)]):
+            raise ValueError(f"add_coder moved articles {c} keeps (progress {progress})")
+    if len(after["coders"][coder]) <= len(after["coders"][next(iter(before["coders"]))]) // 2:
+        raise ValueError(f"add_coder gave {coder} almost nothing (progress {progress})")
+
+
+def bench_add_coder(sizes, repeat):
+    results = []
+    for n in sizes["pool_sizes"]:
+        assignment = build_assignment(n, ["A", "B"], overlap=0.1)
+        done = len(assignment["coders"]["A"])
+        # One donor finished (nothing left to move), the other not started
+        for progress in [{"A": done, "B": 0}, {"A": 0, "B": done}, {"A": done // 2, "B": done // 2}]:
+            check_add_coder(assignment, add_coder(assignment, "C", progress=progress), "C", progress)
+        timing = measure(lambda: add_coder(assignment, "C", progress={"A": done // 2, "B": 0}), repeat)
+        results.append({"name": "add_coder", "params": {"pool": n}, **timing})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(sizes, repeat):
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="annotator-bench-")
+    try:
+        with quiet():
+            import annetator_final_sample as app
+            import frame_app
+            import copy_sessions  # chdirs to the repo on import
+        os.chdir(workdir)
+        results = []
+        results += bench_save_annotation(app, workdir, sizes, repeat)
+        results += bench_sessions(app, workdir, sizes, repeat)
+        results += bench_load_articles(app, workdir, sizes, repeat)
+        results += bench_highlight(frame_app, sizes, repeat)
+        results += bench_text_panel(frame_app, sizes, repeat)
+        results += bench_sync_sessions(copy_sessions, workdir, sizes, repeat)
+        results += bench_add_coder(sizes, repeat)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def result_key(result):
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(current, baseline, threshold):
+    """Print median ratios against a previous run; returns the number of regressions."""
+    previous = {result_key(r): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n📈 Compared with {baseline['meta'].get('commit')} (threshold ×{threshold})")
+    for result in current["results"]:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        ratio = result["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        marker = "❌" if ratio > threshold else "✅"
+        regressions += ratio > threshold
+        print(f"{marker} {result['name']} {result['params']}: ×{ratio:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the annotation apps' hot paths.")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes for a fast check")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Median ratio counted as regression")
+    args = parser.parse_args()
+
+    report = run_all(SIZES["quick" if args.quick else "full"], args.repeat)
+    for result in report["results"]:
+        print(f"{result['name']:<28} {json.dumps(result['params']):<36} median {result['median_s'] * 1000:9.2f} ms")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import random
+import pandas as pd
+
+# Same frame set as the final-sample app; kept here so generating data does not
+# need Streamlit.
+FRAME_LABELS = [
+    "Foreign influence threat",
+    "Systemic institutional corruption",
+    "Elite collusion",
+    "Politicized investigations",
+    "Authoritarian reformism",
+    "Judicial and institutional accountability failures",
+    "Mobilizing anti-corruption"
+]
+
+WORDS = (
+    "government minister parliament investigation prosecutor court bribery "
+    "embezzlement contract tender party opposition election fraud money "
+    "laundering public funds official report scandal reform protest judge "
+    "commission police cronyism nepotism kickback favoritism agency budget"
+).split()
+
+
+def make_text(rng: random.Random, n_words: int, paragraph_words: int = 80) -> str:
+    """Pseudo-news text of `n_words` words split into paragraphs."""
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    paragraphs = [" ".join(words[i:i + paragraph_words]) for i in range(0, n_words, paragraph_words)]
+    return "\n\n".join(p.capitalize() + "." for p in paragraphs)
+
+
+def pick_phrases(rng: random.Random, text: str, n: int, length: int = 4):
+    """`n` phrases of `length` words taken from `text` (so they can be highlighted)."""
+    words = text.replace("\n", " ").replace(".", "").split()
+    if len(words) <= length:
+        return [" ".join(words)] if words else []
+    phrases = []
+    for _ in range(n):
+        start = rng.randrange(0, len(words) - length)
+        phrases.append(" ".join(words[start:start + length]))
+    return phrases
+
+
+def make_article(rng: random.Random, index: int, n_words: int = 600) -> dict:
+    """One row with the columns of an LLM-annotated input CSV."""
+    translated = make_text(rng, n_words)
+    row = {
+        "uri": f"https://news.example/{index}",
+        "combined_text": make_text(rng, n_words),
+        "original_text": make_text(rng, n_words),
+        "translated_text": translated,
+        "llm_rationale": "The article discusses misuse of public office.",
+        "llm_evidence": "; ".join(pick_phrases(rng, translated, 3)),
+    }
+    for i in range(1, 8):
+        present = rng.random() < 0.4
+        row[f"frame_{i}_name"] = FRAME_LABELS[i - 1] if present else f"NOT {FRAME_LABELS[i - 1]}"
+        row[f"frame_{i}_rationale"] = rng.choice([
+            "The text describes this frame explicitly.",
+            "error: model timeout",
+            "no valid json",
+            "The frame is implied by the quoted officials.",
+        ])
+        row[f"frame_{i}_confidence"] = rng.randint(50, 100)
+        row[f"frame_{i}_evidence"] = "; ".join(pick_phrases(rng, translated, 2)) if present else ""
+    return row
+
+
+def make_dataset(n_articles: int, n_words: int = 600, seed: int = 0) -> pd.DataFrame:
+    """A DataFrame of `n_articles` synthetic articles."""
+    rng = random.Random(seed)
+    return pd.DataFrame([make_article(rng, i, n_words) for i in range(n_articles)])
+
+
+def make_annotation(rng: random.Random, user_id: str, index: int, article: dict = None) -> dict:
+    """An annotation entry shaped like the ones the final-sample app saves."""
+    article = article or {}
+    entry = {
+        "user_id": user_id,
+        "article_index": index,
+        "notes": rng.choice(["", "", "unclear case", "check translation"]),
+        "flagged": str(rng.random() < 0.05),
+        "uri": article.get("uri", f"https://news.example/{index}"),
+        "original_text": article.get("original_text", ""),
+        "translated_text": article.get("translated_text", ""),
+        "political_corruption": rng.choice(["Yes", "No"]),
+        "timestamp": "2025-01-01T12:00:00",
+    }
+    for label in FRAME_LABELS:
+        entry[f"{label}_present"] = rng.choice(["Present", "Not Present"])
+    return entry
+
+
+def make_session(user_id: str, n_annotations: int, n_words: int = 600, seed: int = 0) -> dict:
+    """A session dict with `n_annotations` stored entries (texts included, as the app does)."""
+    rng = random.Random(seed)
+    annotations = [
+        make_annotation(rng, user_id, i, {"translated_text": make_text(rng, n_words)})
+        for i in range(n_annotations)
+    ]
+    return {"user_id": user_id, "current_index": n_annotations, "annotations": annotations}
@@ -0,0 +1,60 @@
+import os
+import time
+import argparse
+import pandas as pd
+from utils.near_duplicates import add_cluster_columns, propagate_labels, THRESHOLD
+
+
+def read_table(path):
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def write_table(df, path):
+    tmp_path = f"{path}.tmp"
+    if path.endswith(".parquet"):
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cluster exact and near-duplicate articles (MinHash/LSH over translated_text)."
+    )
+    parser.add_argument("dataset", help="Dataset CSV or Parquet, e.g. data/final_sample_pool.parquet")
+    parser.add_argument("--out", help="Write the dataset with cluster columns here (default: in place)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Minimum estimated Jaccard similarity")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for MinHash (default: all cores)")
+    parser.add_argument("--propagate", metavar="ANNOTATIONS",
+                        help="Instead: copy labels in this annotation CSV from representatives to cluster members")
+    parser.add_argument("--propagated-out", help="Output CSV for --propagate (default: <annotations>_propagated.csv)")
+    args = parser.parse_args()
+
+    dataset = read_table(args.dataset)
+
+    if args.propagate:
+        if "cluster_id" not in dataset.columns:
+            print(f"❌ {args.dataset} has no cluster columns; run without --propagate first.")
+            raise SystemExit(1)
+        annotations = pd.read_csv(args.propagate)
+        result = propagate_labels(annotations, dataset)
+        out = args.propagated_out or args.propagate[: -len(".csv")] + "_propagated.csv"
+        write_table(result, out)
+        print(f"✅ {len(result) - len(annotations)} labels copied to cluster members; written to {out}")
+        return
+
+    start = time.perf_counter()
+    clustered = add_cluster_columns(dataset, threshold=args.threshold, workers=args.workers)
+    out = args.out or args.dataset
+    write_table(clustered, out)
+
+    duplicates = int((~clustered["is_representative"]).sum())
+    clusters = int((clustered.loc[clustered["is_representative"], "cluster_size"] > 1).sum())
+    print(f"✅ {len(clustered)} articles clustered in {time.perf_counter() - start:.1f} s; written to {out}")
+    print(f"🔁 {duplicates} duplicates in {clusters} clusters "
+          f"({duplicates / max(len(clustered), 1):.1%} of coding time saved with --skip-duplicates).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import json
+import time
+import argparse
+import importlib
+from utils.telemetry import TELEMETRY_FOLDER
+from utils.compaction import compact_annotations, compress_telemetry, audit_trail
+
+# Meant to run on a schedule while the apps are up, e.g. nightly from cron:
+#   15 3 * * * cd /srv/annotator && python compact_annotations.py --app annetator_final_sample
+DEFAULT_ARCHIVE_DIR = "archive"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compact an app's annotation file and archive the superseded rows (the audit trail)."
+    )
+    parser.add_argument("--app", default="annetator_final_sample",
+                        help="App module whose annotation file is compacted")
+    parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR, help="Where the compressed history goes")
+    parser.add_argument("--telemetry", default=TELEMETRY_FOLDER, help="Telemetry folder whose past days are gzipped")
+    parser.add_argument("--show", metavar="USER:INDEX",
+                        help="Only print the audit trail of one coder's annotation of one article")
+    args = parser.parse_args()
+
+    app = importlib.import_module(args.app)
+    schema = app.ANNOTATION_SCHEMA
+    if args.show:
+        user_id, _, index = args.show.rpartition(":")
+        if not user_id or not index.isdigit():
+            print("❌ --show takes USER:INDEX, e.g. Assia:12")
+            raise SystemExit(1)
+        for row in audit_trail(app.ANNOTATION_FILE, schema, args.archive_dir, user_id, int(index)):
+            print(json.dumps(row, ensure_ascii=False))
+        return
+
+    start = time.perf_counter()
+    summary = compact_annotations(app.ANNOTATION_FILE, schema, args.archive_dir)
+    print(f"✅ {app.ANNOTATION_FILE}: {summary['rows']:,} annotations "
+          f"({summary['duplicates']:,} duplicate rows dropped) in {time.perf_counter() - start:.1f} s")
+    if summary["invalid"]:
+        print(f"⚠️ {summary['invalid']:,} rows that do not validate were kept as they are")
+    if summary["archive"]:
+        print(f"📦 {summary['archived']:,} superseded rows archived to {summary['archive']}")
+    compressed = compress_telemetry(args.telemetry)
+    if compressed:
+        print(f"📦 {len(compressed)} telemetry file(s) gzipped in {args.telemetry}")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,8 +26,8 @@ def sync_sessions(config):
         print(f"❌ Map '{local_dir}' niet gevonden.")
         return
 
-    # Copy all .json files in the local directory
-    session_files = [f for f in files if f.lower().endswith(".json")]
+    # Copy all session files (.json sessions/notes and binary .bin sessions)
+    session_files = [f for f in files if f.lower().endswith((".json", ".bin"))]
     if not session_files:
         print("⚠️ Geen sessiebestanden gevonden om te synchroniseren.")
         return
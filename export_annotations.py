@@ -0,0 +1,56 @@
+import time
+import argparse
+import importlib
+from utils.assignment import coder_indices
+from utils.export import read_annotations, country_from_path, export, DEFAULT_CHUNKSIZE, UNKNOWN_COUNTRY, MATCH_NONE
+
+
+def coder_sources(app, user_ids):
+    """user_id -> (data_path, positions or None, country), resolved the way the app loads a coder's articles."""
+    sources = {}
+    assignment_file = getattr(app, "ASSIGNMENT_FILE", None)
+    pool_path = getattr(app, "POOL_PATH", None) or getattr(app, "DATA_PATH", None)
+    user_dataset = getattr(app, "USER_DATASET", {})
+    for user_id in user_ids:
+        indices = coder_indices(assignment_file, user_id) if assignment_file else None
+        if indices is not None:
+            sources[user_id] = (pool_path, indices, UNKNOWN_COUNTRY)
+        elif user_id in user_dataset:
+            sources[user_id] = (user_dataset[user_id], None, country_from_path(user_dataset[user_id], user_id))
+        elif getattr(app, "DATA_PATH", None):
+            sources[user_id] = (app.DATA_PATH, None, UNKNOWN_COUNTRY)
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export annotations joined with LLM predictions and article metadata as partitioned Parquet."
+    )
+    parser.add_argument("--app", default="annetator_final_sample",
+                        help="App module whose annotation file and datasets are exported")
+    parser.add_argument("--out", required=True, help="Output directory, e.g. exports/final_sample")
+    parser.add_argument("--with-text", action="store_true", help="Also copy the article text columns")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Dataset rows joined per chunk")
+    args = parser.parse_args()
+
+    app = importlib.import_module(args.app)
+    start = time.perf_counter()
+    try:
+        annotations = read_annotations(app.ANNOTATION_FILE, getattr(app, "FRAME_LABELS", []))
+    except FileNotFoundError:
+        print(f"❌ No annotation file {app.ANNOTATION_FILE}")
+        raise SystemExit(1)
+    sources = coder_sources(app, annotations["user_id"].unique())
+    summary = export(annotations, sources, args.out, with_text=args.with_text, chunksize=args.chunksize)
+
+    print(f"✅ {summary['annotations']:,} annotations exported to {args.out} "
+          f"({summary['parts']} parts) in {time.perf_counter() - start:.1f} s")
+    print("📊 Matched to the dataset by: " + ", ".join(
+        f"{kind} {count:,}" for kind, count in summary["by_match"].items()
+    ))
+    if summary["by_match"][MATCH_NONE]:
+        print(f"⚠️ {summary['by_match'][MATCH_NONE]:,} annotations have no dataset row (exported without LLM columns).")
+
+
+if __name__ == "__main__":
+    main()
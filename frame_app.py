@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
 import os
-import csv
 import regex as re
 import json
 import numpy as np
@@ -9,6 +8,12 @@ from typing import List
 import html
 import string
 import regex
+from utils.profiling import get_profiler, render_profile_panel
+from utils.annotation_schema import frame_schema, upsert_annotations, PRESENCE_VALUES, NOT_PRESENT
+from utils.dataset_registry import get_registry
+from utils.patterns import highlight_keywords
+from utils.text_panel import render_text_panel
+from utils.evidence_index import build_evidence_index, evidence_paragraphs, evidence_links_html
 
 ANNOTATION_FILE = "annotations.csv"
 DATA_PATH = "data/news_sample_with_7_frames.csv"
@@ -28,6 +33,7 @@ FRAME_LABELS = [
     "Judicial loopholes enabling corruption",
     "Public outrage and call for reform"
 ]
+ANNOTATION_SCHEMA = frame_schema(FRAME_LABELS, political_corruption=False)
 
 FRAME_COLORS = {
     "frame_1_evidence": "#cce5ff",
@@ -59,9 +65,12 @@ def save_session(user_id, session_data):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(session_data, f, indent=2, default=convert)
 
-@st.cache_data
 def load_articles():
-    return pd.read_csv(DATA_PATH)
+    return get_registry().get(DATA_PATH)
+
+def load_evidence_index():
+    # Evidence phrase -> paragraph per article, computed once per dataset version
+    return get_registry().derived(DATA_PATH, "evidence_index", build_evidence_index)
 
 def fallback_session(user_id):
     return {"user_id": user_id, "current_index": 0, "annotations": []}
@@ -74,30 +83,10 @@ def safe_load_session(user_id):
         return fallback_session(user_id)
 
 def save_annotation(entry: dict):
-    annotations = []
-    if os.path.exists(ANNOTATION_FILE):
-        try:
-            with open(ANNOTATION_FILE, mode="r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                annotations = list(reader)
-        except Exception as e:
-            print(f"❌ Error reading local annotation file: {e}")
-
-    annotations = [a for a in annotations if not (a["user_id"] == entry["user_id"] and a["article_index"] == str(entry["article_index"]))]
-    annotations.append(entry)
-
-    fieldnames = [
-        'user_id', 'article_index', 'notes', 'flagged',
-        'uri', 'original_text', 'translated_text'
-    ] + [f"{label}_present" for label in FRAME_LABELS]
-
     try:
-        with open(ANNOTATION_FILE, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(annotations)
+        upsert_annotations(ANNOTATION_FILE, ANNOTATION_SCHEMA, [entry])
         print(f"✅ Saved local annotation file: {ANNOTATION_FILE}")
-    except Exception as e:
+    except (OSError, ValueError) as e:
         print(f"❌ Error writing local annotation file: {e}")
 
 def normalize_text(text):
@@ -150,19 +139,6 @@ def highlight_multiple_frames(text: str, evidence_dict: dict) -> str:
     return text
 
 
-def highlight_keywords(text: str, terms: List[str]) -> str:
-    parts = re.split(r'(<[^>]+>)', text)
-    for i, part in enumerate(parts):
-        if not part.startswith("<"):
-            for term in terms:
-                pattern = re.compile(rf"\\b{re.escape(term)}\\b", re.IGNORECASE)
-                part = pattern.sub(
-                    r"<span style='background-color: #cce5ff; padding: 2px; border-radius: 4px;'>\\g<0></span>",
-                    part
-                )
-            parts[i] = part
-    return "".join(parts)
-
 def jump_to(index: int, sess, user_id):
     sess["current_index"] = index
     save_session(user_id, sess)
@@ -171,13 +147,16 @@ def jump_to(index: int, sess, user_id):
 def main():
     st.set_page_config(layout="wide")
     st.title("📝 Frame Classification Annotation Tool")
+    profiler = get_profiler()
 
     user_id = st.text_input("Enter your username:")
     if not user_id:
         st.stop()
 
-    sess = safe_load_session(user_id)
-    df = load_articles()
+    with profiler.phase("load_session"):
+        sess = safe_load_session(user_id)
+    with profiler.phase("load_articles"):
+        df = load_articles()
     total = len(df)
     current = sess.get("current_index", 0)
 
@@ -186,6 +165,7 @@ def main():
         st.stop()
 
     row = df.iloc[current]
+    evidence_index = load_evidence_index().get(row.name, {})
 
     st.subheader(f"Article {current + 1} of {total}")
     st.number_input(
@@ -197,19 +177,19 @@ def main():
 
     if st.session_state.get("reset_frames", False):
         for label in FRAME_LABELS:
-            st.session_state[f"{label}_radio"] = "Not Present"
+            st.session_state[f"{label}_radio"] = NOT_PRESENT
         st.session_state["notes"] = ""
         st.session_state["flagged"] = False
         st.session_state["reset_frames"] = False
 
     for label in FRAME_LABELS:
         if f"{label}_radio" not in st.session_state:
-            st.session_state[f"{label}_radio"] = "Not Present"
+            st.session_state[f"{label}_radio"] = NOT_PRESENT
 
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**Original Text**")
-        st.write(row.get("combined_text", ""))
+        render_text_panel(row.get("combined_text", ""), "original_panel", (user_id, current))
 
     with col2:
         st.markdown("**Translated Text with Highlights**", unsafe_allow_html=True)
@@ -222,13 +202,18 @@ def main():
             if val_str:
                 evidence_dict[col_name] = [e.strip() for e in val_str.split(";") if e.strip()]
 
-        base_text = html.unescape(raw_text)
-        highlighted_evidence = highlight_multiple_frames(base_text, evidence_dict)
-        highlighted_full = highlight_keywords(highlighted_evidence, KEY_TERMS)
-
-        st.markdown(
-            f"<div style='border:1px solid #ddd; padding:10px; overflow:visible;'>{highlighted_full}</div>",
-            unsafe_allow_html=True
+        # Highlighting runs per paragraph, and only for the paragraphs sent to
+        # the page: the first few plus every paragraph with evidence
+        def highlight_paragraph(paragraph):
+            with profiler.phase("highlight_multiple_frames"):
+                highlighted_evidence = highlight_multiple_frames(paragraph, evidence_dict)
+            with profiler.phase("highlight_keywords"):
+                return highlight_keywords(highlighted_evidence, KEY_TERMS)
+
+        base_text = html.unescape(raw_text) if isinstance(raw_text, str) else ""
+        render_text_panel(
+            base_text, "translated_panel", (user_id, current), render_chunk=highlight_paragraph,
+            show=evidence_paragraphs(evidence_index), anchor="translated"
         )
 
     st.markdown("---")
@@ -245,7 +230,6 @@ def main():
         evidence_text = str(evidence_val).strip() if pd.notna(evidence_val) else ""
         rationale_text = str(rationale_val).strip() if pd.notna(rationale_val) else ""
 
-        phrases = [p.strip() for p in evidence_text.split(";") if p.strip()] if evidence_text else []
 
         if evidence_text or rationale_text:
             st.markdown(
@@ -253,16 +237,19 @@ def main():
                 f"background-color:{color}33;'>"
                 f"<b style='color:{color};'>🟩 {frame_label}</b><br><br>"
                 f"<i><u>Rationale:</u></i><br> {rationale_text or '—'}<br><br>"
-                f"<i><u>Evidence Phrases:</u></i> {', '.join(phrases) if phrases else '—'}"
+                f"<i><u>Evidence Phrases:</u></i><br> "
+                f"{evidence_links_html(evidence_index[i], 'translated') if evidence_index.get(i) else '—'}"
                 f"</div>",
                 unsafe_allow_html=True
             )
 
+    render_profile_panel(profiler)
+
     st.markdown("### 🏷️ Frame presence")
     frame_selections = {}
     for label in FRAME_LABELS:
         frame_selections[label] = st.radio(
-            f"{label}:", ["Not Present", "Present"], horizontal=True, key=f"{label}_radio"
+            f"{label}:", PRESENCE_VALUES, horizontal=True, key=f"{label}_radio"
         )
 
     notes = st.text_area("📝 Comments (optional):", key="notes")
@@ -289,17 +276,21 @@ def main():
             }
             for label in FRAME_LABELS:
                 entry[f"{label}_present"] = frame_selections[label]
+            entry = ANNOTATION_SCHEMA.validate(entry)
 
             existing = sess.get("annotations", [])
             existing = [a for a in existing if a["article_index"] != current]
             existing.append(entry)
             sess["annotations"] = existing
 
-            save_annotation(entry)
+            with profiler.phase("save_annotation"):
+                save_annotation(entry)
             sess["current_index"] = current + 1
-            save_session(user_id, sess)
+            with profiler.phase("save_session"):
+                save_session(user_id, sess)
             st.session_state["reset_frames"] = True
             st.rerun()
 
 if __name__ == "__main__":
-    main()
+    with get_profiler().rerun():
+        main()
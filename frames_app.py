@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
 import os
-import csv
 import json
 import numpy as np
+from utils.annotation_schema import frame_schema, upsert_annotations, PRESENCE_VALUES, NOT_PRESENT, CORRUPTION_VALUES, FLAGGED
+from utils.dataset_registry import get_registry
+from utils.text_panel import render_text_panel
 
 # === CONFIG ===
 ANNOTATION_FILE = "annotations_icr2.csv"
@@ -19,6 +21,8 @@ FRAME_LABELS = [
     "Judicial and institutional accountability failures",
     "Mobilizing anti-corruption"
 ]
+# Same columns as annetator_no_frames.py, which writes the same file
+ANNOTATION_SCHEMA = frame_schema(FRAME_LABELS, pool_row=True)
 
 FRAME_COLORS = {
     f"frame_{i}_evidence": color for i, color in enumerate([
@@ -47,9 +51,8 @@ def save_session(user_id, session_data):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(session_data, f, indent=2, default=convert)
 
-@st.cache_data
 def load_articles():
-    return pd.read_csv(DATA_PATH)
+    return get_registry().get(DATA_PATH)
 
 def fallback_session(user_id):
     return {"user_id": user_id, "current_index": 0, "annotations": []}
@@ -62,34 +65,11 @@ def safe_load_session(user_id):
         return fallback_session(user_id)
 
 def save_annotation(entry: dict):
-    annotations = []
-    if os.path.exists(ANNOTATION_FILE):
-        try:
-            with open(ANNOTATION_FILE, mode="r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                annotations = list(reader)
-        except Exception as e:
-            print(f"❌ Error reading annotation file: {e}")
-
-    # Remove previous annotation for this user/article
-    annotations = [
-        a for a in annotations
-        if not (a["user_id"] == entry["user_id"] and a["article_index"] == str(entry["article_index"]))
-    ]
-    annotations.append(entry)
-
-    fieldnames = [
-        'user_id', 'article_index', 'notes', 'flagged',
-        'uri', 'original_text', 'translated_text',
-        'political_corruption'
-    ] + [f"{label}_present" for label in FRAME_LABELS]
-
+    # Replaces the previous annotation for this user/article; an unreadable
+    # file is left as it is rather than rewritten with only this entry
     try:
-        with open(ANNOTATION_FILE, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(annotations)
-    except Exception as e:
+        upsert_annotations(ANNOTATION_FILE, ANNOTATION_SCHEMA, [entry])
+    except (OSError, ValueError) as e:
         print(f"❌ Error writing annotation file: {e}")
 
 def jump_to(index: int, sess, user_id):
@@ -141,7 +121,7 @@ def main():
         st.session_state["last_loaded_index"] = current
 
         for label in FRAME_LABELS:
-            st.session_state[f"{label}_radio"] = "Not Present"
+            st.session_state[f"{label}_radio"] = NOT_PRESENT
         st.session_state["political_corruption"] = "Yes"
         st.session_state["notes"] = ""
         st.session_state["flagged"] = False
@@ -149,20 +129,21 @@ def main():
         stored = next((a for a in sess.get("annotations", []) if a["article_index"] == current), None)
         if stored:
             for label in FRAME_LABELS:
-                st.session_state[f"{label}_radio"] = stored.get(f"{label}_present", "Not Present")
+                st.session_state[f"{label}_radio"] = stored.get(f"{label}_present", NOT_PRESENT)
             st.session_state["political_corruption"] = stored.get("political_corruption", "No")
             st.session_state["notes"] = stored.get("notes", "")
-            st.session_state["flagged"] = stored.get("flagged", "False") == "True"
+            st.session_state["flagged"] = stored.get("flagged") == FLAGGED
 
     # === ARTICLE TEXT ===
+    # Long texts: only the first paragraphs are sent until "Show full text"
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**Original Text**")
-        st.write(row.get("combined_text", ""))
+        render_text_panel(row.get("combined_text", ""), "original_panel", (user_id, current))
 
     with col2:
         st.markdown("**Translated Text**")
-        st.write(row.get("translated_text", ""))
+        render_text_panel(row.get("translated_text", ""), "translated_panel", (user_id, current))
 
     # === RATIONALE & EVIDENCE ===
     st.markdown("### 🧠 Frame-wise rationale & evidence")
@@ -194,14 +175,14 @@ def main():
     frame_selections = {}
     for label in FRAME_LABELS:
         frame_selections[label] = st.radio(
-            f"{label}:", ["Not Present", "Present"], horizontal=True, key=f"{label}_radio"
+            f"{label}:", PRESENCE_VALUES, horizontal=True, key=f"{label}_radio"
         )
 
     # === POLITICAL CORRUPTION ===
     st.markdown("### 🗳️ Is this article primarily about political corruption?")
     political_corruption = st.radio(
         "Your answer:",
-        ["Yes", "No"],
+        CORRUPTION_VALUES,
         horizontal=True,
         index=0, 
         key="political_corruption"
@@ -233,6 +214,7 @@ def main():
             }
             for label in FRAME_LABELS:
                 entry[f"{label}_present"] = frame_selections[label]
+            entry = ANNOTATION_SCHEMA.validate(entry)
 
             existing = sess.get("annotations", [])
             existing = [a for a in existing if a["article_index"] != current]
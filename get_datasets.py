@@ -21,7 +21,11 @@ def copy_file(file_path):
     filename = os.path.basename(file_path)
     destination_file = os.path.join(destination_dir, filename)
     try:
-        shutil.copy2(file_path, destination_file)
+        # Copy next to the target and rename, so running apps (which hot-reload
+        # changed datasets) never read a half-copied file
+        tmp_file = destination_file + ".tmp"
+        shutil.copy2(file_path, tmp_file)
+        os.replace(tmp_file, destination_file)
         print(f"✅ Bestand succesvol gekopieerd naar: {destination_file}")
     except Exception as e:
         print(f"❌ Fout bij kopiëren van {file_path}: {e}")
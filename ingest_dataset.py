@@ -0,0 +1,39 @@
+import time
+import argparse
+from utils.ingest import ingest, DEFAULT_CHUNKSIZE
+
+
+def report_progress(input_path, summary):
+    print(f"   {input_path}: {summary['rows_read']:,} rows read, {summary['rows_written']:,} written", end="\r")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream LLM-annotated CSVs into one validated, deduplicated Parquet dataset."
+    )
+    parser.add_argument("inputs", nargs="+", help="Input CSV file(s), deduplicated by uri across all")
+    parser.add_argument("--out", required=True, help="Output .parquet file, e.g. data/final_sample_pool.parquet")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows parsed per chunk")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        summary = ingest(args.inputs, args.out, chunksize=args.chunksize, progress=report_progress)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Ingestion failed: {e}")
+        raise SystemExit(1)
+    print()
+    print(f"✅ {summary['rows_written']:,} articles written to {args.out} in {time.perf_counter() - start:.1f} s")
+    if summary["duplicates"]:
+        print(f"⚠️ {summary['duplicates']:,} duplicate uri rows dropped.")
+    if summary["rows_flagged"]:
+        print(f"⚠️ {summary['rows_flagged']:,} articles have quality flags (see the quality_flags column).")
+    if summary["evidence_not_found"]:
+        print(f"⚠️ {summary['evidence_not_found']:,} articles cite evidence that is not in their translated text.")
+    print("📊 Frame status counts: " + ", ".join(
+        f"{status} {count:,}" for status, count in sorted(summary["status_counts"].items())
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from utils.assignment import (
+    build_assignment, add_articles, add_coder,
+    load_assignment, save_assignment,
+)
+from utils.session_format import read_header
+
+# Defaults for the final sample; override on the command line for other studies.
+CONFIG = {
+    "pool": "data/final_sample_pool.csv",
+    "out": "assignments/final_sample.npz",
+    "session_folder": "sessions_final",
+}
+
+
+def pool_size(pool_path):
+    """Number of articles in the pool (Parquet footer, or only the first CSV column parsed)."""
+    if pool_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(pool_path).metadata.num_rows
+    return len(pd.read_csv(pool_path, usecols=[0]))
+
+
+def duplicate_positions(pool_path):
+    """Pool positions that are not their cluster's representative (see cluster_articles.py)."""
+    if pool_path.endswith(".parquet"):
+        flags = pd.read_parquet(pool_path, columns=["is_representative"])["is_representative"]
+    else:
+        flags = pd.read_csv(pool_path, usecols=["is_representative"])["is_representative"]
+    return np.flatnonzero(~flags.astype(bool).to_numpy())
+
+
+def coder_progress(session_folder, coders):
+    """current_index per coder, read from their session files."""
+    progress = {}
+    for coder in coders:
+        path = os.path.join(session_folder, f"{coder}_session")
+        try:
+            if os.path.exists(path + ".bin"):
+                with open(path + ".bin", "rb") as f:
+                    progress[coder] = int(read_header(f.read())[0]["current_index"])
+            else:
+                with open(path + ".json", "r", encoding="utf-8") as f:
+                    progress[coder] = int(json.load(f).get("current_index", 0))
+        except (FileNotFoundError, ValueError):
+            progress[coder] = 0
+    return progress
+
+
+def summarize(assignment):
+    meta = assignment["meta"]
+    print(f"📦 Pool: {meta['pool_size']} articles, overlap {meta['overlap']:.0%}, seed {meta['seed']}")
+    for coder, indices in assignment["coders"].items():
+        print(f"   {coder}: {len(indices)} articles")
+    if len(assignment.get("skipped", [])):
+        print(f"🔁 {len(assignment['skipped'])} near-duplicate articles skipped.")
+    if len(assignment["unassigned"]):
+        print(f"⚠️ {len(assignment['unassigned'])} articles did not fit within coder capacity.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or incrementally rebalance coder assignments.")
+    parser.add_argument("--pool", default=CONFIG["pool"], help="Article pool (CSV or Parquet from ingest_dataset.py)")
+    parser.add_argument("--out", default=CONFIG["out"], help="Assignment file (.npz)")
+    parser.add_argument("--sessions", default=CONFIG["session_folder"], help="Session folder (for progress)")
+    parser.add_argument("--coders", nargs="+", help="Coders for a fresh assignment")
+    parser.add_argument("--overlap", type=float, default=0.1, help="Fraction coded by everyone")
+    parser.add_argument("--capacity", type=int, default=None, help="Maximum articles per coder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--add-coder", help="Add one coder to an existing assignment")
+    parser.add_argument("--grow", action="store_true", help="Assign rows appended to the pool")
+    parser.add_argument("--skip-duplicates", action="store_true",
+                        help="Only hand out cluster representatives (pool clustered by cluster_articles.py)")
+    args = parser.parse_args()
+
+    skip = duplicate_positions(args.pool) if args.skip_duplicates else None
+
+    if args.coders:
+        assignment = build_assignment(
+            pool_size(args.pool), args.coders,
+            overlap=args.overlap, capacity=args.capacity, seed=args.seed, skip=skip
+        )
+    else:
+        assignment = load_assignment(args.out)
+        if args.grow:
+            assignment = add_articles(assignment, pool_size(args.pool), skip=skip)
+        if args.add_coder:
+            progress = coder_progress(args.sessions, assignment["meta"]["coders"])
+            assignment = add_coder(assignment, args.add_coder, progress=progress, capacity=args.capacity)
+
+    save_assignment(args.out, assignment)
+    print(f"✅ Assignment written to {args.out}")
+    summarize(assignment)
+
+
+if __name__ == "__main__":
+    main()
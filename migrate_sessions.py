@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import argparse
+from utils.durable import atomic_write, atomic_write_json
+from utils.session_format import encode_session, decode_records, decode_session, export_json
+
+# Same frame labels (and bit order) as annetator_final_sample.py / annetator_no_frames.py
+FRAME_LABELS = [
+    "Foreign influence threat",
+    "Systemic institutional corruption",
+    "Elite collusion",
+    "Politicized investigations",
+    "Authoritarian reformism",
+    "Judicial and institutional accountability failures",
+    "Mobilizing anti-corruption"
+]
+
+
+def migrate_file(json_path, frame_labels=FRAME_LABELS):
+    """Convert one `<user>_session.json` to `<user>_session.bin` + `<user>_notes.json`.
+
+    Returns (json bytes, binary bytes, json parse seconds, record parse seconds,
+    full decode seconds).
+    The JSON file is left in place; the apps prefer the binary file once it exists.
+    """
+    with open(json_path, "rb") as f:
+        raw = f.read()
+    start = time.perf_counter()
+    session = json.loads(raw)
+    json_parse = time.perf_counter() - start
+
+    data, notes = encode_session(session, frame_labels)
+    base = json_path[: -len("_session.json")]
+    atomic_write_json(f"{base}_notes.json", notes, indent=None)
+    atomic_write(f"{base}_session.bin", lambda f: f.write(data), binary=True)
+
+    start = time.perf_counter()
+    decode_records(data)
+    record_parse = time.perf_counter() - start
+    start = time.perf_counter()
+    decode_session(data, notes)
+    full_decode = time.perf_counter() - start
+    return len(raw), len(data), json_parse, record_parse, full_decode
+
+
+def migrate_folder(folder):
+    files = sorted(f for f in os.listdir(folder) if f.endswith("_session.json"))
+    if not files:
+        print(f"⚠️ No JSON session files found in '{folder}'.")
+        return
+    for filename in files:
+        try:
+            json_size, bin_size, json_parse, record_parse, full_decode = migrate_file(os.path.join(folder, filename))
+        except (ValueError, KeyError) as e:
+            print(f"❌ {filename} not migrated: {e}")
+            continue
+        print(
+            f"✅ {filename}: {json_size / 1024:.1f} KB → {bin_size / 1024:.1f} KB "
+            f"(×{json_size / max(bin_size, 1):.0f} smaller), parse "
+            f"{json_parse * 1000:.2f} ms → {record_parse * 1000:.3f} ms "
+            f"(as dicts: {full_decode * 1000:.2f} ms)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate JSON sessions to the binary format, or export one.")
+    parser.add_argument("folder", help="Session folder, e.g. sessions_final")
+    parser.add_argument("--export", metavar="USER_ID", help="Print a binary session as JSON instead")
+    args = parser.parse_args()
+
+    if args.export:
+        base = os.path.join(args.folder, args.export)
+        with open(f"{base}_session.bin", "rb") as f:
+            data = f.read()
+        notes = {}
+        if os.path.exists(f"{base}_notes.json"):
+            with open(f"{base}_notes.json", "r", encoding="utf-8") as f:
+                notes = json.load(f)
+        print(export_json(data, notes))
+        return
+
+    migrate_folder(args.folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+from server import STUDIES, check_annotation_files, load_study
+from utils.shared_state import export_arrow
+
+
+def study_datasets():
+    """Every dataset file the hosted studies read (that exists here)."""
+    paths = []
+    for url_path in STUDIES:
+        try:
+            module = load_study(url_path)
+        except ImportError as e:
+            print(f"⚠️ Skipping {url_path}: {e}")
+            continue
+        candidates = [getattr(module, "DATA_PATH", None), getattr(module, "POOL_PATH", None)]
+        candidates += list(getattr(module, "USER_DATASET", {}).values())
+        paths += [p for p in candidates if p and os.path.exists(p) and p not in paths]
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run several Streamlit workers of server.py that share datasets and session state."
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--port", type=int, default=8501, help="Port of the first worker (the others follow)")
+    parser.add_argument("--backend", default="files", choices=["files", "local"],
+                        help="Shared state backend (local is only correct with one worker)")
+    args = parser.parse_args()
+    if args.backend == "local" and args.workers > 1:
+        print("❌ The local backend keeps state per process; use --backend files with several workers.")
+        raise SystemExit(1)
+
+    try:
+        check_annotation_files()
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    # Write the Arrow copies once here instead of racing for them in every worker
+    start = time.perf_counter()
+    for path in study_datasets():
+        print(f"📦 {export_arrow(path)}")
+    print(f"✅ Shared datasets ready in {time.perf_counter() - start:.1f} s")
+
+    env = dict(os.environ, ANNOTATOR_SHARED_DATASETS="1", ANNOTATOR_SHARED_STATE=args.backend)
+    ports = [args.port + i for i in range(args.workers)]
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", "server.py",
+             "--server.port", str(port), "--server.headless", "true"],
+            env=env,
+        )
+        for port in ports
+    ]
+    print(f"🚀 {len(workers)} worker(s) on port(s) {', '.join(map(str, ports))}; "
+          "put them behind a proxy with sticky sessions (one websocket per coder tab).")
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+if __name__ == "__main__":
+    main()
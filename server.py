@@ -0,0 +1,90 @@
+import os
+import importlib
+import streamlit as st
+from utils.profiling import get_profiler
+
+# === CONFIG ===
+# Studies hosted by this server: URL path -> (title, icon, app module).
+# Every module keeps its own ANNOTATION_FILE / SESSION_FOLDER; what they share
+# is the process: the dataset registry (each CSV parsed once, hot-reloaded),
+# compiled keyword patterns, write journals/file locks and the telemetry log.
+STUDIES = {
+    "final-sample": ("Final sample", "📝", "annetator_final_sample"),
+    "icr2": ("ICR2", "🧪", "annetator_no_frames"),
+    "frames-pilot": ("Frames pilot", "🖍️", "frame_app"),
+    "corruption": ("Corruption yes/no", "⚖️", "app"),
+}
+
+# Module settings overridden when a study is hosted here.  Run from this folder,
+# the frames pilot and corruption yes/no apps both write annotations.csv with
+# different columns, and each rewrite would drop the other's: hosted together,
+# the corruption app gets its own file (copy its rows over when switching).
+STUDY_CONFIG = {
+    "corruption": {"ANNOTATION_FILE": "annotations_corruption.csv"},
+}
+
+# === HELPERS ===
+def load_study(url_path):
+    """The study's app module, with its STUDY_CONFIG overrides applied."""
+    module = importlib.import_module(STUDIES[url_path][2])
+    for name, value in STUDY_CONFIG.get(url_path, {}).items():
+        setattr(module, name, value)
+    return module
+
+
+def check_annotation_files():
+    """Refuse to host two studies that write the same annotation file.
+
+    Studies whose app cannot be imported here are skipped (they cannot write).
+    """
+    owners = {}
+    for url_path in STUDIES:
+        try:
+            module = load_study(url_path)
+        except ImportError as e:
+            print(f"⚠️ Skipping {url_path}: {e}")
+            continue
+        path = os.path.abspath(module.ANNOTATION_FILE)
+        if path in owners:
+            raise ValueError(
+                f"Studies {owners[path]!r} and {url_path!r} both write {module.ANNOTATION_FILE}; "
+                "give one of them its own ANNOTATION_FILE in STUDY_CONFIG"
+            )
+        owners[path] = url_path
+
+
+@st.cache_resource
+def checked_studies():
+    """Run check_annotation_files once per process (it raises again on every rerun until fixed)."""
+    check_annotation_files()
+    return True
+
+
+def study_page(url_path):
+    title, icon, _ = STUDIES[url_path]
+
+    def run():
+        # The study apps use the same session_state keys (user_id, notes, ...),
+        # so a coder switching study starts from a clean state.
+        if st.session_state.get("active_study") != url_path:
+            st.session_state.clear()
+            st.session_state["active_study"] = url_path
+        module = load_study(url_path)
+        with get_profiler().rerun():
+            module.main()
+
+    return st.Page(run, title=title, icon=icon, url_path=url_path)
+
+
+def home():
+    st.title("📚 Annotation studies")
+    st.write("Choose the study you were asked to code. You can bookmark its address.")
+    for page in PAGES:
+        st.page_link(page)
+
+# === MAIN APP ===
+PAGES = [study_page(url_path) for url_path in STUDIES]
+
+if __name__ == "__main__":
+    checked_studies()
+    st.navigation([st.Page(home, title="Studies", icon="📚", default=True)] + PAGES).run()
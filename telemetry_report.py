@@ -0,0 +1,113 @@
+import json
+import argparse
+import pandas as pd
+from utils.telemetry import TELEMETRY_FOLDER, SHOWN, FIRST_INTERACTION, SAVED, read_events
+
+# Gaps between a coder's consecutive events longer than this count as idle time
+# and are left out of the active hours used for articles/hour.
+IDLE_THRESHOLD_SECONDS = 300
+
+TEXT_LENGTH_BINS = [0, 2000, 5000, 10000, float("inf")]
+TEXT_LENGTH_LABELS = ["<2k", "2k-5k", "5k-10k", ">10k"]
+
+
+def article_timings(events: pd.DataFrame) -> pd.DataFrame:
+    """One row per saved article: time from last `shown` to `saved`, plus context."""
+    events = events.sort_values("ts")
+    key = ["user_id", "article_index"]
+    shown = events[events["event"] == SHOWN][key + ["ts", "text_length", "frames_shown"]]
+    first = events[events["event"] == FIRST_INTERACTION][key + ["ts"]]
+    saved = events[events["event"] == SAVED][key + ["ts"]]
+
+    timings = pd.merge_asof(
+        saved.rename(columns={"ts": "saved_ts"}).sort_values("saved_ts"),
+        shown.rename(columns={"ts": "shown_ts"}).sort_values("shown_ts"),
+        left_on="saved_ts", right_on="shown_ts", by=key, direction="backward",
+    )
+    timings = pd.merge_asof(
+        timings.sort_values("saved_ts"),
+        first.rename(columns={"ts": "first_ts"}).sort_values("first_ts"),
+        left_on="saved_ts", right_on="first_ts", by=key, direction="backward",
+    )
+    timings["seconds"] = timings["saved_ts"] - timings["shown_ts"]
+    timings["seconds_to_first_interaction"] = timings["first_ts"] - timings["shown_ts"]
+    timings.loc[timings["first_ts"] < timings["shown_ts"], "seconds_to_first_interaction"] = None
+    timings["text_length_bin"] = pd.cut(
+        timings["text_length"], TEXT_LENGTH_BINS, labels=TEXT_LENGTH_LABELS, right=False
+    )
+    return timings.dropna(subset=["seconds"])
+
+
+def idle_gaps(events: pd.DataFrame, threshold=IDLE_THRESHOLD_SECONDS) -> pd.DataFrame:
+    """Gaps between a coder's consecutive events longer than `threshold` seconds."""
+    events = events.sort_values(["user_id", "ts"])
+    gaps = events.groupby("user_id")["ts"].diff()
+    idle = events.assign(gap=gaps)
+    return idle[idle["gap"] > threshold][["user_id", "article_index", "ts", "gap"]]
+
+
+def coder_throughput(events: pd.DataFrame, threshold=IDLE_THRESHOLD_SECONDS) -> pd.DataFrame:
+    """Saved articles per active hour, per coder."""
+    events = events.sort_values(["user_id", "ts"])
+    gaps = events.groupby("user_id")["ts"].diff().fillna(0)
+    active = gaps.where(gaps <= threshold, 0).groupby(events["user_id"]).sum() / 3600
+    idle = gaps.where(gaps > threshold, 0).groupby(events["user_id"]).sum() / 3600
+    saved = events[events["event"] == SAVED].groupby("user_id")["article_index"].nunique()
+    result = pd.DataFrame({"articles_saved": saved, "active_hours": active, "idle_hours": idle}).fillna(0)
+    result["articles_per_hour"] = result["articles_saved"] / result["active_hours"].where(result["active_hours"] > 0)
+    return result
+
+
+def distribution(timings: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Count, median and p90 seconds per article, grouped by `by`."""
+    grouped = timings.groupby(by, observed=True)["seconds"]
+    return pd.DataFrame({
+        "articles": grouped.size(),
+        "median_seconds": grouped.median(),
+        "p90_seconds": grouped.quantile(0.9),
+    })
+
+
+def build_report(folder=TELEMETRY_FOLDER):
+    events = pd.DataFrame(read_events(folder))
+    if events.empty:
+        return None
+    for col in ["text_length", "frames_shown"]:
+        if col not in events:
+            events[col] = None
+    timings = article_timings(events)
+    return {
+        "throughput": coder_throughput(events),
+        "by_text_length": distribution(timings, "text_length_bin"),
+        "by_frames_shown": distribution(timings, "frames_shown"),
+        "slowest_articles": timings.nlargest(10, "seconds")[["user_id", "article_index", "seconds", "text_length"]],
+        "idle_gaps": idle_gaps(events),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize coder timing telemetry.")
+    parser.add_argument("--folder", default=TELEMETRY_FOLDER)
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = build_report(args.folder)
+    if report is None:
+        print(f"⚠️ No telemetry events found in '{args.folder}'.")
+        return
+
+    for name, table in report.items():
+        print(f"\n📊 {name.replace('_', ' ').capitalize()}")
+        print(table.to_string())
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {name: json.loads(table.reset_index().to_json(orient="records")) for name, table in report.items()},
+                f, indent=2
+            )
+        print(f"\n✅ Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
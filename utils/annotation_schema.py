@@ -0,0 +1,258 @@
+import os
+import csv
+import json
+import math
+from datetime import datetime
+from utils.durable import atomic_write, file_lock
+
+# The one definition of an annotation row shared by the apps.  Label columns
+# are categorical: a record stores one small code per label column (0 = unset,
+# k = the k-th allowed value), the key is (user_id, int article_index), and the
+# values are validated where they enter (build_entry, the CSV reader, which
+# sets aside rows that do not validate) instead of being compared as free strings.  The codes are the ones the binary
+# session format uses (see session_format.CORRUPTION_CODES).
+PRESENT, NOT_PRESENT = "Present", "Not Present"
+PRESENCE_VALUES = (NOT_PRESENT, PRESENT)
+CORRUPTION_VALUES = ("Yes", "No")
+FLAGGED, NOT_FLAGGED = "True", "False"
+FLAG_VALUES = (NOT_FLAGGED, FLAGGED)
+TENTATIVE_LABEL_VALUES = ("Yes", "Mentioned but not central", "No", "Unsure")
+UNSET = 0
+
+KEY_FIELDS = ("user_id", "article_index")
+
+# Rows replaced by an upsert are appended to `<annotation file>.history.jsonl`
+# (without the article texts, which are in the dataset); compact_annotations.py
+# moves them into compressed archives.
+HISTORY_SUFFIX = ".history.jsonl"
+ARTICLE_TEXT_FIELDS = ("original_text", "translated_text")
+
+# (path, line, error) of invalid rows already reported by load_records
+_reported = set()
+
+
+class Annotation:
+    """One validated annotation: its key, label codes and text values (in schema order)."""
+    __slots__ = ("user_id", "article_index", "codes", "values")
+
+    def __init__(self, user_id, article_index, codes, values):
+        self.user_id = user_id
+        self.article_index = article_index
+        self.codes = codes
+        self.values = values
+
+    @property
+    def key(self):
+        return self.user_id, self.article_index
+
+
+def _article_index(value):
+    if isinstance(value, bool):
+        raise ValueError(f"article_index: {value!r} is not an integer")
+    try:
+        index = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"article_index: {value!r} is not an integer") from None
+    if index < 0 or (not isinstance(value, str) and index != value):
+        raise ValueError(f"article_index: {value!r} is not a non-negative integer")
+    return index
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
+
+class AnnotationSchema:
+    """Columns of one app's annotation CSV; `categories` maps each label column to its allowed values."""
+
+    def __init__(self, fieldnames, categories):
+        self.fieldnames = list(fieldnames)
+        self.categories = {column: tuple(values) for column, values in categories.items()}
+        self.categorical = [c for c in self.fieldnames if c in self.categories]
+        self.text = [c for c in self.fieldnames if c not in self.categories and c not in KEY_FIELDS]
+        self._codes = {
+            column: {value: code for code, value in enumerate(values, start=1)}
+            for column, values in self.categories.items()
+        }
+
+    def _code(self, column, value):
+        if value is None or value == "":
+            return UNSET
+        if isinstance(value, bool):
+            value = str(value)  # st.checkbox values of the "flagged" column
+        try:
+            return self._codes[column][value]
+        except (KeyError, TypeError):
+            allowed = ", ".join(self.categories[column])
+            raise ValueError(f"{column}: {value!r} is not one of {allowed}") from None
+
+    def record(self, entry):
+        """Validate an entry or CSV row into an Annotation; raises ValueError on a bad value."""
+        user_id = entry.get("user_id")
+        if not isinstance(user_id, str) or not user_id:
+            raise ValueError(f"user_id: {user_id!r} is not a coder name")
+        return Annotation(
+            user_id,
+            _article_index(entry.get("article_index")),
+            bytes(self._code(column, entry.get(column)) for column in self.categorical),
+            tuple(_text(entry.get(column)) for column in self.text),
+        )
+
+    def entry(self, record):
+        """The apps' annotation dict of a record (article_index an int, unset labels left out)."""
+        entry = {"user_id": record.user_id, "article_index": record.article_index}
+        entry.update(zip(self.text, record.values))
+        for column, code in zip(self.categorical, record.codes):
+            if code != UNSET:
+                entry[column] = self.categories[column][code - 1]
+        return {column: entry[column] for column in self.fieldnames if column in entry}
+
+    def validate(self, entry):
+        """`entry` checked and normalized to the schema's columns and types."""
+        return self.entry(self.record(entry))
+
+
+def frame_schema(frame_labels, political_corruption=True, timestamp=False, pool_row=False):
+    """Schema of the frame-labeling apps' CSVs (column order as the apps have always written it).
+
+    article_index is the position in the coder's own article list, which is
+    what sessions and navigation use.  With `pool_row`, rows also carry the
+    article's row in the shared pool (empty for coders with their own
+    dataset, where uri identifies the article), the key for joining coders'
+    labels of the same overlap article.
+    """
+    fieldnames = ["user_id", "article_index", "notes", "flagged", "uri"]
+    if pool_row:
+        fieldnames.append("pool_row")
+    fieldnames += ["original_text", "translated_text"]
+    categories = {"flagged": FLAG_VALUES}
+    if political_corruption:
+        fieldnames.append("political_corruption")
+        categories["political_corruption"] = CORRUPTION_VALUES
+    if timestamp:
+        fieldnames.append("timestamp")
+    for label in frame_labels:
+        fieldnames.append(f"{label}_present")
+        categories[f"{label}_present"] = PRESENCE_VALUES
+    return AnnotationSchema(fieldnames, categories)
+
+
+def _timestamp(schema, record):
+    """Sort key of a record's timestamp: rows without a (parsable) one are oldest."""
+    if "timestamp" not in schema.text:
+        return (False, None)
+    value = record.values[schema.text.index("timestamp")]
+    try:
+        return (True, datetime.fromisoformat(value))
+    except ValueError:
+        return (False, None)
+
+
+def _report_invalid(path, line, error):
+    if (path, line, error) not in _reported:
+        _reported.add((path, line, error))
+        print(f"⚠️ {path}, line {line}: {error} (row kept as it is)")
+
+
+def load_records(path, schema, superseded=None, invalid=None):
+    """Validated records of an annotation CSV keyed by (user_id, article_index).
+
+    Of several rows for one key the latest by timestamp wins (if the schema
+    has one), otherwise or on a tie the later row in the file, as in
+    export.read_annotations.  Rows that lose are appended to `superseded`, if given.
+
+    A row that does not validate (hand-edited, or from an older version) is
+    reported and skipped rather than failing every reader; to keep it when
+    rewriting the file, pass a list as `invalid`, which receives the raw row.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, mode="r", encoding="utf-8", newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                record = schema.record(row)
+            except ValueError as e:
+                _report_invalid(path, line, str(e))
+                if invalid is not None:
+                    invalid.append({column: row.get(column) or "" for column in schema.fieldnames})
+                continue
+            old = records.pop(record.key, None)
+            if old is not None and _timestamp(schema, old) > _timestamp(schema, record):
+                old, record = record, old
+            if old is not None and superseded is not None:
+                superseded.append(old)
+            records[record.key] = record
+    return records
+
+
+def write_records(path, schema, records, invalid=()):
+    """Rewrite the CSV with `records`, after the raw `invalid` rows from load_records (unchanged)."""
+    def write_rows(f):
+        writer = csv.DictWriter(f, fieldnames=schema.fieldnames)
+        writer.writeheader()
+        writer.writerows(invalid)
+        writer.writerows(schema.entry(record) for record in records)
+
+    atomic_write(path, write_rows, newline="")
+
+
+def history_path(path):
+    return path + HISTORY_SUFFIX
+
+
+def history_rows(schema, records):
+    """History log rows of superseded records: their entries without the article texts."""
+    return [
+        {k: v for k, v in schema.entry(record).items() if k not in ARTICLE_TEXT_FIELDS} for record in records
+    ]
+
+
+def history_records(rows):
+    """The {"superseded_at", "row"} objects of history log lines for `rows`, superseded now."""
+    superseded_at = datetime.now().isoformat()
+    return [{"superseded_at": superseded_at, "row": row} for row in rows]
+
+
+def append_history(path, rows):
+    """Append superseded rows ({"superseded_at", "row"} lines) to the history log of `path`, fsynced."""
+    if not rows:
+        return
+    # Leading newline terminates a line torn by an earlier crash (as in the write-ahead journal)
+    lines = "".join("\n" + json.dumps(record, ensure_ascii=False) + "\n" for record in history_records(rows))
+    with file_lock(history_path(path)):
+        with open(history_path(path), "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def upsert_annotations(path, schema, entries, keep_history=False):
+    """Validate `entries` and replace (or add) their rows in the CSV; returns the validated entries.
+
+    Later entries for the same coder and article replace earlier ones, and
+    updated rows move to the end of the file.  Only `entries` must validate:
+    rows already in the file that do not are kept as they are (see
+    load_records).  With `keep_history`, rows that change are first appended
+    to the history log (see append_history).
+    """
+    new = {}
+    for entry in entries:
+        record = schema.record(entry)
+        new.pop(record.key, None)
+        new[record.key] = record
+    invalid = []
+    records = load_records(path, schema, invalid=invalid)
+    superseded = []
+    for key, record in new.items():
+        old = records.pop(key, None)
+        if old is not None and (old.codes, old.values) != (record.codes, record.values):
+            superseded.append(old)
+        records[key] = record
+    if keep_history:
+        # Before the rewrite: a crash in between repeats a history line rather than losing one
+        append_history(path, history_rows(schema, superseded))
+    write_records(path, schema, records.values(), invalid)
+    return [schema.entry(record) for record in new.values()]
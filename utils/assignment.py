@@ -0,0 +1,265 @@
+import os
+import json
+import heapq
+import threading
+import numpy as np
+from utils.dataset_cache import file_signature
+
+# Articles are identified by their row position in the shared pool CSV.
+# Every coder gets a compact int32 array of pool positions, in coding order.
+INDEX_DTYPE = np.int32
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+# path -> (file signature, assignment): the apps look a coder up on every rerun
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def article_keys(article_ids, seed: int) -> np.ndarray:
+    """Deterministic pseudo-random uint64 key per article (splitmix64 of id and seed).
+
+    Keys only depend on the article id and the seed, so adding articles to the
+    pool never changes the keys (and therefore the order) of existing ones.
+    """
+    with np.errstate(over="ignore"):
+        z = np.asarray(article_ids, dtype=np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z + np.uint64(0x9E3779B97F4A7C15)) & _MASK64
+        z = ((z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)) & _MASK64
+        z = ((z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)) & _MASK64
+        return z ^ (z >> np.uint64(31))
+
+
+def overlap_mask(keys: np.ndarray, overlap: float) -> np.ndarray:
+    """Articles whose key falls in the lowest `overlap` fraction go to every coder."""
+    threshold = np.uint64(min(max(overlap, 0.0), 1.0) * float(2 ** 64 - 1))
+    return keys < threshold
+
+
+def _capacity_of(capacity, coder):
+    if capacity is None:
+        return None
+    if isinstance(capacity, dict):
+        return capacity.get(coder)
+    return int(capacity)
+
+
+def _distribute(article_ids, keys, coders, loads, capacity):
+    """Hand out non-overlap articles to the least-loaded coder with room left."""
+    assigned = {c: [] for c in coders}
+    heap = [(loads[c], pos, c) for pos, c in enumerate(coders)]
+    heapq.heapify(heap)
+    leftover = []
+    for article in article_ids[np.argsort(keys, kind="stable")]:
+        while heap:
+            load, pos, coder = heapq.heappop(heap)
+            cap = _capacity_of(capacity, coder)
+            if cap is None or load < cap:
+                break
+        else:
+            leftover.append(int(article))
+            continue
+        assigned[coder].append(int(article))
+        heapq.heappush(heap, (load + 1, pos, coder))
+    return assigned, leftover
+
+
+def _ordered(article_ids, seed):
+    ids = np.asarray(article_ids, dtype=np.int64)
+    return ids[np.argsort(article_keys(ids, seed), kind="stable")].astype(INDEX_DTYPE)
+
+
+def _skipped(skip):
+    return np.unique(np.asarray([] if skip is None else skip, dtype=INDEX_DTYPE))
+
+
+def build_assignment(pool_size: int, coders, overlap: float = 0.1, capacity=None, seed: int = 0, skip=None):
+    """Assign `pool_size` pool articles to `coders`.
+
+    A fraction `overlap` of the pool is coded by everyone (for reliability);
+    the rest is split so each coder ends up with a balanced load, never exceeding
+    `capacity` (an int for everyone, or a dict per coder).  Articles that do not
+    fit anywhere are kept in `unassigned`.  Pool positions in `skip` (e.g.
+    near-duplicates of another article, see cluster_articles.py) are never
+    handed out and are kept in `skipped`.
+    """
+    coders = list(coders)
+    skipped = _skipped(skip)
+    ids = np.setdiff1d(np.arange(pool_size, dtype=np.int64), skipped)
+    shared = overlap_mask(article_keys(ids, seed), overlap)
+
+    lists = {c: [int(a) for a in ids[shared]] for c in coders}
+    loads = {c: len(lists[c]) for c in coders}
+    rest = ids[~shared]
+    handed, leftover = _distribute(rest, article_keys(rest, seed), coders, loads, capacity)
+    for c in coders:
+        lists[c].extend(handed[c])
+
+    return {
+        "meta": {
+            "pool_size": int(pool_size),
+            "overlap": float(overlap),
+            "capacity": capacity,
+            "seed": int(seed),
+            "coders": coders,
+        },
+        "coders": {c: _ordered(lists[c], seed) for c in coders},
+        "unassigned": np.asarray(sorted(leftover), dtype=INDEX_DTYPE),
+        "skipped": skipped,
+    }
+
+
+def add_articles(assignment, new_pool_size: int, skip=None):
+    """Incrementally assign pool rows appended since the assignment was built.
+
+    Existing coder arrays keep their order for articles already assigned, so a
+    coder's `current_index` stays valid; the new articles are appended.  New
+    rows listed in `skip` are added to `skipped` instead.
+    """
+    meta = assignment["meta"]
+    old_size = meta["pool_size"]
+    if new_pool_size <= old_size:
+        return assignment
+    new_skipped = _skipped(skip)
+    new_skipped = new_skipped[(new_skipped >= old_size) & (new_skipped < new_pool_size)]
+    new_ids = np.setdiff1d(np.arange(old_size, new_pool_size, dtype=np.int64), new_skipped)
+    coders = meta["coders"]
+    keys = article_keys(new_ids, meta["seed"])
+    shared = overlap_mask(keys, meta["overlap"])
+
+    lists = {c: [int(a) for a in new_ids[shared]] for c in coders}
+    loads = {c: len(assignment["coders"][c]) + len(lists[c]) for c in coders}
+    rest = np.concatenate([assignment["unassigned"].astype(np.int64), new_ids[~shared]])
+    handed, leftover = _distribute(rest, article_keys(rest, meta["seed"]), coders, loads, meta["capacity"])
+
+    result = dict(assignment, meta=dict(meta, pool_size=int(new_pool_size)))
+    result["coders"] = {
+        c: np.concatenate([assignment["coders"][c], _ordered(lists[c] + handed[c], meta["seed"])])
+        for c in coders
+    }
+    result["unassigned"] = np.asarray(sorted(leftover), dtype=INDEX_DTYPE)
+    result["skipped"] = np.union1d(assignment.get("skipped", _skipped(None)), new_skipped).astype(INDEX_DTYPE)
+    return result
+
+
+def _movable_tail(arr, start, shared_set):
+    """The non-overlap articles at the end of `arr`, after position `start`."""
+    end = len(arr)
+    while end > start and int(arr[end - 1]) not in shared_set:
+        end -= 1
+    return list(arr[end:])
+
+
+def add_coder(assignment, coder: str, progress=None, capacity=None):
+    """Incrementally add a coder, moving only not-yet-started work to them.
+
+    `progress` maps coders to how many of their articles they already opened
+    (their session's `current_index`); those stay where they are.  The new
+    coder receives every overlap article plus a fair share taken from the tail
+    of the most loaded coders.  Only articles at the end of a coder's list, past
+    their progress and up to their last overlap article, are moved: sessions
+    and annotations key articles by position in that list, so the positions of
+    the articles a coder keeps never change.  Overlap articles sort first, so
+    that is every unstarted article unless add_articles appended more since.
+    """
+    meta = assignment["meta"]
+    if coder in assignment["coders"]:
+        return assignment
+    progress = progress or {}
+    seed = meta["seed"]
+    cap = capacity if capacity is not None else _capacity_of(meta["capacity"], coder)
+
+    all_ids = np.setdiff1d(np.arange(meta["pool_size"], dtype=np.int64), assignment.get("skipped", []))
+    shared_ids = all_ids[overlap_mask(article_keys(all_ids, seed), meta["overlap"])]
+    shared_set = set(int(a) for a in shared_ids)
+
+    coders = {c: list(arr) for c, arr in assignment["coders"].items()}
+    movable = {c: _movable_tail(arr, progress.get(c, 0), shared_set) for c, arr in coders.items()}
+    order = list(coders)
+    n_unique = sum(len(arr) for arr in coders.values()) - len(shared_set) * len(coders)
+    target = n_unique // (len(coders) + 1)
+    if cap is not None:
+        target = max(0, min(target, cap - len(shared_set)))
+
+    taken = []
+    while len(taken) < target:
+        donors = [c for c in order if movable[c]]
+        if not donors:
+            break
+        donor = max(donors, key=lambda c: (len(coders[c]), -order.index(c)))
+        movable[donor].pop()
+        taken.append(int(coders[donor].pop()))
+
+    unassigned = [int(a) for a in assignment["unassigned"]]
+    if cap is None or len(shared_set) + len(taken) < cap:
+        room = None if cap is None else cap - len(shared_set) - len(taken)
+        extra, unassigned = unassigned[:room], unassigned[len(unassigned[:room]):]
+        taken.extend(extra)
+
+    new_meta = dict(meta, coders=list(meta["coders"]) + [coder])
+    if isinstance(meta["capacity"], dict) and capacity is not None:
+        new_meta["capacity"] = dict(meta["capacity"], **{coder: capacity})
+
+    result = dict(assignment, meta=new_meta)
+    result["coders"] = {c: np.asarray(arr, dtype=INDEX_DTYPE) for c, arr in coders.items()}
+    result["coders"][coder] = _ordered(list(shared_set) + taken, seed)
+    result["unassigned"] = np.asarray(sorted(unassigned), dtype=INDEX_DTYPE)
+    return result
+
+
+def save_assignment(path: str, assignment):
+    """Store the assignment as one .npz with an int32 array per coder."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    arrays = {f"coder__{c}": arr for c, arr in assignment["coders"].items()}
+    arrays["unassigned"] = assignment["unassigned"]
+    arrays["skipped"] = assignment.get("skipped", _skipped(None))
+    arrays["meta"] = np.frombuffer(json.dumps(assignment["meta"]).encode("utf-8"), dtype=np.uint8)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_assignment(path: str):
+    """Load an assignment written by `save_assignment`."""
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        coders = {c: data[f"coder__{c}"] for c in meta["coders"]}
+        skipped = data["skipped"] if "skipped" in data.files else _skipped(None)
+        return {"meta": meta, "coders": coders, "unassigned": data["unassigned"], "skipped": skipped}
+
+
+def cached_assignment(path: str):
+    """`load_assignment(path)`, parsed again only when the file changes (None if there is none).
+
+    The arrays are shared by every caller and read-only.
+    """
+    try:
+        signature = file_signature(path)
+    except FileNotFoundError:
+        return None
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    assignment = load_assignment(path)
+    for arr in [*assignment["coders"].values(), assignment["unassigned"], assignment["skipped"]]:
+        arr.flags.writeable = False
+    with _loaded_lock:
+        _loaded[path] = (signature, assignment)
+    return assignment
+
+
+def coder_indices(path: str, user_id: str):
+    """Pool positions assigned to `user_id` (read-only), or None if there is no assignment for them."""
+    assignment = cached_assignment(path)
+    if assignment is None:
+        return None
+    return assignment["coders"].get(user_id)
+
+
+def assignment_coders(path: str):
+    """Coders listed in the assignment file (empty if there is none)."""
+    assignment = cached_assignment(path)
+    if assignment is None:
+        return []
+    return assignment["meta"]["coders"]
@@ -0,0 +1,142 @@
+import os
+import gzip
+import json
+import time
+from datetime import datetime
+from utils.durable import atomic_write, file_lock
+from utils.annotation_schema import (
+    load_records, write_records, history_path, history_rows, history_records, KEY_FIELDS,
+)
+
+# Compaction of the append-only logs (run by compact_annotations.py, e.g. from
+# cron).  What the apps read at startup -- the annotation CSV and today's
+# telemetry file -- then holds live data only:
+#
+# * the annotation CSV is rewritten with one row per coder and article (the
+#   latest by timestamp), so files written by older versions that appended
+#   rows shrink;
+# * rows superseded by an upsert (the history log) or dropped by that rewrite
+#   move into gzipped archives,
+#   `<archive_dir>/<annotation file>.<timestamp>.history.jsonl.gz`, which
+#   together with the CSV are the full audit trail (see audit_trail);
+# * telemetry files of past days are gzipped in place.
+ARCHIVE_SUFFIX = ".history.jsonl.gz"
+
+
+def _read_lines(path, opener=open):
+    """JSON objects of a JSON-lines file (torn or blank lines skipped)."""
+    records = []
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def archive_paths(path, archive_dir):
+    """Archives of the history of the annotation file `path`, oldest first."""
+    prefix = os.path.basename(path) + "."
+    if not os.path.isdir(archive_dir):
+        return []
+    return [
+        os.path.join(archive_dir, name) for name in sorted(os.listdir(archive_dir))
+        if name.startswith(prefix) and name.endswith(ARCHIVE_SUFFIX)
+    ]
+
+
+def compact_annotations(path, schema, archive_dir):
+    """Deduplicate the annotation CSV and archive its history log; returns a summary dict.
+
+    Holds the CSV lock (which the apps' upserts take too), so no write is
+    lost or archived twice.  The rows the deduplication drops are archived
+    with the history log before the CSV is rewritten; rows that do not
+    validate are kept as they are.  Exact repeats of a history line (a write
+    replayed after a crash) are archived once.
+    """
+    summary = {"rows": 0, "duplicates": 0, "invalid": 0, "archived": 0, "archive": None}
+    with file_lock(path):
+        records, dropped, invalid = {}, [], []
+        if os.path.exists(path):
+            records = load_records(path, schema, superseded=dropped, invalid=invalid)
+            summary["rows"] = len(records)
+            summary["duplicates"] = len(dropped)
+            summary["invalid"] = len(invalid)
+
+        history = history_path(path)
+        with file_lock(history):
+            lines, seen = [], set()
+            for record in _read_lines(history) + history_records(history_rows(schema, dropped)):
+                line = json.dumps(record, ensure_ascii=False, sort_keys=True)
+                if line not in seen:
+                    seen.add(line)
+                    lines.append(line + "\n")
+            if not lines:
+                return summary
+            # Fixed-width timestamps: archive names sort oldest first
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            archive = os.path.join(archive_dir, f"{os.path.basename(path)}.{stamp}{ARCHIVE_SUFFIX}")
+
+            def write_archive(f):
+                with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                    gz.write("".join(lines).encode("utf-8"))
+
+            # The archive is durable before the CSV loses rows and the live log is emptied
+            atomic_write(archive, write_archive, binary=True)
+            if dropped:
+                write_records(path, schema, records.values(), invalid)
+            atomic_write(history, lambda f: None)
+    summary["archived"] = len(lines)
+    summary["archive"] = archive
+    return summary
+
+
+def read_history(path, archive_dir):
+    """Every superseded row of the annotation file `path` ({"superseded_at", "row"}), oldest first."""
+    records = []
+    for archive in archive_paths(path, archive_dir):
+        records += _read_lines(archive, opener=gzip.open)
+    records += _read_lines(history_path(path))
+    return records
+
+
+def audit_trail(path, schema, archive_dir, user_id, article_index):
+    """Every version of one coder's annotation of one article, oldest first (the current one last)."""
+    key = (str(user_id), int(article_index))
+    trail = [
+        record["row"] for record in read_history(path, archive_dir)
+        if (str(record["row"].get(KEY_FIELDS[0])), int(record["row"].get(KEY_FIELDS[1], -1))) == key
+    ]
+    current = load_records(path, schema).get(key) if os.path.exists(path) else None
+    if current is not None:
+        trail.append(schema.entry(current))
+    return trail
+
+
+def compress_telemetry(folder):
+    """Gzip the telemetry files of past days (today's is still being appended to); returns their paths."""
+    today = f"events_{time.strftime('%Y%m%d')}.jsonl"
+    compressed = []
+    if not os.path.isdir(folder):
+        return compressed
+    for name in sorted(os.listdir(folder)):
+        if not name.startswith("events_") or not name.endswith(".jsonl") or name >= today:
+            continue
+        source = os.path.join(folder, name)
+        target = source + ".gz"
+
+        def write_gzip(f, source=source):
+            with open(source, "rb") as src, gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                gz.write(src.read())
+
+        atomic_write(target, write_gzip, binary=True)
+        os.remove(source)
+        compressed.append(target)
+    return compressed
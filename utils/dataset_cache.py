@@ -0,0 +1,238 @@
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Memory budget for all cached datasets together (ANNOTATOR_DATASET_CACHE_MB).
+DEFAULT_BUDGET_MB = int(os.environ.get("ANNOTATOR_DATASET_CACHE_MB", "1024"))
+
+
+def file_signature(path):
+    """Cheap change detector: (mtime in ns, size)."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_dataset(path):
+    """Parse a dataset file: Parquet (from ingest_dataset.py) or CSV."""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def value_nbytes(value):
+    """Approximate memory of a cached value (a dataset or a value derived from one).
+
+    DataFrames and Series count their contents (deep), arrays and objects with
+    an `nbytes` (e.g. SearchIndex) count that, and dicts, lists and tuples
+    (e.g. the evidence index) count their items recursively.
+    """
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(value_nbytes(k) + value_nbytes(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(value_nbytes(item) for item in value)
+    return size
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _Entry:
+    __slots__ = ("data", "signature", "digest", "nbytes", "derived_nbytes", "derived", "builds")
+
+    def __init__(self, data, signature, digest, nbytes):
+        self.data = data
+        self.signature = signature
+        self.digest = digest
+        self.nbytes = nbytes  # the dataset plus its derived values
+        self.derived_nbytes = 0
+        self.derived = {}
+        self.builds = {}
+
+    def add_derived(self, key, value, build):
+        size = value_nbytes(value)
+        self.derived[key] = value
+        self.builds[key] = build
+        self.derived_nbytes += size
+        self.nbytes += size
+
+
+class DatasetCache:
+    """Process-wide LRU cache of parsed datasets with a memory budget.
+
+    Unlike st.cache_data, `get` hands every caller the same DataFrame object
+    (no pickling or copying per rerun), so callers must treat it as read-only.
+    A dataset is reloaded when its file's mtime/size changes; with
+    `check_hash=True` a touched-but-identical file is not reparsed.
+    On a reload, builders registered with `add_builder` and the derived values
+    the old version had are rebuilt before the new version is published.
+    Derived values count toward the memory budget with their dataset.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_MB << 20, loader=load_dataset, check_hash=True):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.check_hash = check_hash
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self.builders = {}
+        self._stats = {"hits": 0, "misses": 0, "reloads": 0, "unchanged_touches": 0, "evictions": 0}
+
+    def _load_lock(self, path):
+        with self._lock:
+            return self._load_locks.setdefault(path, threading.Lock())
+
+    def add_builder(self, key, build):
+        """Compute `build(data)` for every dataset as part of loading it."""
+        self.builders[key] = build
+
+    def signature(self, path):
+        """File signature of the cached version of `path` (None if not cached)."""
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(path))
+            return entry.signature if entry is not None else None
+
+    def get(self, path, check=True):
+        """Parsed dataset for `path`, loading or reloading it when needed.
+
+        With `check=False` a cached version is returned without touching the
+        file system (a background watcher is then responsible for reloads).
+        """
+        path = os.path.abspath(path)
+        if not check:
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is not None:
+                    self._entries.move_to_end(path)
+                    self._stats["hits"] += 1
+                    return entry.data
+        signature = file_signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(path)
+                self._stats["hits"] += 1
+                return entry.data
+
+        # Parse outside the global lock; one loader per path at a time.
+        with self._load_lock(path):
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is not None and entry.signature == signature:
+                    self._stats["hits"] += 1
+                    return entry.data
+            digest = file_hash(path) if self.check_hash else None
+            if entry is not None and digest is not None and digest == entry.digest:
+                with self._lock:
+                    entry.signature = signature
+                    self._stats["unchanged_touches"] += 1
+                    return entry.data
+            data = self.loader(path)
+            nbytes = value_nbytes(data)
+            new_entry = _Entry(data, signature, digest, nbytes)
+            builds = dict(self.builders)
+            if entry is not None:
+                builds.update(entry.builds)
+            for key, build in builds.items():
+                new_entry.add_derived(key, build(data), build)
+            with self._lock:
+                self._stats["reloads" if entry is not None else "misses"] += 1
+                # Swapping the entry is atomic: readers see the old or the new version
+                self._entries[path] = new_entry
+                self._entries.move_to_end(path)
+                self._evict(keep=path)
+            return data
+
+    def derived(self, path, key, build, check=True):
+        """Value computed from a dataset by `build(data)`, cached until the dataset reloads."""
+        data = self.get(path, check=check)
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.data is data and key in entry.derived:
+                return entry.derived[key]
+        value = build(data)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.data is data:
+                if key in entry.derived:
+                    # Another session built it meanwhile; keep one copy
+                    return entry.derived[key]
+                entry.add_derived(key, value, build)
+                self._evict(keep=path)
+        return value
+
+    def _evict(self, keep):
+        total = sum(e.nbytes for e in self._entries.values())
+        for path in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total -= self._entries.pop(path).nbytes
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters plus the cached datasets, most recently used last."""
+        with self._lock:
+            return dict(
+                self._stats,
+                budget_mb=self.max_bytes / (1 << 20),
+                used_mb=sum(e.nbytes for e in self._entries.values()) / (1 << 20),
+                datasets=[
+                    {"path": p, "mb": e.nbytes / (1 << 20), "derived": len(e.derived),
+                     "derived_mb": e.derived_nbytes / (1 << 20)}
+                    for p, e in self._entries.items()
+                ],
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache():
+    """The process-wide dataset cache shared by every session and app.
+
+    With ANNOTATOR_SHARED_DATASETS=1 datasets are memory-mapped Arrow copies
+    shared with the other worker processes (see utils/shared_state.py).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from utils.shared_state import SHARED_DATASETS, load_shared_dataset
+
+            _cache = DatasetCache(loader=load_shared_dataset if SHARED_DATASETS else load_dataset)
+        return _cache
+
+
+def render_cache_panel(cache):
+    """Dataset cache stats, shown only with `?debug=1` in the URL."""
+    import streamlit as st
+
+    if st.query_params.get("debug") != "1":
+        return
+    with st.expander("🗄️ Dataset cache", expanded=False):
+        stats = cache.stats()
+        datasets = stats.pop("datasets")
+        st.json(stats)
+        if datasets:
+            st.dataframe(pd.DataFrame(datasets))
@@ -0,0 +1,92 @@
+import os
+import time
+import threading
+from utils.dataset_cache import get_dataset_cache, file_signature
+
+# How often the watcher polls registered dataset files (ANNOTATOR_RELOAD_INTERVAL).
+POLL_INTERVAL = float(os.environ.get("ANNOTATOR_RELOAD_INTERVAL", "5"))
+
+
+class DatasetRegistry:
+    """Hot-reloading front for the dataset cache.
+
+    The first `get` of a path loads it (once) and starts watching the file.
+    After that, `get` never touches the disk: a daemon thread polls the watched
+    files and, once a changed file has kept the same size/mtime for two polls
+    (so a half-copied CSV is not picked up), reloads it and runs the cache's
+    builders in the background before the new version replaces the old one.
+    """
+
+    def __init__(self, cache=None, poll_interval=POLL_INTERVAL):
+        self.cache = cache or get_dataset_cache()
+        self.poll_interval = poll_interval
+        self._watched = set()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+        self._thread.start()
+
+    def get(self, path):
+        """Current version of the dataset at `path`."""
+        path = os.path.abspath(path)
+        with self._lock:
+            watched = path in self._watched
+        if not watched:
+            data = self.cache.get(path)
+            with self._lock:
+                self._watched.add(path)
+            return data
+        return self.cache.get(path, check=False)
+
+    def derived(self, path, key, build):
+        """Derived value of the current version (see DatasetCache.derived)."""
+        self.get(path)
+        return self.cache.derived(path, key, build, check=False)
+
+    def poll(self):
+        """Reload every cached, watched file whose change has settled; returns the reloaded paths."""
+        with self._lock:
+            watched = list(self._watched)
+        reloaded = []
+        for path in watched:
+            cached = self.cache.signature(path)
+            if cached is None:
+                # Evicted by the memory budget: the next `get` loads it again
+                self._pending.pop(path, None)
+                continue
+            try:
+                signature = file_signature(path)
+            except OSError:
+                continue  # mid-replace or removed: keep serving the loaded version
+            if signature == cached:
+                self._pending.pop(path, None)
+                continue
+            if self._pending.get(path) != signature:
+                self._pending[path] = signature
+                continue
+            try:
+                self.cache.get(path)
+                reloaded.append(path)
+                print(f"🔄 Reloaded dataset {path}")
+            except Exception as e:
+                print(f"❌ Error reloading dataset {path}: {e}")
+            self._pending.pop(path, None)
+        return reloaded
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.poll()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide dataset registry (starts the watcher thread on first use)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DatasetRegistry()
+        return _registry
@@ -0,0 +1,265 @@
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+# Once the journal grows past this size it is rewritten with only the records
+# still in flight, so replay time stays proportional to recent writes only.
+MAX_JOURNAL_BYTES = 1 << 20
+
+_locks = {}
+_locks_guard = threading.Lock()
+_replayed = set()
+_held = threading.local()  # paths whose lock file this thread already holds
+_identities = {}
+_HAVE_PROC = os.path.isdir("/proc/self")
+
+
+def _proc_stat(pid):
+    """(state, start time in clock ticks since boot) of a process from /proc, or None if it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        return fields[0].decode(), int(fields[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def process_identity():
+    """[pid, start time] of this process: tells a live writer from a later process reusing its pid."""
+    pid = os.getpid()
+    if pid not in _identities:
+        stat = _proc_stat(pid) if _HAVE_PROC else None
+        _identities[pid] = [pid, stat[1] if stat else None]
+    return _identities[pid]
+
+
+def process_alive(identity):
+    """Whether the process with this `process_identity()` is still running (False for None)."""
+    if not identity:
+        return False
+    pid, start = identity
+    if pid == os.getpid():
+        return start == process_identity()[1]
+    if _HAVE_PROC:
+        stat = _proc_stat(pid)
+        return stat is not None and stat[0] not in ("Z", "X") and (start is None or stat[1] == start)
+    if os.name == "nt":
+        return False  # no cheap check (os.kill would signal it): treat other processes as gone
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _thread_lock(path):
+    key = os.path.abspath(path)
+    with _locks_guard:
+        return _locks.setdefault(key, threading.RLock())
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock for read-modify-write of `path`, across threads and processes.
+
+    Re-entrant within a thread: a nested file_lock on the same path does not
+    take the lock file again (a second flock would wait for the first).
+    """
+    key = os.path.abspath(path)
+    held = _held.__dict__.setdefault("paths", set())
+    with _thread_lock(path):
+        if fcntl is None or key in held:
+            yield
+            return
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            held.add(key)
+            try:
+                yield
+            finally:
+                held.discard(key)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fsync_dir(path):
+    """Make a rename inside `path` durable (no-op where directories can't be opened)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, write_fn, encoding="utf-8", newline=None, binary=False):
+    """Write a file through `write_fn(f)` so readers see either the old or the new version.
+
+    The data goes to a temp file in the same directory, is fsynced, and then
+    renamed over `path`; a crash at any point leaves the previous file intact.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        if binary:
+            f = os.fdopen(fd, "wb")
+        else:
+            f = os.fdopen(fd, "w", encoding=encoding, newline=newline)
+        with f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    fsync_dir(directory)
+
+
+def atomic_write_json(path, data, default=None, indent=2):
+    """`json.dump` through `atomic_write`."""
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent, default=default))
+
+
+class WriteAheadJournal:
+    """Small append-only journal of pending writes.
+
+    `run(kind, payload)` first appends the payload (fsynced) to the journal,
+    then applies it with `appliers[kind]`, then marks it done.  Every record
+    carries the identity of the process that wrote it.  If that process dies
+    in between, `replay()` re-applies the record; records of live processes
+    are still being applied and are left alone.  Appliers must be idempotent
+    (full-state rewrites or upserts).
+
+    `replayers[kind]`, if given, applies replayed records of that kind instead
+    of `appliers[kind]` (e.g. to re-check state that moved on since the crash).
+    For kinds in `latest_only`, `latest_only[kind](payload)` is a key, and an
+    unfinished record is dropped once a later record with the same key
+    completed: replaying it would write older state over newer.
+    """
+
+    def __init__(self, path, appliers, default=None, replayers=None, latest_only=None):
+        self.path = path
+        self.appliers = appliers
+        self.default = default
+        self.replayers = replayers or {}
+        self.latest_only = latest_only or {}
+
+    def _append(self, record, sync):
+        # Leading newline terminates a line torn by an earlier crash.
+        line = "\n" + json.dumps(record, default=self.default) + "\n"
+        with file_lock(self.path):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def run(self, kind, payload):
+        """Durably record, then apply, one write."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        seq = f"{os.getpid()}-{threading.get_ident()}-{os.urandom(4).hex()}"
+        self._append({"seq": seq, "kind": kind, "owner": process_identity(), "payload": payload}, sync=True)
+        self.appliers[kind](payload)
+        self._append({"done": seq}, sync=False)
+        self._maybe_compact()
+
+    def _read(self):
+        records, done = [], set()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line: that write was never acknowledged
+                    if "done" in record:
+                        done.add(record["done"])
+                    else:
+                        records.append(record)
+        except FileNotFoundError:
+            pass
+        # Newest first, so a record knows whether a later one with its key completed
+        pending, completed = [], set()
+        for record in reversed(records):
+            key_of = self.latest_only.get(record["kind"])
+            key = (record["kind"], key_of(record["payload"])) if key_of else None
+            if record["seq"] in done:
+                completed.add(key)
+            elif key is None or key not in completed:
+                pending.append(record)
+        return pending[::-1]
+
+    def _rewrite(self, records):
+        atomic_write(self.path, lambda f: f.writelines(
+            "\n" + json.dumps(r, default=self.default) + "\n" for r in records
+        ))
+
+    def _maybe_compact(self):
+        try:
+            if os.path.getsize(self.path) < MAX_JOURNAL_BYTES:
+                return
+        except OSError:
+            return
+        with file_lock(self.path):
+            self._rewrite(self._read())
+
+    def replay(self):
+        """Apply the unfinished records of dead processes; returns how many were replayed.
+
+        Records written by processes that are still running are left alone:
+        their writer is applying them right now.  Records from before owners
+        were recorded count as orphaned.  The orphans are first claimed (this
+        process becomes their owner), then applied outside the journal lock,
+        like `run` (appliers may take locks that writers hold while appending),
+        and marked done; if this process dies meanwhile, the next replay
+        picks them up again.
+        """
+        with file_lock(self.path):
+            pending = self._read()
+            orphaned = [record for record in pending if not process_alive(record.get("owner"))]
+            if not orphaned:
+                return 0
+            for record in orphaned:
+                record["owner"] = process_identity()
+            self._rewrite(pending)
+        for record in orphaned:
+            applier = self.replayers.get(record["kind"]) or self.appliers.get(record["kind"])
+            if applier is None:
+                print(f"⚠️ Unknown journal record kind '{record['kind']}' skipped.")
+            else:
+                applier(record["payload"])
+            self._append({"done": record["seq"]}, sync=False)
+        self._maybe_compact()
+        print(f"🔁 Replayed {len(orphaned)} unfinished write(s) from {self.path}")
+        return len(orphaned)
+
+    def replay_once(self):
+        """Replay at most once per process (call at startup / first rerun)."""
+        key = os.path.abspath(self.path)
+        with _locks_guard:
+            if key in _replayed:
+                return 0
+            _replayed.add(key)
+        return self.replay()
@@ -0,0 +1,100 @@
+import re
+import json
+from bisect import bisect_right
+from functools import lru_cache
+from utils.text_panel import paragraph_spans
+
+# Where each frame's LLM evidence occurs in translated_text: per article, per
+# frame number, one (phrase, paragraph, start, end) per evidence phrase, with
+# paragraph/start/end -1 when the phrase is not in the text.  It is built once
+# per dataset -- at ingestion (the EVIDENCE_INDEX_COLUMN of ingest_dataset.py
+# output) or with the dataset in the shared cache -- so rendering a frame card
+# is a lookup, with no regex run on navigation.
+EVIDENCE_INDEX_COLUMN = "evidence_index"
+TEXT_COLUMN = "translated_text"
+N_FRAMES = 7
+NOT_FOUND = -1
+
+
+def split_evidence(value):
+    if not isinstance(value, str):
+        return []
+    return [p.strip() for p in value.split(";") if p.strip() and p.strip().lower() != "nan"]
+
+
+@lru_cache(maxsize=4096)
+def evidence_pattern(phrase):
+    """Case-insensitive pattern tolerating extra spacing/punctuation between the phrase's words.
+
+    The ends only refuse to match inside a word, so phrases that start or end
+    with punctuation (a quote, a full stop) are found too.
+    """
+    words = phrase.split()
+    return re.compile(r"(?<!\w)" + r"\W*".join(map(re.escape, words)) + r"(?!\w)", re.IGNORECASE)
+
+
+def locate(text, starts, phrase):
+    """(paragraph, start, end) of the first occurrence of `phrase`, or NOT_FOUND three times."""
+    match = evidence_pattern(phrase).search(text) if phrase.split() else None
+    if match is None:
+        return NOT_FOUND, NOT_FOUND, NOT_FOUND
+    return max(bisect_right(starts, match.start()) - 1, 0), match.start(), match.end()
+
+
+def article_evidence(row):
+    """The evidence index of one article (a dict-like row): frame number -> [(phrase, paragraph, start, end)]."""
+    text = row.get(TEXT_COLUMN, "")
+    text = text if isinstance(text, str) else ""
+    starts = [start for start, _ in paragraph_spans(text)]
+    index = {}
+    for i in range(1, N_FRAMES + 1):
+        phrases = split_evidence(row.get(f"frame_{i}_evidence", ""))
+        if phrases:
+            index[i] = [(phrase,) + locate(text, starts, phrase) for phrase in phrases]
+    return index
+
+
+def to_json(index):
+    return json.dumps({str(i): entries for i, entries in index.items()}, ensure_ascii=False)
+
+
+def from_json(value):
+    if not isinstance(value, str) or not value:
+        return {}
+    return {int(i): [tuple(entry) for entry in entries] for i, entries in json.loads(value).items()}
+
+
+def article_evidence_list(df):
+    """The evidence index of every row of `df`, in row order."""
+    columns = [TEXT_COLUMN] + [f"frame_{i}_evidence" for i in range(1, N_FRAMES + 1)]
+    return [article_evidence(record) for record in df.reindex(columns=columns).to_dict("records")]
+
+
+def unmatched_frames(index):
+    """Frame numbers with at least one evidence phrase that is not in the text."""
+    return {i for i, entries in index.items() if any(entry[1] == NOT_FOUND for entry in entries)}
+
+
+def build_evidence_index(df):
+    """Evidence index of every article, keyed by the DataFrame's index label (the row in the file)."""
+    if EVIDENCE_INDEX_COLUMN in df.columns:
+        return {label: from_json(value) for label, value in df[EVIDENCE_INDEX_COLUMN].items()}
+    return dict(zip(df.index, article_evidence_list(df)))
+
+
+def evidence_paragraphs(index):
+    """Paragraph numbers holding matched evidence (to keep them visible in a collapsed text panel)."""
+    return {entry[1] for entries in index.values() for entry in entries if entry[1] != NOT_FOUND}
+
+
+def evidence_links_html(entries, anchor):
+    """Frame card HTML: each phrase with a link to its paragraph, or a warning when it is not in the text."""
+    import html
+
+    items = []
+    for phrase, paragraph, _, _ in entries:
+        if paragraph == NOT_FOUND:
+            items.append(f"{html.escape(phrase)} <span title='Not found in the translated text'>⚠️ not in text</span>")
+        else:
+            items.append(f"{html.escape(phrase)} <a href='#{anchor}-{paragraph}'>↪ ¶{paragraph + 1}</a>")
+    return "<br>".join(items)
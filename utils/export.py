@@ -0,0 +1,241 @@
+import os
+import re
+import shutil
+import numpy as np
+import pandas as pd
+from utils.annotation_schema import PRESENCE_VALUES, CORRUPTION_VALUES, FLAGGED
+
+# Annotations joined with the coders' datasets (LLM frame columns and article
+# metadata), written as Parquet partitioned by country and coder.  Article
+# texts are only copied with `with_text`, and datasets are read in chunks, so
+# memory is bounded by the chunk size plus the (text-free) annotations.
+TEXT_COLUMNS = ["combined_text", "original_text", "translated_text"]
+DEFAULT_CHUNKSIZE = 20_000
+
+# How an annotation was matched to its dataset row.
+MATCH_INDEX = "index"  # article_index points at a row with the same uri
+MATCH_URI = "uri"      # article_index is stale (the dataset changed): matched by uri
+MATCH_NONE = "none"    # no dataset row: exported with empty dataset columns
+
+UNKNOWN_COUNTRY = "unknown"
+
+
+def read_annotations(path, frame_labels):
+    """The annotation CSV with typed columns and without its text copies.
+
+    article_index is an integer, timestamp a datetime, flagged a bool and the
+    frame / corruption answers categoricals.  Of several rows for one coder
+    and article only the latest (by timestamp) is kept.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, usecols=lambda c: c not in TEXT_COLUMNS)
+    df["article_index"] = pd.to_numeric(df["article_index"], errors="coerce").astype("Int64")
+    df = df.dropna(subset=["article_index"])
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", format="ISO8601")
+        df = df.sort_values("timestamp", kind="stable", na_position="first")
+    df = df.drop_duplicates(["user_id", "article_index"], keep="last")
+    if "flagged" in df.columns:
+        df["flagged"] = df["flagged"] == FLAGGED
+    for label in frame_labels:
+        if f"{label}_present" in df.columns:
+            df[f"{label}_present"] = pd.Categorical(df[f"{label}_present"], categories=PRESENCE_VALUES)
+    if "political_corruption" in df.columns:
+        df["political_corruption"] = pd.Categorical(df["political_corruption"], categories=CORRUPTION_VALUES)
+    return df.reset_index(drop=True)
+
+
+def country_from_path(data_path, user_id):
+    """Country in a per-coder dataset name such as "data/United_Kingdom_Elisa_sample_250.csv"."""
+    name = os.path.basename(data_path)
+    marker = f"_{user_id.removeprefix('Test')}_"
+    if marker in name:
+        return name.split(marker, 1)[0]
+    return UNKNOWN_COUNTRY
+
+
+def _read_columns(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).schema_arrow.names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def _iter_chunks(path, columns, chunksize):
+    """(first row, DataFrame) chunks of `columns` of a CSV or Parquet dataset."""
+    offset = 0
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        batches = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns))
+    else:
+        batches = pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunksize)
+    for chunk in batches:
+        yield offset, chunk.reset_index(drop=True)
+        offset += len(chunk)
+
+
+INTEGER_COLUMNS = ["source_row", "cluster_id", "cluster_size"]
+BOOLEAN_COLUMNS = ["is_representative"]
+
+
+def _dataset_type(col):
+    """Arrow type of a dataset column in the export (the ingest.py types, plus cluster columns)."""
+    import pyarrow as pa
+
+    if re.fullmatch(r"frame_\d+_confidence", col):
+        return pa.float64()
+    if re.fullmatch(r"frame_\d+_valid", col) or col in BOOLEAN_COLUMNS:
+        return pa.bool_()
+    if col in INTEGER_COLUMNS:
+        return pa.int64()
+    return pa.string()
+
+
+def _typed_dataset_columns(chunk):
+    import pyarrow as pa
+
+    for col in chunk.columns:
+        kind = _dataset_type(col)
+        if kind == pa.float64():
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce").astype("float64")
+        elif kind == pa.bool_():
+            chunk[col] = chunk[col].astype(str).str.lower().eq("true")
+        elif kind == pa.int64():
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce").astype("Int64")
+        else:
+            chunk[col] = chunk[col].astype("string")
+    return chunk
+
+
+def export_schema(annotations, dataset_columns):
+    """One schema for every part: typed annotation columns, match columns, then dataset columns."""
+    import pyarrow as pa
+
+    meta = annotations.iloc[:0].assign(
+        dataset_file=pd.Series(dtype="string"), file_row=pd.Series(dtype="int64"), match=pd.Series(dtype="string"),
+    )
+    fields = list(pa.Schema.from_pandas(meta, preserve_index=False))
+    names = {f.name for f in fields} | {"country", "coder"}
+    fields += [pa.field(c, _dataset_type(c)) for c in dataset_columns if c not in names]
+    return pa.schema(fields)
+
+
+def resolve_rows(annotations, positions, uris):
+    """Dataset row of every annotation of one data file, and how it was matched.
+
+    `positions[article_index]` is the file row the coder saw (an identity
+    mapping for per-coder files); it is trusted when the uri there matches,
+    otherwise the annotation is matched to the first row with its uri.
+    """
+    index = annotations["article_index"].to_numpy(dtype=np.int64)
+    in_range = (index >= 0) & (index < len(positions))
+    rows = np.full(len(annotations), -1, dtype=np.int64)
+    rows[in_range] = positions[index[in_range]]
+    rows[rows >= len(uris)] = -1
+    ann_uris = annotations["uri"].to_numpy(dtype=object) if "uri" in annotations else np.full(len(annotations), "")
+    row_uris = np.full(len(annotations), None, dtype=object)
+    row_uris[rows >= 0] = uris[rows[rows >= 0]]
+    by_index = (rows >= 0) & ((row_uris == ann_uris) | (ann_uris == ""))
+
+    match = np.full(len(annotations), MATCH_NONE, dtype=object)
+    match[by_index] = MATCH_INDEX
+    first_row = pd.Series(np.arange(len(uris)), index=uris)
+    first_row = first_row[~first_row.index.duplicated()]
+    by_uri = pd.Series(ann_uris).map(first_row).to_numpy()
+    use_uri = ~by_index & ~pd.isna(by_uri)
+    rows[~by_index] = -1
+    rows[use_uri] = by_uri[use_uri].astype(np.int64)
+    match[use_uri] = MATCH_URI
+    return rows, match
+
+
+def export(annotations, sources, out_dir, with_text=False, chunksize=DEFAULT_CHUNKSIZE):
+    """Join typed `annotations` with their datasets and write partitioned Parquet to `out_dir`.
+
+    `sources` maps user_id -> (data_path, positions or None, country); the
+    positions are the assigned file rows for pool coders.  The output is a
+    hive-partitioned dataset (country=.../coder=.../part-*.parquet) that
+    replaces `out_dir` atomically.  Returns a summary dict.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp_dir = f"{out_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    summary = {"annotations": len(annotations), "by_match": {MATCH_INDEX: 0, MATCH_URI: 0, MATCH_NONE: 0}, "parts": 0}
+
+    data_files = sorted({source[0] for source in sources.values() if os.path.exists(source[0])})
+    dataset_columns = []
+    for data_path in data_files:
+        dataset_columns += [c for c in _read_columns(data_path)
+                            if c not in dataset_columns and (with_text or c not in TEXT_COLUMNS)]
+    schema = export_schema(annotations, dataset_columns)
+
+    def write(part):
+        table = pa.Table.from_pandas(part.reindex(columns=schema.names), schema=schema, preserve_index=False)
+        table = table.append_column("country", pa.array(part["country"].fillna(UNKNOWN_COUNTRY).astype(str))) \
+                     .append_column("coder", pa.array(part["user_id"].astype(str)))
+        pq.write_to_dataset(
+            table, tmp_dir, partition_cols=["country", "coder"],
+            basename_template=f"part-{summary['parts']}-{{i}}.parquet",
+        )
+        summary["parts"] += 1
+
+    try:
+        by_file = {}
+        for user_id, group in annotations.groupby("user_id", sort=False):
+            source = sources.get(user_id)
+            if source is None or not os.path.exists(source[0]):
+                summary["by_match"][MATCH_NONE] += len(group)
+                write(group.assign(country=UNKNOWN_COUNTRY, dataset_file="", file_row=-1, match=MATCH_NONE))
+                continue
+            by_file.setdefault(source[0], []).append((group, source[1], source[2]))
+
+        for data_path, groups in by_file.items():
+            available = _read_columns(data_path)
+            columns = [c for c in available if with_text or c not in TEXT_COLUMNS]
+            uris = pd.read_parquet(data_path, columns=["uri"])["uri"] if data_path.endswith(".parquet") \
+                else pd.read_csv(data_path, usecols=["uri"], dtype=str)["uri"]
+            uris = uris.fillna("").to_numpy(dtype=object)
+
+            resolved = []
+            for group, positions, country in groups:
+                if positions is None:
+                    positions = np.arange(len(uris), dtype=np.int64)
+                rows, match = resolve_rows(group, np.asarray(positions, dtype=np.int64), uris)
+                resolved.append(group.assign(
+                    country=country, dataset_file=os.path.basename(data_path), file_row=rows, match=match
+                ))
+            joined = pd.concat(resolved, ignore_index=True)
+            for kind, count in joined["match"].value_counts().items():
+                summary["by_match"][kind] += int(count)
+            unmatched = joined[joined["file_row"] < 0]
+            if len(unmatched):
+                write(unmatched)
+
+            # One pass over the dataset: each chunk is joined with the annotations of its rows
+            matched = joined[joined["file_row"] >= 0].sort_values("file_row")
+            file_rows = matched["file_row"].to_numpy()
+            for offset, chunk in _iter_chunks(data_path, [c for c in columns if c != "uri"], chunksize):
+                lo, hi = np.searchsorted(file_rows, [offset, offset + len(chunk)])
+                if lo == hi:
+                    continue
+                part = matched.iloc[lo:hi]
+                data = chunk.iloc[part["file_row"].to_numpy() - offset].reset_index(drop=True)
+                data = _typed_dataset_columns(data.drop(columns=[c for c in data.columns if c in part.columns]))
+                part = part.reset_index(drop=True)
+                if "country" in chunk.columns:
+                    # A dataset country column wins over the file name
+                    country = chunk["country"].iloc[part["file_row"].to_numpy() - offset].to_numpy()
+                    part["country"] = np.where(pd.isna(country) | (country == ""), part["country"], country)
+                write(pd.concat([part, data], axis=1))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    return summary
@@ -0,0 +1,205 @@
+import os
+import numpy as np
+import pandas as pd
+from utils.evidence_index import EVIDENCE_INDEX_COLUMN, article_evidence_list, unmatched_frames, to_json
+
+# Columns every LLM-annotated input must have; the frame columns below are
+# added (empty) when an input lacks them.
+REQUIRED_COLUMNS = ["uri", "translated_text"]
+N_FRAMES = 7
+FRAME_FIELDS = ["name", "rationale", "confidence", "evidence"]
+
+# Per-frame quality status, decided once at ingestion instead of on every render.
+OK = "ok"
+NOT_PRESENT = "not_present"      # LLM said "NOT <frame>"
+MISSING = "missing"              # no frame name or rationale
+NO_VALID_JSON = "no_valid_json"  # the LLM output could not be parsed
+ERROR = "error"                  # rationale starts with "error" (timeouts etc.)
+BAD_CONFIDENCE = "bad_confidence"
+EVIDENCE_NOT_FOUND = "evidence_not_found"  # quality flag: an evidence phrase is not in translated_text
+
+DEFAULT_CHUNKSIZE = 20_000
+
+
+def frame_columns(i):
+    return {field: f"frame_{i}_{field}" for field in FRAME_FIELDS}
+
+
+def _clean_text(series):
+    """Stripped strings, with NaN and the literal "nan" as empty strings."""
+    cleaned = series.fillna("").astype(str).str.strip()
+    return cleaned.mask(cleaned.str.lower() == "nan", "")
+
+
+def frame_status(name, rationale, confidence):
+    """Vectorized status per row for one frame (same rules as the apps' frame cards)."""
+    lower = rationale.str.lower()
+    status = np.full(len(name), OK, dtype=object)
+    status[(confidence.isna()).to_numpy()] = BAD_CONFIDENCE
+    status[name.str.upper().str.startswith("NOT ").to_numpy()] = NOT_PRESENT
+    status[lower.str.startswith("error").to_numpy()] = ERROR
+    status[lower.str.contains("no valid json", regex=False).to_numpy()] = NO_VALID_JSON
+    missing = (rationale == "") | name.str.lower().isin(["", "none", "nan"])
+    status[missing.to_numpy()] = MISSING
+    return status
+
+
+def normalize_chunk(chunk):
+    """Validate one parsed chunk and add normalized frame columns and quality flags.
+
+    Frame names/rationales/evidence become stripped strings, confidences floats
+    (NaN when unparseable); each frame gets `frame_<i>_status` and a boolean
+    `frame_<i>_valid` (shown as a frame card), and each row a `quality_flags`
+    string such as "frame_2:error;frame_5:no_valid_json;missing_translated_text".
+    It also gets the JSON evidence index (evidence phrase -> paragraph and
+    offsets in translated_text, see utils/evidence_index.py); frames whose
+    evidence is not in the text are flagged "frame_<i>:evidence_not_found".
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    flags = pd.Series("", index=chunk.index)
+    for i in range(1, N_FRAMES + 1):
+        cols = frame_columns(i)
+        for field, col in cols.items():
+            if col not in chunk.columns:
+                chunk[col] = np.nan if field == "confidence" else ""
+        for field in ("name", "rationale", "evidence"):
+            chunk[cols[field]] = _clean_text(chunk[cols[field]])
+        chunk[cols["confidence"]] = pd.to_numeric(chunk[cols["confidence"]], errors="coerce").astype("float64")
+
+        status = frame_status(chunk[cols["name"]], chunk[cols["rationale"]], chunk[cols["confidence"]])
+        chunk[f"frame_{i}_status"] = status
+        chunk[f"frame_{i}_valid"] = status == OK
+        bad = ~np.isin(status, [OK, NOT_PRESENT])
+        flags = flags.where(~bad, flags + f"frame_{i}:" + pd.Series(status, index=chunk.index) + ";")
+
+    indexes = article_evidence_list(chunk)
+    unmatched = [unmatched_frames(index) for index in indexes]
+    for i in range(1, N_FRAMES + 1):
+        missing_evidence = np.array([i in frames for frames in unmatched], dtype=bool)
+        missing_evidence &= chunk[f"frame_{i}_valid"].to_numpy()
+        flags = flags.where(~missing_evidence, flags + f"frame_{i}:{EVIDENCE_NOT_FOUND};")
+    chunk[EVIDENCE_INDEX_COLUMN] = [to_json(index) for index in indexes]
+
+    for col in REQUIRED_COLUMNS:
+        empty = _clean_text(chunk[col]) == ""
+        flags = flags.where(~empty, flags + f"missing_{col};")
+    chunk["quality_flags"] = flags.str.rstrip(";")
+    return chunk
+
+
+class UriDeduplicator:
+    """Drops rows whose uri was already seen, across chunks and input files.
+
+    Only 64-bit hashes of the uris are kept, so memory grows with the number of
+    distinct articles (~70 bytes each), not with their text.  Rows without a
+    uri are never treated as duplicates.
+    """
+
+    def __init__(self):
+        self._seen = set()
+
+    def __call__(self, chunk):
+        uris = chunk["uri"]
+        hashes = pd.util.hash_pandas_object(uris.astype(str), index=False).to_numpy()
+        keep = np.ones(len(chunk), dtype=bool)
+        has_uri = uris.notna().to_numpy() & (uris.astype(str).str.strip() != "").to_numpy()
+        # First occurrence within the chunk, then against earlier chunks
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        seen = self._seen
+        for pos in np.flatnonzero(has_uri):
+            h = int(hashes[pos])
+            if not first[pos] or h in seen:
+                keep[pos] = False
+            else:
+                seen.add(h)
+        return chunk[keep]
+
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    fields = []
+    for col in columns:
+        if col.endswith("_confidence") and col.startswith("frame_"):
+            fields.append(pa.field(col, pa.float64()))
+        elif col.endswith("_valid") and col.startswith("frame_"):
+            fields.append(pa.field(col, pa.bool_()))
+        elif col == "source_row":
+            fields.append(pa.field(col, pa.int64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def ingest(inputs, out_path, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """Stream CSV `inputs` into one deduplicated, normalized Parquet file.
+
+    Every input is parsed `chunksize` rows at a time (all columns as strings,
+    so chunk dtypes cannot drift) and each chunk is written as its own row
+    group, so memory stays bounded by the chunk size plus the uri hashes.
+    The output has the union of the inputs' columns (empty where an input
+    lacks one), so columns that only later files have are kept.
+    Returns a summary dict.  Rows are renumbered by the deduplication, so use
+    the output as a new pool (e.g. with make_assignments.py) rather than in
+    place of a CSV that existing sessions index into.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Headers first: the Parquet schema is fixed by the first chunk written
+    columns = []
+    for input_path in inputs:
+        header = pd.read_csv(input_path, nrows=0).columns
+        missing = [c for c in REQUIRED_COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"{input_path}: missing required column(s): {', '.join(missing)}")
+        columns += [c for c in header if c not in columns]
+
+    dedup = UriDeduplicator()
+    summary = {"rows_read": 0, "rows_written": 0, "duplicates": 0, "rows_flagged": 0,
+               "evidence_not_found": 0, "status_counts": {}}
+    writer = None
+    schema = None
+    tmp_path = out_path + ".tmp"
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    try:
+        for input_path in inputs:
+            offset = 0
+            for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype=str):
+                chunk = chunk.reindex(columns=columns)
+                chunk.insert(0, "source_row", np.arange(offset, offset + len(chunk), dtype="int64"))
+                chunk.insert(0, "source_file", os.path.basename(input_path))
+                offset += len(chunk)
+                summary["rows_read"] += len(chunk)
+
+                chunk = normalize_chunk(chunk)
+                kept = dedup(chunk)
+                summary["duplicates"] += len(chunk) - len(kept)
+                summary["rows_flagged"] += int((kept["quality_flags"] != "").sum())
+                summary["evidence_not_found"] += int(kept["quality_flags"].str.contains(EVIDENCE_NOT_FOUND).sum())
+                for i in range(1, N_FRAMES + 1):
+                    for status, count in kept[f"frame_{i}_status"].value_counts().items():
+                        summary["status_counts"][status] = summary["status_counts"].get(status, 0) + int(count)
+
+                if schema is None:
+                    schema = _arrow_schema(kept.columns)
+                    writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+                kept = kept.reindex(columns=schema.names)
+                writer.write_table(pa.Table.from_pandas(kept, schema=schema, preserve_index=False))
+                summary["rows_written"] += len(kept)
+                if progress is not None:
+                    progress(input_path, summary)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if writer is None:
+        raise ValueError("No rows found in the input file(s)")
+    writer.close()
+    os.replace(tmp_path, out_path)
+    return summary
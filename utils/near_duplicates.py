@@ -0,0 +1,198 @@
+import re
+import zlib
+import hashlib
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+# MinHash over word shingles of translated_text, banded for LSH.
+# 128 permutations in 16 bands of 8 rows puts the LSH candidate threshold near
+# a Jaccard similarity of 0.7; candidates are then checked against THRESHOLD.
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_WORDS = 5
+THRESHOLD = 0.8
+TEXT_COLUMN = "translated_text"
+
+_WORD = re.compile(r"\w+")
+
+
+def _permutations(num_perm, seed=1):
+    """Odd multipliers and offsets: x -> a*x + b (mod 2**64) is a bijection per pair."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def normalize(text):
+    """Lowercased words; the unit both exact and near-duplicate checks work on."""
+    if not isinstance(text, str):
+        return []
+    return _WORD.findall(text.lower())
+
+
+def shingle_hashes(words, k=SHINGLE_WORDS):
+    """Distinct uint64 hashes of the k-word shingles (a rolling combine of word CRCs)."""
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    tokens = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    if len(tokens) < k:
+        k = len(tokens)
+    with np.errstate(over="ignore"):
+        combined = np.zeros(len(tokens) - k + 1, dtype=np.uint64)
+        for offset in range(k):
+            combined = combined * np.uint64(0x100000001B3) + tokens[offset:offset + len(combined)]
+    return np.unique(combined)
+
+
+def signature(words, perms):
+    """MinHash signature (top 32 bits of each permutation's minimum)."""
+    a, b = perms
+    shingles = shingle_hashes(words)
+    if len(shingles) == 0:
+        return np.full(len(a), np.iinfo(np.uint32).max, dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        hashed = shingles[:, None] * a[None, :] + b[None, :]
+    return (hashed.min(axis=0) >> np.uint64(32)).astype(np.uint32)
+
+
+def _signatures_chunk(args):
+    texts, num_perm = args
+    perms = _permutations(num_perm)
+    sigs = np.empty((len(texts), num_perm), dtype=np.uint32)
+    digests = []
+    for row, text in enumerate(texts):
+        words = normalize(text)
+        sigs[row] = signature(words, perms)
+        digests.append(hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).digest() if words else None)
+    return sigs, digests
+
+
+def compute_signatures(texts, num_perm=NUM_PERM, workers=None, chunk=2000):
+    """MinHash signatures and exact-content digests for all texts, computed in parallel."""
+    texts = list(texts)
+    jobs = [(texts[i:i + chunk], num_perm) for i in range(0, len(texts), chunk)]
+    if workers == 1 or len(jobs) <= 1:
+        results = [_signatures_chunk(job) for job in jobs]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(_signatures_chunk, jobs)
+    if not results:
+        return np.empty((0, num_perm), dtype=np.uint32), []
+    return np.vstack([r[0] for r in results]), [d for r in results for d in r[1]]
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = np.arange(n)
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, x, y):
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            # The smaller position stays root, so it becomes the representative
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+
+def cluster(texts, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS, workers=None):
+    """Cluster id per text: the position of the first article in its duplicate cluster.
+
+    Identical word sequences are merged directly; other pairs are merged when
+    they share an LSH bucket and their estimated Jaccard similarity (fraction of
+    equal MinHash values) reaches `threshold`.  Empty texts stay singletons.
+    """
+    sigs, digests = compute_signatures(texts, num_perm, workers)
+    n = len(digests)
+    uf = _UnionFind(n)
+
+    first_with_digest = {}
+    for pos, digest in enumerate(digests):
+        if digest is None:
+            continue
+        if digest in first_with_digest:
+            uf.union(first_with_digest[digest], pos)
+        else:
+            first_with_digest[digest] = pos
+
+    has_text = np.array([d is not None for d in digests], dtype=bool)
+    rows = num_perm // bands
+    for band in range(bands):
+        block = np.ascontiguousarray(sigs[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, bucket = np.unique(keys, return_inverse=True)
+        bucket = np.where(has_text, bucket, -1 - np.arange(n))  # never bucket empty texts
+        order = np.argsort(bucket, kind="stable")
+        sorted_buckets = bucket[order]
+        starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+        for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            members = order[start:start + size]
+            head = members[0]
+            similarity = (sigs[members[1:]] == sigs[head]).mean(axis=1)
+            for member in members[1:][similarity >= threshold]:
+                uf.union(head, member)
+
+    return np.array([uf.find(i) for i in range(n)], dtype=np.int64)
+
+
+def add_cluster_columns(df, text_column=TEXT_COLUMN, **kwargs):
+    """`df` with cluster_id, cluster_size and is_representative columns added.
+
+    Row positions are unchanged, so the result can replace the dataset that
+    sessions and assignments index into.
+    """
+    cluster_ids = cluster(df[text_column].tolist(), **kwargs)
+    out = df.copy()
+    out["cluster_id"] = cluster_ids
+    out["cluster_size"] = pd.Series(cluster_ids).map(pd.Series(cluster_ids).value_counts()).to_numpy()
+    out["is_representative"] = cluster_ids == np.arange(len(df))
+    return out
+
+
+def propagate_labels(annotations, dataset):
+    """Copy annotations of cluster representatives to the other cluster members.
+
+    `dataset` is the clustered pool the coders worked from.  Annotations and
+    dataset rows are matched by `uri`; copies get the member's uri, texts and
+    pool row (`pool_row`, filled from the uri for annotations that lack it),
+    plus a `copied_from_uri` column.  A copy has no article_index: that is a
+    position in the coder's own list, which never held the member.  Members
+    that already have an annotation by the same coder are left alone.
+    """
+    pool_rows = pd.Series(np.arange(len(dataset)), index=dataset["uri"].to_numpy())
+    pool_rows = pool_rows[~pool_rows.index.duplicated()]
+    known = pd.to_numeric(annotations["pool_row"], errors="coerce") if "pool_row" in annotations else None
+    by_uri = annotations["uri"].map(pool_rows)
+    annotations = annotations.assign(pool_row=(by_uri if known is None else known.fillna(by_uri)).astype("Int64"))
+
+    member_pos = np.flatnonzero(~dataset["is_representative"].to_numpy())
+    members = dataset.iloc[member_pos]
+    rep_uri = dataset["uri"].to_numpy()[members["cluster_id"].to_numpy()]
+    links = pd.DataFrame({"uri": rep_uri, "member_uri": members["uri"].to_numpy(), "member_index": member_pos})
+    for col in ("original_text", "translated_text"):
+        if col in members:
+            links[f"member_{col}"] = members[col].to_numpy()
+
+    copies = annotations.merge(links, on="uri", how="inner")
+    if copies.empty:
+        return annotations.assign(copied_from_uri="")
+    copies["copied_from_uri"] = copies["uri"]
+    copies["uri"] = copies.pop("member_uri")
+    copies["pool_row"] = copies.pop("member_index")
+    copies["article_index"] = pd.NA
+    for col in ("original_text", "translated_text"):
+        if f"member_{col}" in copies:
+            copies[col] = copies.pop(f"member_{col}")
+    existing = set(zip(annotations["user_id"], annotations["uri"]))
+    copies = copies[[pair not in existing for pair in zip(copies["user_id"], copies["uri"])]]
+    columns = annotations.columns.tolist() + ["copied_from_uri"]
+    return pd.concat([annotations.assign(copied_from_uri=""), copies[columns]], ignore_index=True)
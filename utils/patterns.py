@@ -0,0 +1,28 @@
+import re
+from functools import lru_cache
+
+KEYWORD_STYLE = "background-color: #cce5ff; padding: 2px; border-radius: 4px;"
+_TAG_SPLIT = re.compile(r"(<[^>]+>)")
+
+
+@lru_cache(maxsize=64)
+def keyword_pattern(terms):
+    """One compiled, case-insensitive whole-word pattern for a tuple of terms.
+
+    Cached per process, so every study and session served from one server
+    shares the compiled pattern.  Longer terms come first so "abuse of power"
+    wins over a shorter term it contains.
+    """
+    alternation = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+
+def highlight_keywords(text, terms):
+    """Wrap every key term outside existing HTML tags in a highlight span."""
+    pattern = keyword_pattern(tuple(terms))
+    replacement = rf"<span style='{KEYWORD_STYLE}'>\g<0></span>"
+    parts = _TAG_SPLIT.split(text)
+    for i, part in enumerate(parts):
+        if not part.startswith("<"):
+            parts[i] = pattern.sub(replacement, part)
+    return "".join(parts)
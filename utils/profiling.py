@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import threading
+import tracemalloc
+from collections import deque, defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Opt-in: set ANNOTATOR_PROFILE=1 to time every rerun phase, and additionally
+# ANNOTATOR_PROFILE_MEMORY=1 to track allocations with tracemalloc (slower).
+# tracemalloc only counts for the whole process, so memory is measured once per
+# rerun (not per phase) and reported as process_alloc_kb/process_peak_kb: with
+# several sessions rerunning at once those include the others' allocations, and
+# one session's rerun resets the peak of another's.
+PROFILE_ENABLED = os.environ.get("ANNOTATOR_PROFILE") == "1"
+PROFILE_MEMORY = os.environ.get("ANNOTATOR_PROFILE_MEMORY") == "1"
+PROFILE_DUMP_PATH = os.environ.get("ANNOTATOR_PROFILE_DUMP", "profiling/profile_stats.json")
+
+# Samples kept per phase for the rolling percentiles, and how often to dump.
+WINDOW = 500
+DUMP_EVERY = 50
+
+RERUN_PHASE = "rerun (total)"
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    pos = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[pos]
+
+
+class RerunProfiler:
+    """Rolling wall/CPU timings per named rerun phase (and optionally memory per rerun)."""
+
+    def __init__(self, enabled=PROFILE_ENABLED, memory=PROFILE_MEMORY, window=WINDOW, dump_path=PROFILE_DUMP_PATH):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.dump_path = dump_path
+        self.reruns = 0
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self, name):
+        """Context manager timing one phase; a no-op when profiling is off."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name, memory=False):
+        memory = memory and self.memory
+        if memory:
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            # st.rerun()/st.stop() raise out of phases; they still count.
+            sample = {
+                "wall_ms": (time.perf_counter() - wall_start) * 1000,
+                "cpu_ms": (time.thread_time() - cpu_start) * 1000,
+            }
+            if memory:
+                current, peak = tracemalloc.get_traced_memory()
+                sample["process_alloc_kb"] = (current - mem_start) / 1024
+                sample["process_peak_kb"] = (peak - mem_start) / 1024
+            with self._lock:
+                self._samples[name].append(sample)
+
+    @contextmanager
+    def rerun(self):
+        """Time a whole script run (and its process-wide memory) and dump stats every DUMP_EVERY reruns."""
+        if not self.enabled:
+            yield
+            return
+        try:
+            with self._timed(RERUN_PHASE, memory=True):
+                yield
+        finally:
+            self.reruns += 1
+            if self.reruns % DUMP_EVERY == 0:
+                self.dump()
+
+    def stats(self):
+        """p50/p90/p99/max per phase and metric."""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        result = {}
+        for name, samples in snapshot.items():
+            metrics = {"count": len(samples)}
+            for metric in samples[0]:
+                values = sorted(s[metric] for s in samples)
+                metrics[metric] = {
+                    "p50": _percentile(values, 0.5),
+                    "p90": _percentile(values, 0.9),
+                    "p99": _percentile(values, 0.99),
+                    "max": values[-1],
+                }
+            result[name] = metrics
+        return result
+
+    def top_allocations(self, limit=10):
+        """Largest allocation sites right now (needs ANNOTATOR_PROFILE_MEMORY=1)."""
+        if not self.memory:
+            return []
+        snapshot = tracemalloc.take_snapshot()
+        return [
+            {"where": str(stat.traceback), "size_kb": stat.size / 1024, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]
+        ]
+
+    def dump(self, path=None):
+        """Write the current stats as JSON."""
+        path = path or self.dump_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {"timestamp": time.time(), "pid": os.getpid(), "reruns": self.reruns, "phases": self.stats()}
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2)
+        except OSError as e:
+            print(f"❌ Error writing profile dump: {e}")
+        return path
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """Process-wide profiler shared by all sessions."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = RerunProfiler()
+        return _profiler
+
+
+def render_profile_panel(profiler):
+    """Hidden debug panel, shown only with `?debug=1` in the URL while profiling is on."""
+    import streamlit as st
+    import pandas as pd
+
+    if not profiler.enabled or st.query_params.get("debug") != "1":
+        return
+    with st.expander("🛠️ Rerun profile", expanded=False):
+        rows = []
+        for name, metrics in profiler.stats().items():
+            row = {"phase": name, "count": metrics["count"]}
+            for metric, values in metrics.items():
+                if metric != "count":
+                    row.update({f"{metric} p50": values["p50"], f"{metric} p90": values["p90"],
+                                f"{metric} p99": values["p99"]})
+            rows.append(row)
+        if rows:
+            st.dataframe(pd.DataFrame(rows).set_index("phase").round(2))
+        if profiler.memory and st.button("Show top allocations"):
+            st.table(pd.DataFrame(profiler.top_allocations()))
+        if st.button("Dump profile JSON"):
+            st.caption(f"Written to {profiler.dump()}")
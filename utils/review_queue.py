@@ -0,0 +1,165 @@
+import os
+import csv
+import json
+from datetime import datetime
+from utils.durable import atomic_write_json, file_lock
+from utils.annotation_schema import FLAGGED, NOT_FLAGGED
+
+# Flagged (user_id, article_index) pairs of one study, kept in its session
+# folder.  The annotation writer updates it on every save, so reviewers never
+# have to read the annotations CSV; it holds only flagged items (plus resolved
+# ones), not every annotation.
+FLAG_INDEX_NAME = "flagged.json"
+
+OPEN = "open"
+RESOLVED = "resolved"
+STATUSES = [OPEN, RESOLVED]
+PAGE_SIZE = 10
+
+
+def flag_key(user_id, article_index):
+    return f"{user_id}|{int(article_index)}"
+
+
+def load_flags(path):
+    """The flag index: key -> item dict (empty if there is none yet)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _item(entry, previous=None):
+    item = dict(previous or {})
+    # Items written before "flagged" was tracked were flagged when last saved
+    reflagged = previous is None or not previous.get("flagged", True)
+    item.update({
+        "user_id": entry["user_id"],
+        "article_index": int(entry["article_index"]),
+        "uri": entry.get("uri", ""),
+        "notes": entry.get("notes", ""),
+        "flagged": True,
+    })
+    if reflagged and item.get("status") != OPEN:
+        # New flag, or a coder flagging a resolved article again after
+        # unflagging it: (re)open it.  Re-saving a still-flagged article
+        # (edited notes, Previous then Save) keeps the reviewer's decision.
+        item.update(
+            status=OPEN, resolution="", resolved_by="", resolved_at="",
+            flagged_at=entry.get("timestamp") or datetime.now().isoformat(),
+        )
+    return item
+
+
+def apply_entry(flags, entry):
+    """Update `flags` in place for a saved annotation entry; returns True if it changed."""
+    key = flag_key(entry["user_id"], entry["article_index"])
+    previous = flags.get(key)
+    if str(entry.get("flagged", NOT_FLAGGED)) == FLAGGED:
+        item = _item(entry, previous)
+        if item == previous:
+            return False
+        flags[key] = item
+        return True
+    if previous is not None and previous.get("status") == OPEN:
+        # Unflagged before anyone reviewed it
+        del flags[key]
+        return True
+    if previous is not None and previous.get("flagged", True):
+        # Unflagged after review: keep the decision, and reopen if flagged again
+        flags[key] = dict(previous, flagged=False)
+        return True
+    return False
+
+
+def update_flag(path, entry):
+    """Record one saved annotation in the flag index (idempotent, so safe on journal replay)."""
+    with file_lock(path):
+        flags = load_flags(path)
+        if apply_entry(flags, entry):
+            atomic_write_json(path, flags, indent=None)
+
+
+def resolve_flag(path, user_id, article_index, reviewer, resolution, status=RESOLVED):
+    """Write a reviewer's decision for one flagged article."""
+    with file_lock(path):
+        flags = load_flags(path)
+        key = flag_key(user_id, article_index)
+        if key not in flags:
+            return
+        flags[key].update(
+            status=status,
+            resolution=resolution,
+            resolved_by=reviewer if status == RESOLVED else "",
+            resolved_at=datetime.now().isoformat() if status == RESOLVED else "",
+        )
+        atomic_write_json(path, flags, indent=None)
+
+
+def rebuild_flags(annotation_file, path):
+    """Backfill the index from an existing annotations CSV, one row at a time."""
+    with file_lock(path):
+        flags = load_flags(path)
+        if os.path.exists(annotation_file):
+            with open(annotation_file, "r", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    apply_entry(flags, row)
+        atomic_write_json(path, flags, indent=None)
+    return flags
+
+
+def page_of(flags, status=None, page=0, page_size=PAGE_SIZE):
+    """One page of items (oldest flag first) and the number of matching items."""
+    items = [item for item in flags.values() if status is None or item.get("status") == status]
+    items.sort(key=lambda item: (item.get("flagged_at", ""), item["user_id"], item["article_index"]))
+    return items[page * page_size:(page + 1) * page_size], len(items)
+
+
+def render_review_queue(path, load_article, on_resolve):
+    """Paginated reviewer view over the flag index.
+
+    `load_article(user_id, article_index)` returns the dataset row (or None)
+    the coder saw; `on_resolve(user_id, article_index, resolution, status)`
+    persists a decision.
+    """
+    import streamlit as st
+
+    flags = load_flags(path)
+    status = st.radio("Show", STATUSES + ["all"], horizontal=True, key="review_status")
+    selected = None if status == "all" else status
+    page = st.session_state.get("review_page", 0)
+    items, total = page_of(flags, selected, page)
+    if not items and page > 0:
+        st.session_state["review_page"] = page = 0
+        items, total = page_of(flags, selected, page)
+    n_pages = max(1, -(-total // PAGE_SIZE))
+    st.caption(f"{total} flagged article(s) · page {page + 1} of {n_pages}")
+
+    for item in items:
+        user_id, index = item["user_id"], item["article_index"]
+        with st.expander(f"{'✅' if item['status'] == RESOLVED else '🚩'} {user_id} · article {index + 1}"):
+            st.markdown(f"**Coder notes:** {item.get('notes') or '_none_'}")
+            st.caption(f"Flagged {item.get('flagged_at', '')} · {item.get('uri', '')}")
+            row = load_article(user_id, index)
+            if row is not None:
+                st.write(row.get("translated_text", ""))
+            if item["status"] == RESOLVED:
+                st.success(f"Resolved by {item['resolved_by']} ({item['resolved_at']}): {item['resolution']}")
+            key = flag_key(user_id, index)
+            resolution = st.text_area("Resolution", value=item.get("resolution", ""), key=f"resolution_{key}")
+            col_resolve, col_reopen = st.columns(2)
+            if col_resolve.button("Mark resolved", key=f"resolve_{key}"):
+                on_resolve(user_id, index, resolution, RESOLVED)
+                st.rerun()
+            if item["status"] == RESOLVED and col_reopen.button("Reopen", key=f"reopen_{key}"):
+                on_resolve(user_id, index, resolution, OPEN)
+                st.rerun()
+
+    col_prev, _, col_next = st.columns([1, 4, 1])
+    if col_prev.button("⬅️ Previous page", disabled=page == 0):
+        st.session_state["review_page"] = page - 1
+        st.rerun()
+    if col_next.button("Next page ➡️", disabled=page + 1 >= n_pages):
+        st.session_state["review_page"] = page + 1
+        st.rerun()
@@ -0,0 +1,230 @@
+import os
+import re
+import html
+import numpy as np
+from utils.dataset_cache import file_signature
+from utils.annotation_schema import PRESENT, FLAGGED
+
+# Inverted index over the searchable text of a dataset: a sorted term array
+# plus CSR postings (offsets into one int32 array of row positions).  It is
+# persisted next to the dataset as `<dataset>.search.npz` and reused while the
+# dataset file's size/mtime are unchanged.
+SEARCH_COLUMNS = ["translated_text", "combined_text", "uri"]
+INDEX_SUFFIX = ".search.npz"
+MAX_RESULTS = 50
+SNIPPET_CHARS = 80
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return _WORD.findall(text.lower())
+
+
+class SearchIndex:
+    def __init__(self, terms, offsets, postings, texts):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.texts = texts  # per search column, the dataset's column array (for snippets, not copied)
+
+    @property
+    def nbytes(self):
+        """Memory of the index arrays (the texts belong to the dataset and are not counted)."""
+        return self.terms.nbytes + self.offsets.nbytes + self.postings.nbytes
+
+    @classmethod
+    def build(cls, df, columns=SEARCH_COLUMNS, chunk=5000):
+        """Index `df`; tokens are mapped to ids chunk by chunk so memory stays at ~8 bytes per posting."""
+        columns = [c for c in columns if c in df.columns]
+        vocab = {}
+        term_ids, rows = [], []
+        values = [df[c].tolist() for c in columns]
+        for start in range(0, len(df), chunk):
+            chunk_terms, chunk_rows = [], []
+            for pos in range(start, min(start + chunk, len(df))):
+                tokens = set()
+                for column in values:
+                    tokens.update(tokenize(column[pos]))
+                chunk_terms.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+                chunk_rows.extend([pos] * len(tokens))
+            term_ids.append(np.asarray(chunk_terms, dtype=np.int32))
+            rows.append(np.asarray(chunk_rows, dtype=np.int32))
+        term_ids = np.concatenate(term_ids) if term_ids else np.empty(0, dtype=np.int32)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+
+        # Renumber terms in sorted order, so lookups (and prefix ranges) are a searchsorted
+        terms = np.array(list(vocab), dtype=str)
+        order = np.argsort(terms, kind="stable")
+        rank = np.empty(len(order), dtype=np.int32)
+        rank[order] = np.arange(len(order), dtype=np.int32)
+        sorted_ids = rank[term_ids]
+        by_term = np.lexsort((rows, sorted_ids))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sorted_ids, minlength=len(terms)), out=offsets[1:])
+        return cls(terms[order], offsets, rows[by_term], {c: df[c].array for c in columns})
+
+    def save(self, path, signature):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, terms=self.terms, offsets=self.offsets, postings=self.postings,
+                 signature=np.asarray(signature, dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, df, signature):
+        """The saved index if it was built from this version of the dataset file, else None."""
+        try:
+            with np.load(path) as data:
+                if tuple(data["signature"].tolist()) != tuple(signature):
+                    return None
+                columns = [c for c in SEARCH_COLUMNS if c in df.columns]
+                return cls(data["terms"], data["offsets"], data["postings"],
+                           {c: df[c].array for c in columns})
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _rows_for(self, term, prefix=False):
+        lo = np.searchsorted(self.terms, term, side="left")
+        if prefix:
+            hi = np.searchsorted(self.terms, term + "\uffff", side="left")
+        else:
+            hi = lo + 1 if lo < len(self.terms) and self.terms[lo] == term else lo
+        if hi <= lo:
+            return np.empty(0, dtype=np.int32)
+        if hi == lo + 1:
+            return self.postings[self.offsets[lo]:self.offsets[hi]]
+        return np.unique(self.postings[self.offsets[lo]:self.offsets[hi]])
+
+    def search(self, query, candidates=None, limit=MAX_RESULTS, scan=20):
+        """Rows containing every query word (the last one as a prefix), exact phrase matches first.
+
+        `candidates` optionally restricts the result to these row positions.
+        Only the first `limit * scan` matching rows are checked for the exact
+        phrase, which bounds the time spent on very common words.
+        Returns a list of (row, column, snippet HTML).
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        rows = None
+        for i, token in enumerate(tokens):
+            hits = self._rows_for(token, prefix=(i == len(tokens) - 1))
+            rows = hits if rows is None else np.intersect1d(rows, hits, assume_unique=True)
+            if len(rows) == 0:
+                return []
+        if candidates is not None:
+            rows = rows[np.isin(rows, candidates)]
+
+        phrase = query.strip().lower()
+        exact, partial = [], []
+        for row in rows[:limit * scan].tolist():
+            match = self._find(row, phrase)
+            if match is not None:
+                exact.append((row,) + match)
+                if len(exact) >= limit:
+                    break
+            elif len(partial) < limit:
+                match = self._find(row, tokens[0])
+                partial.append((row,) + (match or (next(iter(self.texts)), "")))
+        return (exact + partial)[:limit]
+
+    def _find(self, row, needle):
+        for column, values in self.texts.items():
+            text = values[row]
+            if not isinstance(text, str):
+                continue
+            pos = text.lower().find(needle)
+            if pos >= 0:
+                return column, snippet(text, pos, len(needle))
+        return None
+
+
+def snippet(text, pos, length, context=SNIPPET_CHARS):
+    """HTML snippet around text[pos:pos + length], with the match marked."""
+    start, end = max(0, pos - context), min(len(text), pos + length + context)
+    return (
+        ("…" if start > 0 else "")
+        + html.escape(text[start:pos])
+        + "<mark>" + html.escape(text[pos:pos + length]) + "</mark>"
+        + html.escape(text[pos + length:end])
+        + ("…" if end < len(text) else "")
+    )
+
+
+def load_or_build(data_path, df):
+    """Search index for the dataset at `data_path` (already parsed as `df`).
+
+    Loads `<data_path>.search.npz` when it matches the file; otherwise builds
+    the index and saves it for the next process.
+    """
+    signature = file_signature(data_path)
+    index_path = data_path + INDEX_SUFFIX
+    index = SearchIndex.load(index_path, df, signature)
+    if index is None:
+        index = SearchIndex.build(df)
+        try:
+            index.save(index_path, signature)
+        except OSError as e:
+            print(f"⚠️ Could not save search index {index_path}: {e}")
+    return index
+
+
+# Filters over the coder's own annotations (keyed by article position).
+FILTER_ALL = "All articles"
+FILTER_UNLABELED = "Not yet labeled"
+FILTER_LABELED = "Labeled"
+FILTER_FLAGGED = "Flagged"
+
+
+def annotation_filter(annotations, choice, frame_labels):
+    """Predicate on a coder position for a filter choice (None for no filtering)."""
+    if choice == FILTER_ALL:
+        return None
+    if choice == FILTER_UNLABELED:
+        return lambda pos: pos not in annotations
+    if choice == FILTER_LABELED:
+        return lambda pos: pos in annotations
+    if choice == FILTER_FLAGGED:
+        return lambda pos: annotations.get(pos, {}).get("flagged") == FLAGGED
+    label = choice.split(": ", 1)[1]
+    return lambda pos: annotations.get(pos, {}).get(f"{label}_present") == PRESENT
+
+
+def render_search_box(get_index, df, annotations, frame_labels, on_jump):
+    """Search expander for the annotation apps.
+
+    `get_index()` returns the SearchIndex; it is only called once there is a
+    query.  `df` is the coder's (possibly subset) dataset; its index labels are
+    row positions in the indexed file.  `on_jump(position)` is called with the
+    coder's 0-based article position when a result is chosen.
+    """
+    import streamlit as st
+
+    with st.expander("🔎 Search articles", expanded=False):
+        query = st.text_input("Words, a phrase or a uri", key="search_query")
+        filters = [FILTER_ALL, FILTER_UNLABELED, FILTER_LABELED, FILTER_FLAGGED]
+        filters += [f"Frame present: {label}" for label in frame_labels]
+        choice = st.selectbox("Show", filters, key="search_filter")
+        if not query.strip():
+            return
+
+        file_rows = np.asarray(df.index, dtype=np.int64)
+        results = get_index().search(query, candidates=file_rows, limit=MAX_RESULTS * 4)
+        position_of = dict(zip(file_rows.tolist(), range(len(file_rows))))
+        keep = annotation_filter(annotations, choice, frame_labels)
+        shown = 0
+        for row, column, snip in results:
+            pos = position_of[row]
+            if keep is not None and not keep(pos):
+                continue
+            shown += 1
+            col_text, col_button = st.columns([6, 1])
+            col_text.markdown(f"**Article {pos + 1}** · _{column}_<br>{snip}", unsafe_allow_html=True)
+            if col_button.button("Open", key=f"search_open_{pos}"):
+                on_jump(pos)
+            if shown >= MAX_RESULTS:
+                break
+        if not shown:
+            st.caption("No matching articles.")
@@ -0,0 +1,197 @@
+import json
+import math
+import struct
+from datetime import datetime
+import numpy as np
+from utils.annotation_schema import PRESENT, NOT_PRESENT, CORRUPTION_VALUES, FLAGGED, NOT_FLAGGED
+
+# Binary session layout (little endian):
+#   b"ANSS" | u16 format version | u32 header length | header JSON | records
+# The header holds user_id, current_index, the frame labels in bit order and
+# the record count; records are a packed NumPy structured array.  Notes are
+# free text and live in a separate JSON file next to the session.
+MAGIC = b"ANSS"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<4sHI")
+HEADER_FIELDS = ("user_id", "current_index", "frame_labels", "count")
+
+RECORD_DTYPE = np.dtype([
+    ("article_index", "<u4"),
+    ("frames", "<u2"),        # bit i set = FRAME_LABELS[i] "Present"
+    ("corruption", "u1"),     # index into CORRUPTION_CODES (the annotation_schema code)
+    ("flagged", "u1"),
+    ("timestamp", "<f8"),     # seconds since epoch, NaN if unknown
+])
+
+CORRUPTION_CODES = [None, *CORRUPTION_VALUES]
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _encode_timestamp(value):
+    # Timestamps are naive local ISO strings; store them as naive seconds so
+    # they round-trip exactly without timezone conversion.
+    if not value:
+        return math.nan
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return math.nan
+    return (parsed.replace(tzinfo=None) - _EPOCH).total_seconds()
+
+
+def _decode_timestamps(values):
+    """Vectorized inverse of `_encode_timestamp`; None where unknown."""
+    missing = np.isnan(values)
+    micros = np.where(missing, 0, np.round(values * 1e6)).astype("int64")
+    strings = np.datetime_as_string(micros.astype("datetime64[us]"), unit="us").tolist()
+    return [None if m else s for m, s in zip(missing.tolist(), strings)]
+
+
+def index_annotations(annotations):
+    """Key a list of entries by article index (the in-memory session representation).
+
+    Restoring and upserting an article is then a dict lookup instead of a scan
+    over the coder's whole history; later entries win, as with the old upsert.
+    """
+    if isinstance(annotations, dict):
+        return annotations
+    return {int(entry["article_index"]): entry for entry in annotations}
+
+
+def _entries(annotations):
+    return list(annotations.values()) if isinstance(annotations, dict) else list(annotations)
+
+
+def session_fields(frame_labels):
+    """Entry keys the binary format keeps (article texts and uri live in the dataset)."""
+    return ["user_id", "article_index", "notes", "flagged", "political_corruption", "timestamp"] + [
+        f"{label}_present" for label in frame_labels
+    ]
+
+
+def compact_session(session, frame_labels):
+    """The session as plain JSON data (annotations as a list), each entry reduced to `session_fields`."""
+    fields = session_fields(frame_labels)
+    return dict(session, annotations=[
+        {k: entry[k] for k in fields if k in entry} for entry in _entries(session.get("annotations", []))
+    ])
+
+
+def encode_session(session, frame_labels):
+    """Encode a session dict; returns (bytes, notes) with notes keyed by article index."""
+    if len(frame_labels) > 16:
+        raise ValueError("At most 16 frame labels fit in a record")
+    annotations = _entries(session.get("annotations", []))
+    records = np.zeros(len(annotations), dtype=RECORD_DTYPE)
+    notes = {}
+    for pos, entry in enumerate(annotations):
+        index = int(entry["article_index"])
+        bits = 0
+        for bit, label in enumerate(frame_labels):
+            if entry.get(f"{label}_present") == PRESENT:
+                bits |= 1 << bit
+        corruption = entry.get("political_corruption")
+        records[pos] = (
+            index,
+            bits,
+            CORRUPTION_CODES.index(corruption) if corruption in CORRUPTION_CODES else 0,
+            str(entry.get("flagged", NOT_FLAGGED)) == FLAGGED,
+            _encode_timestamp(entry.get("timestamp")),
+        )
+        note = entry.get("notes")
+        if isinstance(note, str) and note:
+            notes[str(index)] = note
+
+    header = json.dumps({
+        "user_id": session.get("user_id"),
+        "current_index": int(session.get("current_index", 0)),
+        "frame_labels": list(frame_labels),
+        "count": len(records),
+    }).encode("utf-8")
+    return _PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)) + header + records.tobytes(), notes
+
+
+def read_header(data: bytes):
+    """Parse and validate the prefix and header; returns (header dict, record offset)."""
+    if len(data) < _PREFIX.size:
+        raise ValueError("Session data too short")
+    magic, version, header_len = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a binary session file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Session format version {version} is newer than supported ({FORMAT_VERSION})")
+    offset = _PREFIX.size + header_len
+    header = json.loads(data[_PREFIX.size:offset].decode("utf-8"))
+    # A damaged header raises ValueError like the rest, not KeyError/TypeError
+    if not isinstance(header, dict) or any(key not in header for key in HEADER_FIELDS):
+        raise ValueError("Session header is incomplete")
+    if not isinstance(header["count"], int) or header["count"] < 0:
+        raise ValueError(f"Bad record count {header['count']!r} in session header")
+    header["version"] = version
+    expected = offset + header["count"] * RECORD_DTYPE.itemsize
+    if len(data) != expected:
+        raise ValueError(f"Session data truncated ({len(data)} of {expected} bytes)")
+    return header, offset
+
+
+def decode_records(data: bytes):
+    """Header plus the raw record array (no per-entry Python objects)."""
+    header, offset = read_header(data)
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=header["count"], offset=offset)
+    if len(records) and records["corruption"].max() >= len(CORRUPTION_CODES):
+        raise ValueError("Unknown political_corruption code in session records")
+    return header, records
+
+
+def decode_entries(records, frame_labels, user_id, notes=None):
+    """Rebuild the apps' annotation dicts, keyed by article index, from a record array."""
+    notes = notes or {}
+    indices = records["article_index"].tolist()
+    frames = records["frames"]
+    present = [
+        np.where((frames >> bit) & 1, PRESENT, NOT_PRESENT).tolist()
+        for bit in range(len(frame_labels))
+    ]
+    keys = [f"{label}_present" for label in frame_labels]
+    flagged = np.where(records["flagged"] != 0, FLAGGED, NOT_FLAGGED).tolist()
+    corruption = [CORRUPTION_CODES[c] for c in records["corruption"].tolist()]
+    timestamps = _decode_timestamps(records["timestamp"])
+
+    entries = {}
+    for pos, index in enumerate(indices):
+        entry = {
+            "user_id": user_id,
+            "article_index": index,
+            "notes": notes.get(str(index), ""),
+            "flagged": flagged[pos],
+        }
+        # Unset fields are left out so the apps' .get() defaults still apply
+        if corruption[pos] is not None:
+            entry["political_corruption"] = corruption[pos]
+        if timestamps[pos] is not None:
+            entry["timestamp"] = timestamps[pos]
+        for key, column in zip(keys, present):
+            entry[key] = column[pos]
+        entries[index] = entry
+    return entries
+
+
+def decode_session(data: bytes, notes=None):
+    """Decode bytes from `encode_session` back into the app's session dict."""
+    header, records = decode_records(data)
+    return {
+        "user_id": header["user_id"],
+        "current_index": header["current_index"],
+        "annotations": decode_entries(records, header["frame_labels"], header["user_id"], notes),
+    }
+
+
+def export_json(data: bytes, notes=None, indent=2):
+    """Human-readable JSON of a binary session, for inspection."""
+    header, _ = read_header(data)
+    session = decode_session(data, notes)
+    session["annotations"] = _entries(session["annotations"])
+    session["format_version"] = header["version"]
+    return json.dumps(session, indent=indent, ensure_ascii=False)
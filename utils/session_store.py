@@ -0,0 +1,260 @@
+import os
+import json
+import numpy as np
+from utils.annotation_schema import upsert_annotations
+from utils.durable import WriteAheadJournal, atomic_write, atomic_write_json, file_lock
+from utils.review_queue import FLAG_INDEX_NAME, update_flag, resolve_flag
+from utils.session_format import encode_session, decode_session, compact_session, index_annotations
+from utils.shared_state import get_versions
+
+# Storage of the labeling apps (annetator_final_sample.py, annetator_no_frames.py).
+# One folder per study holds:
+#
+# * each coder's session: `<user>_session.bin` plus `<user>_notes.json` (see
+#   session_format.py), or a legacy `<user>_session.json`;
+# * the write-ahead journal every session, annotation and review write goes
+#   through, so a crash mid-write is finished on the next start;
+# * the version counter of every session (compare-and-swap saves, see
+#   SessionStore.save_session);
+# * the index of flagged articles (see review_queue.py).
+#
+# The annotation CSV is wherever the app keeps it.
+JOURNAL_NAME = "write_ahead.journal"
+VERSIONS_FOLDER_NAME = "versions"
+
+
+def json_default(obj):
+    """Convert NumPy scalars/arrays (e.g. from DataFrame rows) for json.dump."""
+    if isinstance(obj, (np.integer,)):
+        return int(obj)
+    if isinstance(obj, (np.floating,)):
+        return float(obj)
+    if isinstance(obj, (np.ndarray,)):
+        return obj.tolist()
+    raise TypeError(f"Unserializable object {obj} of type {type(obj)}")
+
+
+def fallback_session(user_id):
+    """Create an empty session structure for a new user."""
+    return {"user_id": user_id, "current_index": 0, "annotations": {}}
+
+
+def merge_sessions(latest, ours):
+    """Merge `ours` into the session saved since it was loaded, article by article.
+
+    Each article keeps the more recent of the two entries (by timestamp, ours
+    on a tie), articles only one side has are kept, and the position is ours:
+    the tab saving is the one the coder is using.
+    """
+    annotations = dict(latest.get("annotations", {}))
+    for index, entry in ours.get("annotations", {}).items():
+        theirs = annotations.get(index)
+        if theirs is None or (entry.get("timestamp") or "") >= (theirs.get("timestamp") or ""):
+            annotations[index] = entry
+    return dict(ours, annotations=annotations)
+
+
+def pin_articles(df, user_id, current):
+    """The dataset version the current article was opened with.
+
+    A hot reload only reaches a coder when they move to another article, so the
+    text and frames never change under them mid-annotation.
+    """
+    import streamlit as st
+
+    pinned = st.session_state.get("pinned_articles")
+    if pinned is not None and pinned[:2] == (user_id, current):
+        return pinned[2]
+    st.session_state["pinned_articles"] = (user_id, current, df)
+    return df
+
+
+class SessionStore:
+    """One study's sessions, annotation CSV, flag index and write-ahead journal.
+
+    Cheap to create: the apps build one from their config on every use, so
+    they pick up a changed SESSION_FOLDER or ANNOTATION_FILE (as the
+    benchmarks set them).
+    """
+
+    def __init__(self, folder, annotation_file, schema, frame_labels):
+        self.folder = folder
+        self.annotation_file = annotation_file
+        self.schema = schema
+        self.frame_labels = frame_labels
+
+    # === Paths ===
+    def session_path(self, user_id, ext="bin"):
+        """Path of a coder's session file (binary by default, "json" for the legacy format)."""
+        return os.path.join(self.folder, f"{user_id}_session.{ext}")
+
+    def notes_path(self, user_id):
+        return os.path.join(self.folder, f"{user_id}_notes.json")
+
+    def flag_index_path(self):
+        """Index of flagged articles, kept next to the sessions (see utils/review_queue.py)."""
+        return os.path.join(self.folder, FLAG_INDEX_NAME)
+
+    def versions(self):
+        """Version counter of every coder's session, shared by all worker processes."""
+        return get_versions(os.path.join(self.folder, VERSIONS_FOLDER_NAME))
+
+    # === Reading sessions ===
+    def load_notes(self, user_id):
+        """The coder's notes by article index ({} if none).
+
+        An unreadable notes file is set aside on its own: the binary session is
+        still good, and only the notes are lost.
+        """
+        path = self.notes_path(user_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                notes = json.load(f)
+            if not isinstance(notes, dict):
+                raise ValueError("notes file is not a JSON object")
+            return notes
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            os.replace(path, f"{path}.corrupt")
+            print(f"❌ Unreadable notes file moved to {path}.corrupt")
+            return {}
+
+    def load_session(self, user_id):
+        """Load a coder's session from disk (binary format, falling back to legacy JSON)."""
+        path = self.session_path(user_id)
+        if not os.path.exists(path):
+            with open(self.session_path(user_id, "json"), "r", encoding="utf-8") as f:
+                session = json.load(f)
+            session["annotations"] = index_annotations(session.get("annotations", []))
+            return session
+        with open(path, "rb") as f:
+            data = f.read()
+        return decode_session(data, self.load_notes(user_id))
+
+    def read_saved_session(self, user_id):
+        """The session file's contents (a blank session if there is none or it is unreadable)."""
+        try:
+            return self.load_session(user_id)
+        except FileNotFoundError:
+            return fallback_session(user_id)
+        except ValueError:
+            # Keep the unreadable file for inspection instead of silently dropping it
+            path = self.session_path(user_id)
+            if not os.path.exists(path):
+                path = self.session_path(user_id, "json")
+            os.replace(path, f"{path}.corrupt")
+            print(f"❌ Unreadable session file moved to {path}.corrupt")
+            return fallback_session(user_id)
+
+    def prepare(self):
+        """Create the folder and finish the writes a crashed process left in the journal (once per process)."""
+        os.makedirs(self.folder, exist_ok=True)
+        self.journal().replay_once()
+
+    def load_saved_session(self, user_id):
+        """The session as written to disk (a blank session if there is none), with its version."""
+        self.prepare()
+        # Version first: a save landing in between then fails the compare-and-swap
+        # (and merges) instead of being overwritten by this older copy
+        version = self.versions().get(user_id)
+        sess = self.read_saved_session(user_id)
+        sess["version"] = version
+        return sess
+
+    # === Writing ===
+    def journal(self):
+        """Write-ahead journal for session, annotation and review writes (kept in the folder)."""
+        return WriteAheadJournal(
+            os.path.join(self.folder, JOURNAL_NAME),
+            {"session": self.write_session_file, "annotation": self.write_annotation_file,
+             "annotations": self.write_annotation_batch, "review": self.write_review},
+            default=json_default,
+            replayers={"session": self.replay_session_write},
+            # A session write older than one that completed would only roll the coder back
+            latest_only={"session": lambda payload: payload["user_id"]},
+        )
+
+    def save_session(self, user_id, session_data):
+        """Save a coder's session to disk, compare-and-swap on its version.
+
+        If another tab or worker saved since `session_data` was loaded, the saved
+        session is merged in (merge_sessions) rather than overwritten, and
+        `session_data` is updated to the merged result.  Only saves of the same
+        coder wait for each other.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        versions = self.versions()
+        with versions.locked(user_id):
+            current = versions.get(user_id)
+            if session_data.get("version", 0) != current:
+                session_data.update(merge_sessions(self.read_saved_session(user_id), session_data))
+            # `version` is what this write replaces, for replay_session_write
+            payload = {
+                "user_id": user_id, "session": compact_session(session_data, self.frame_labels), "version": current
+            }
+            self.journal().run("session", payload)
+            session_data["version"] = versions.compare_and_set(user_id, current)
+
+    def write_session_file(self, payload):
+        """Atomically replace a coder's binary session and notes files (journal applier)."""
+        user_id = payload["user_id"]
+        data, notes = encode_session(payload["session"], self.frame_labels)
+        atomic_write_json(self.notes_path(user_id), notes, indent=None)
+        atomic_write(self.session_path(user_id), lambda f: f.write(data), binary=True)
+
+    def replay_session_write(self, payload):
+        """Finish a session write that a crashed process left in the journal (journal replayer).
+
+        Runs under the same lock and version bump as save_session.  If the coder's
+        session was saved again since the write started, it is merged into that
+        newer session (its position wins) instead of replacing it.
+        """
+        user_id = payload["user_id"]
+        session = dict(payload["session"], annotations=index_annotations(payload["session"].get("annotations", [])))
+        versions = self.versions()
+        with versions.locked(user_id):
+            current = versions.get(user_id)
+            if payload.get("version") != current:
+                latest = self.read_saved_session(user_id)
+                session = dict(merge_sessions(latest, session), current_index=latest.get("current_index", 0))
+            self.write_session_file({"user_id": user_id, "session": compact_session(session, self.frame_labels)})
+            versions.compare_and_set(user_id, current)
+
+    def save_annotation(self, entry: dict):
+        """Append or update one annotation in the CSV and write it back to disk."""
+        try:
+            self.journal().run("annotation", entry)
+        except Exception as e:
+            print(f"❌ Error saving annotation: {e}")
+
+    def write_annotation_file(self, entry: dict):
+        """Upsert one annotation in the CSV under a file lock (journal applier)."""
+        self.write_annotation_rows([entry])
+
+    def write_annotation_batch(self, payload):
+        """Upsert a batch of buffered annotations in one CSV rewrite (journal applier)."""
+        self.write_annotation_rows(payload["entries"])
+
+    def write_annotation_rows(self, entries):
+        """Upsert annotations in the CSV under a file lock, then update the flag index."""
+        with file_lock(self.annotation_file):
+            # Read and validation errors propagate: the journal then keeps the
+            # write pending instead of replacing the file with only these entries.
+            # Later entries for the same article replace earlier ones.
+            latest = upsert_annotations(self.annotation_file, self.schema, entries, keep_history=True)
+        for entry in latest:
+            update_flag(self.flag_index_path(), entry)
+
+    def save_review(self, reviewer, user_id, article_index, resolution, status):
+        """Durably record a review decision."""
+        os.makedirs(self.folder, exist_ok=True)
+        self.journal().run("review", {
+            "reviewer": reviewer, "user_id": user_id, "article_index": int(article_index),
+            "resolution": resolution, "status": status,
+        })
+
+    def write_review(self, payload):
+        """Store a reviewer's decision on a flagged article (journal applier)."""
+        resolve_flag(self.flag_index_path(), payload["user_id"], payload["article_index"],
+                     payload["reviewer"], payload["resolution"], payload["status"])
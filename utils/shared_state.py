@@ -0,0 +1,173 @@
+import os
+import json
+import threading
+from utils.durable import atomic_write, file_lock
+
+# State shared by several Streamlit worker processes on one host (see
+# serve_workers.py).  Two pieces:
+#
+# * Datasets: with ANNOTATOR_SHARED_DATASETS=1 the dataset cache loads every
+#   dataset from an Arrow IPC copy next to it (`<dataset>.arrow`, written once
+#   by whichever worker needs it first) that is memory-mapped, and text columns
+#   stay Arrow-backed.  The article texts then live once in the OS page cache
+#   instead of once per worker.
+# * Versions: a counter per key (e.g. a coder's session) with compare-and-set,
+#   kept in small files so every worker sees the same value.  The "local"
+#   backend (ANNOTATOR_SHARED_STATE=local) keeps them in memory, as a stand-in
+#   for tests and single-process runs.
+SHARED_DATASETS = os.environ.get("ANNOTATOR_SHARED_DATASETS", "0") == "1"
+STATE_BACKEND = os.environ.get("ANNOTATOR_SHARED_STATE", "files")
+ARROW_SUFFIX = ".arrow"
+VERSION_SUFFIX = ".version"
+
+
+def arrow_path(path):
+    return path + ARROW_SUFFIX
+
+
+def _source_signature(target):
+    """Signature of the dataset file an Arrow copy was written from (None if unreadable)."""
+    import pyarrow as pa
+
+    try:
+        with pa.memory_map(target) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    value = metadata.get(b"source_signature")
+    return tuple(json.loads(value)) if value else None
+
+
+def export_arrow(path):
+    """Write the Arrow copy of the dataset at `path` unless it is current; returns the copy's path.
+
+    Missing text cells are stored as "" (what the apps treat a missing text
+    as), so Arrow-backed text columns never hold nulls.
+    """
+    import pyarrow as pa
+    from utils.dataset_cache import load_dataset, file_signature
+
+    target = arrow_path(path)
+    signature = file_signature(path)
+    with file_lock(target):
+        if _source_signature(target) == signature:
+            return target
+        df = load_dataset(path)
+        text_columns = df.select_dtypes(include=["object", "string"]).columns
+        df[text_columns] = df[text_columns].fillna("")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata(
+            dict(table.schema.metadata or {}, source_signature=json.dumps(list(signature)))
+        )
+
+        def write_table(f):
+            with pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+
+        atomic_write(target, write_table, binary=True)
+    return target
+
+
+def _arrow_strings(arrow_type):
+    import pandas as pd
+    import pyarrow as pa
+
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def load_shared_dataset(path):
+    """Dataset cache loader: the memory-mapped Arrow copy of `path` as a DataFrame.
+
+    Text columns are zero-copy views of the mapped file; numeric and boolean
+    columns are converted to NumPy as usual (they are small).  An Arrow copy
+    replaced by another worker stays valid for readers of the old mapping.
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(export_arrow(path))).read_all()
+    return table.to_pandas(types_mapper=_arrow_strings)
+
+
+class FileVersions:
+    """Version counters in files under `folder`, shared by every process on the host."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}{VERSION_SUFFIX}")
+
+    def get(self, key):
+        """Current version of `key` (0 if it was never set)."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def compare_and_set(self, key, expected):
+        """Move `key` from version `expected` to the next one; returns the new version, or None if it moved on."""
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(key)
+        with file_lock(path):
+            current = self.get(key)
+            if current != expected:
+                return None
+            # Renamed into place but not fsynced: a bump is only lost by a power
+            # failure, which also ends every session that could act on it
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(str(current + 1))
+            os.replace(tmp_path, path)
+            return current + 1
+
+    def locked(self, key):
+        """Hold `key` (no other process or thread can change it) for a read-check-write."""
+        os.makedirs(self.folder, exist_ok=True)
+        return file_lock(self._path(key))
+
+
+class LocalVersions:
+    """In-memory FileVersions for one process (tests, single-worker runs)."""
+
+    def __init__(self, folder=None):
+        self.folder = folder
+        self._versions = {}
+        self._locks = {}
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def compare_and_set(self, key, expected):
+        with self._lock:
+            if self._versions.get(key, 0) != expected:
+                return None
+            self._versions[key] = expected + 1
+            return expected + 1
+
+    def locked(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.RLock())
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_versions(folder, backend=None):
+    """The process-wide version store for `folder` (ANNOTATOR_SHARED_STATE picks the backend)."""
+    backend = backend or STATE_BACKEND
+    key = (os.path.abspath(folder), backend)
+    with _stores_lock:
+        if key not in _stores:
+            if backend == "local":
+                _stores[key] = LocalVersions(folder)
+            elif backend == "files":
+                _stores[key] = FileVersions(folder)
+            else:
+                raise ValueError(f"Unknown ANNOTATOR_SHARED_STATE backend '{backend}' (use files or local)")
+        return _stores[key]
@@ -0,0 +1,93 @@
+import json
+
+# Keyboard handler injected into the app page (st.html runs it in the page
+# itself, not in an iframe; a rerun replaces the previous handler).  It runs entirely in the
+# browser: digit keys toggle the first radio groups of the labeling form
+# (a two-option Present / Not Present radio; radios take no `shortcut`, unlike
+# submit buttons).  Widgets inside an st.form do not rerun the script, so only
+# the submit costs a server round-trip.  Keys typed into text fields are ignored.
+#
+# The same script times the coder's first change in the form: the form's
+# widgets have no callbacks, so it writes the milliseconds since the article
+# was shown into a hidden text field of the form (see interaction_timer), which
+# reaches the server with the submit.
+_SCRIPT = """
+<script>
+const config = %s;
+const win = window;
+const doc = document;
+if (win.__annotatorKeyHandler) {
+  doc.removeEventListener("keydown", win.__annotatorKeyHandler);
+  doc.removeEventListener("change", win.__annotatorChangeHandler);
+  doc.removeEventListener("input", win.__annotatorChangeHandler);
+}
+win.__annotatorChangeHandler = function (event) {
+  const form = doc.querySelector('[data-testid="stForm"]');
+  const field = form && form.querySelector(`.st-key-${config.timer} input`);
+  if (!field || field.value !== "" || !form.contains(event.target) || field.contains(event.target)) return;
+  // React tracks the value itself: set it through the native setter and
+  // announce it with an input event, as typing would
+  const setValue = Object.getOwnPropertyDescriptor(win.HTMLInputElement.prototype, "value").set;
+  setValue.call(field, String(Math.max(Date.now() - (win.__annotatorShownAt || Date.now()), 0)));
+  field.dispatchEvent(new Event("input", { bubbles: true }));
+};
+win.__annotatorKeyHandler = function (event) {
+  if (event.ctrlKey || event.metaKey || event.altKey || event.repeat) return;
+  const target = event.target;
+  const tag = target && target.tagName;
+  if (tag === "TEXTAREA" || tag === "SELECT" || (tag === "INPUT" && !["radio", "checkbox"].includes(target.type))) return;
+  const form = doc.querySelector('[data-testid="stForm"]');
+  if (!form) return;
+
+  const toggle = Number(event.key);
+  if (Number.isInteger(toggle) && toggle >= 1 && toggle <= config.toggles) {
+    const group = form.querySelectorAll('[data-testid="stRadio"]')[toggle - 1];
+    if (!group) return;
+    const option = Array.from(group.querySelectorAll("label")).find(
+      (label) => !label.querySelector("input").checked
+    );
+    if (option) {
+      event.preventDefault();
+      option.click();
+    }
+  }
+};
+doc.addEventListener("keydown", win.__annotatorKeyHandler);
+doc.addEventListener("change", win.__annotatorChangeHandler);
+doc.addEventListener("input", win.__annotatorChangeHandler);
+</script>
+"""
+
+# Rendered with each article's form: restarts the clock and hides the field
+_TIMER = """
+<style>.st-key-%s { display: none; }</style>
+<script>
+if (window.__annotatorShownFor !== %s) {
+  window.__annotatorShownFor = %s;
+  window.__annotatorShownAt = Date.now();
+}
+</script>
+"""
+
+
+def render_keyboard_shortcuts(toggles, timer_key):
+    """Install the shortcuts: keys 1..`toggles` flip the form's first radios.
+
+    `timer_key` is the key of the form's interaction_timer field.  Letter keys
+    for submit buttons are their own `shortcut` argument.
+    """
+    import streamlit as st
+
+    st.html(_SCRIPT % json.dumps({"toggles": toggles, "timer": timer_key}), unsafe_allow_javascript=True)
+
+
+def interaction_timer(key, shown_for):
+    """Hidden field of the current form: "" until the coder first changes
+    something in it, then the milliseconds from showing article `shown_for`
+    (any JSON-serialisable id) to that change.  Call inside the st.form and
+    reset st.session_state[key] to "" when a new article is shown."""
+    import streamlit as st
+
+    shown_for = json.dumps(json.dumps(shown_for))
+    st.html(_TIMER % (key, shown_for, shown_for), unsafe_allow_javascript=True)
+    st.text_input("First interaction (ms)", key=key, label_visibility="collapsed")
@@ -0,0 +1,102 @@
+import os
+import gzip
+import json
+import time
+import atexit
+import threading
+from collections import deque
+
+TELEMETRY_FOLDER = "telemetry"
+
+# Event names recorded per (user_id, article_index).
+SHOWN = "shown"
+FIRST_INTERACTION = "first_interaction"
+SAVED = "saved"
+
+
+class EventLog:
+    """Buffered, append-only event log.
+
+    `record` only appends a tuple to an in-memory deque, so the click path never
+    touches the disk.  A daemon thread writes the buffer out as JSON lines every
+    `flush_interval` seconds, or sooner once `flush_every` events are waiting.
+    """
+
+    def __init__(self, folder=TELEMETRY_FOLDER, flush_every=100, flush_interval=5.0):
+        self.folder = folder
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer = deque()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def record(self, user_id, article_index, event, at=None, **fields):
+        """Queue one event (at time `at`, default now); returns immediately."""
+        self._buffer.append((time.time() if at is None else at, user_id, int(article_index), event, fields))
+        if len(self._buffer) >= self.flush_every:
+            self._wake.set()
+
+    def flush(self):
+        """Write all buffered events to today's log file."""
+        with self._write_lock:
+            lines = []
+            while self._buffer:
+                ts, user_id, article_index, event, fields = self._buffer.popleft()
+                lines.append(json.dumps({
+                    "ts": ts, "user_id": user_id, "article_index": article_index,
+                    "event": event, **fields
+                }))
+            if not lines:
+                return
+            os.makedirs(self.folder, exist_ok=True)
+            path = os.path.join(self.folder, f"events_{time.strftime('%Y%m%d')}.jsonl")
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            except OSError as e:
+                print(f"❌ Error writing telemetry file: {e}")
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+_event_log = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log(folder=TELEMETRY_FOLDER):
+    """Process-wide event log (survives Streamlit reruns, which re-execute only the script)."""
+    global _event_log
+    with _event_log_lock:
+        if _event_log is None:
+            _event_log = EventLog(folder)
+        return _event_log
+
+
+def read_events(folder=TELEMETRY_FOLDER):
+    """All events in `folder`, in file order (past days may be gzipped by compact_annotations.py)."""
+    events = []
+    if not os.path.isdir(folder):
+        return events
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".jsonl"):
+            opener = open
+        elif name.endswith(".jsonl.gz"):
+            opener = gzip.open
+        else:
+            continue
+        with opener(os.path.join(folder, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    return events
@@ -0,0 +1,118 @@
+import re
+import html
+
+# Long articles are sent to the browser a few paragraphs at a time: the first
+# INITIAL_PARAGRAPHS plus the ones the caller asks for (e.g. paragraphs with LLM
+# evidence) are rendered, the rest only after "Show full text".  Highlighting
+# is done per rendered paragraph, so hidden paragraphs cost nothing.
+INITIAL_PARAGRAPHS = 4
+MAX_PARAGRAPH_CHARS = 2000
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _trimmed(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _split_long(text, start, end, max_chars):
+    """Cut one over-long paragraph at sentence ends (or spaces) into pieces of at most ~max_chars."""
+    spans = []
+    while end - start > max_chars:
+        cut = None
+        for match in _SENTENCE_END.finditer(text, start, start + max_chars):
+            cut = match
+        if cut is None:
+            space = text.rfind(" ", start, start + max_chars)
+            cut_start = cut_end = space if space > start else start + max_chars
+        else:
+            cut_start, cut_end = cut.start(), cut.end()
+        spans.append(_trimmed(text, start, cut_start))
+        start = cut_end
+    spans.append(_trimmed(text, start, end))
+    return [span for span in spans if span[1] > span[0]]
+
+
+def paragraph_spans(text, max_chars=MAX_PARAGRAPH_CHARS):
+    """(start, end) character offsets of the paragraphs of `text`.
+
+    Paragraphs are separated by line breaks; paragraphs longer than
+    `max_chars` (e.g. a translation without line breaks) are cut at sentence
+    ends, so a single chunk never holds a whole long article.
+    """
+    if not isinstance(text, str):
+        return []
+    spans = []
+    start = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        spans.extend(_split_long(text, *_trimmed(text, start, match.start()), max_chars))
+        start = match.end()
+    spans.extend(_split_long(text, *_trimmed(text, start, len(text)), max_chars))
+    return spans
+
+
+def panel_html(text, spans, visible, render_chunk=None, anchor=None):
+    """HTML for the `visible` paragraphs of `text`, with a marker for each run of hidden ones.
+
+    `render_chunk(paragraph)` returns the HTML of one paragraph (default: the
+    escaped text).  With `anchor`, paragraph k gets the id "<anchor>-<k>".
+    """
+    parts = []
+    hidden = 0
+    for k, (start, end) in enumerate(spans):
+        if k not in visible:
+            hidden += 1
+            continue
+        if hidden:
+            parts.append(f"<p style='color:#888;'><i>… {hidden} paragraph(s) not shown …</i></p>")
+            hidden = 0
+        chunk = text[start:end]
+        body = render_chunk(chunk) if render_chunk is not None else html.escape(chunk)
+        id_attr = f" id='{anchor}-{k}'" if anchor else ""
+        parts.append(f"<p{id_attr}>{body}</p>")
+    if hidden:
+        parts.append(f"<p style='color:#888;'><i>… {hidden} paragraph(s) not shown …</i></p>")
+    return "".join(parts)
+
+
+def render_text_panel(text, key, token, render_chunk=None, show=(), initial=INITIAL_PARAGRAPHS, anchor=None):
+    """Render a (possibly very long) article text, sending only part of it until expanded.
+
+    `show` are paragraph numbers rendered even when collapsed.  `token`
+    identifies the article: "Show full text" stays in effect for `key` until
+    the token changes, so the next article starts collapsed again.
+    """
+    import streamlit as st
+
+    spans = paragraph_spans(text)
+    if not spans:
+        st.write("")
+        return
+    if st.session_state.get(key) == token:
+        visible = set(range(len(spans)))
+    else:
+        visible = set(range(min(initial, len(spans)))) | {k for k in show if 0 <= k < len(spans)}
+    st.markdown(panel_html(text, spans, visible, render_chunk, anchor), unsafe_allow_html=True)
+
+    n_hidden = len(spans) - len(visible)
+    if n_hidden:
+        st.button(
+            f"Show full text ({n_hidden} more paragraph{'s' if n_hidden != 1 else ''})",
+            key=f"{key}_expand",
+            on_click=st.session_state.__setitem__,
+            args=(key, token),
+        )
+
+
+def paragraphs_with(text, spans, phrases):
+    """Numbers of the paragraphs that contain any of `phrases` (case-insensitive)."""
+    needles = [p.lower() for p in phrases if p]
+    if not needles or not spans:
+        return set()
+    lowered = text.lower()
+    return {k for k, (start, end) in enumerate(spans) if any(n in lowered[start:end] for n in needles)}
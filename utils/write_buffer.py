@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import threading
+from utils.durable import file_lock, process_identity, process_alive
+
+# Batched saves: records are appended (fsynced) to a small local JSON-lines
+# file per coder and handed to `flush_fn` as one batch once there are
+# `max_records` of them, the oldest is `max_age` seconds old, or flush() is
+# called.  The file is only cleared after `flush_fn` returns, so flush_fn must
+# be idempotent (upserts / full rewrites): after a crash the same records are
+# flushed again.  Each line records the process that wrote it, so a buffer
+# whose writers all died (a crashed worker) is flushed by whichever process
+# watches the folder next (see BufferFlusher.watch).
+DEFAULT_MAX_RECORDS = int(os.environ.get("ANNOTATOR_SAVE_BATCH", "10"))
+DEFAULT_MAX_AGE = float(os.environ.get("ANNOTATOR_SAVE_INTERVAL", "60"))
+POLL_INTERVAL = 5
+
+PENDING_SUFFIX = ".pending.jsonl"
+
+
+class WriteBuffer:
+    def __init__(self, path, flush_fn, max_records=DEFAULT_MAX_RECORDS, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.flush_fn = flush_fn
+        self.max_records = max_records
+        self.max_age = max_age
+
+    def _read(self):
+        lines = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        lines.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # torn final line: that add was never acknowledged
+        except FileNotFoundError:
+            pass
+        return lines
+
+    def records(self):
+        """Buffered records, oldest first."""
+        return [line["record"] for line in self._read()]
+
+    def add(self, record, default=None):
+        """Durably buffer one record; flushes when the buffer is full or old enough.
+
+        Returns True if this call flushed.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Leading newline terminates a line torn by an earlier crash.
+        line = "\n" + json.dumps(
+            {"at": time.time(), "owner": process_identity(), "record": record}, default=default
+        ) + "\n"
+        with file_lock(self.path):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if self.due():
+                self.flush()
+                return True
+        return False
+
+    def due(self, now=None):
+        lines = self._read()
+        if not lines:
+            return False
+        now = time.time() if now is None else now
+        return len(lines) >= self.max_records or now - lines[0]["at"] >= self.max_age
+
+    def orphaned(self):
+        """True if the buffer holds records and every process that wrote them is gone."""
+        lines = self._read()
+        return bool(lines) and not any(process_alive(line.get("owner")) for line in lines)
+
+    def flush(self):
+        """Hand every buffered record to flush_fn in one call, then clear the buffer; returns the count."""
+        with file_lock(self.path):
+            records = self.records()
+            if records:
+                self.flush_fn(records)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        return len(records)
+
+
+class BufferFlusher:
+    """Daemon thread that flushes registered buffers once their oldest record is too old.
+
+    Covers coders who stop labeling with a part-filled buffer; full buffers
+    are flushed by WriteBuffer.add itself.  Watched folders are rescanned on
+    every poll, so buffers left by a worker that died after this process
+    started are flushed too (at once, since no live process owns them).
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._buffers = {}
+        self._folders = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-buffer-flusher", daemon=True)
+            self._thread.start()
+
+    def register(self, buffer):
+        with self._lock:
+            buffer = self._buffers.setdefault(os.path.abspath(buffer.path), buffer)
+            self._start()
+        return buffer
+
+    def watch(self, folder, make_buffer):
+        """Rescan `folder` on every poll; `make_buffer(owner)` returns the (registered) buffer of a pending file."""
+        with self._lock:
+            self._folders[os.path.abspath(folder)] = make_buffer
+            self._start()
+
+    def _discover(self):
+        """Register the buffers of pending files in watched folders that this process has not seen yet."""
+        with self._lock:
+            folders = list(self._folders.items())
+            known = set(self._buffers)
+        for folder, make_buffer in folders:
+            try:
+                names = sorted(os.listdir(folder))
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith(PENDING_SUFFIX) and os.path.join(folder, name) not in known:
+                    make_buffer(name[:-len(PENDING_SUFFIX)])
+
+    def poll(self):
+        self._discover()
+        with self._lock:
+            buffers = list(self._buffers.values())
+        for buffer in buffers:
+            try:
+                if buffer.due() or buffer.orphaned():
+                    buffer.flush()
+            except Exception as e:
+                # Records stay buffered; the next poll retries
+                print(f"❌ Error flushing {buffer.path}: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.poll()
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+_recovered = set()
+
+
+def get_flusher():
+    """Process-wide flusher shared by all sessions."""
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = BufferFlusher()
+        return _flusher
+
+
+def get_buffer(path, flush_fn, **kwargs):
+    """The process-wide WriteBuffer for `path` (created and registered with the flusher on first use)."""
+    return get_flusher().register(WriteBuffer(path, flush_fn, **kwargs))
+
+
+def pending_buffer_path(folder, owner):
+    return os.path.join(folder, f"{owner}{PENDING_SUFFIX}")
+
+
+def recover_once(folder, make_buffer):
+    """Flush buffers left behind by earlier processes, at most once per process and folder.
+
+    `make_buffer(owner)` returns the WriteBuffer of the owner whose file is
+    `pending_buffer_path(folder, owner)`.  The folder is then watched by the
+    flusher, which picks up buffers of processes that die later.  Returns the
+    number of flushed records.
+    """
+    key = os.path.abspath(folder)
+    with _flusher_lock:
+        if key in _recovered:
+            return 0
+        _recovered.add(key)
+    get_flusher().watch(folder, make_buffer)
+    if not os.path.isdir(folder):
+        return 0
+    flushed = 0
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(PENDING_SUFFIX):
+            flushed += make_buffer(name[:-len(PENDING_SUFFIX)]).flush()
+    if flushed:
+        print(f"🔁 Flushed {flushed} buffered save(s) from {folder}")
+    return flushed